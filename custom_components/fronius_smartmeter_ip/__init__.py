@@ -1,26 +1,87 @@
 """The Fronius Smartmeter IP integration."""
 import logging
+import time
 from typing import Tuple # Für Typ-Annotation
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform, CONF_URL, CONF_USERNAME, CONF_PASSWORD
-from homeassistant.core import HomeAssistant
+from homeassistant.const import Platform, CONF_URL, CONF_USERNAME, CONF_PASSWORD, EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import device_registry as dr
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
+import voluptuous as vol
 # httpx.HTTPBasicAuth wird hier nicht mehr direkt benötigt, da das auth-Tupel verwendet wird
 
 from .const import (
     DOMAIN,
     API_PATH_MEASUREMENTS, API_PATH_CONFIG, API_QUERY_PARAMS,
-    DEFAULT_MEASUREMENTS_INTERVAL_SECONDS, DEFAULT_CONFIG_INTERVAL_SECONDS
+    DEFAULT_MEASUREMENTS_INTERVAL_SECONDS, DEFAULT_CONFIG_INTERVAL_SECONDS,
+    CONF_MEASUREMENTS_INTERVAL, CONF_CONFIG_INTERVAL,
+    CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES, PHASE_NAMES,
+    CONF_ARCHIVE_ENABLED, DEFAULT_ARCHIVE_ENABLED,
+    SERVICE_EXPORT_HISTORY, ATTR_CONFIG_ENTRY_ID, ATTR_START, ATTR_END, ATTR_FILENAME, ATTR_KEYS,
 )
+from .archive import ColumnArchive, archive_directory, export_csv, remove_archive
 # Die FroniusSmartmeterDataCoordinator Klasse wird aus sensor.py importiert
 from .sensor import FroniusSmartmeterDataCoordinator
+from .snapshot import SnapshotStore
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+EXPORT_HISTORY_SCHEMA = vol.Schema({
+    vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+    vol.Required(ATTR_START): cv.datetime,
+    vol.Required(ATTR_END): cv.datetime,
+    vol.Required(ATTR_FILENAME): cv.string,
+    vol.Optional(ATTR_KEYS): vol.All(cv.ensure_list, [cv.string]),
+})
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the services of the integration."""
+
+    async def _async_export_history(call: ServiceCall) -> ServiceResponse:
+        entry_id = call.data[ATTR_CONFIG_ENTRY_ID]
+        entry = hass.config_entries.async_get_entry(entry_id)
+        if entry is None or entry.domain != DOMAIN:
+            raise ServiceValidationError(f"{entry_id} is not a Fronius Smartmeter IP entry")
+        start = dt_util.as_utc(call.data[ATTR_START]) # Ohne Zeitzone gilt die lokale Zeit
+        end = dt_util.as_utc(call.data[ATTR_END])
+        if end < start:
+            raise ServiceValidationError("The end of the export period is before its start")
+        path = hass.config.path(call.data[ATTR_FILENAME])
+        if not hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"Writing to {path} is not allowed (allowlist_external_dirs)")
+
+        # Gepufferte Zeilen zuerst schreiben, damit der Export bis zur letzten Abfrage reicht
+        archive = hass.data.get(DOMAIN, {}).get(entry_id, {}).get('archive')
+        if archive is not None:
+            await archive.async_flush()
+        try:
+            rows = await hass.async_add_executor_job(
+                export_csv, archive_directory(hass, entry_id), path, start, end, call.data.get(ATTR_KEYS)
+            )
+        except OSError as err:
+            raise HomeAssistantError(f"Could not export the archive of {entry.title} to {path}: {err}") from err
+        _LOGGER.info("Exported %d archived rows of %s to %s", rows, entry.title, path)
+        if call.return_response:
+            return {"path": path, "rows": rows}
+        return None
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_EXPORT_HISTORY, _async_export_history,
+        schema=EXPORT_HISTORY_SCHEMA, supports_response=SupportsResponse.OPTIONAL,
+    )
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Fronius Smartmeter IP from a config entry."""
+    started = time.perf_counter()
     hass.data.setdefault(DOMAIN, {})
     # Initialisiere das Dictionary für diese entry_id, falls es noch nicht existiert
     hass.data[DOMAIN][entry.entry_id] = {}
@@ -31,34 +92,125 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     password = config.get(CONF_PASSWORD)
     auth_tuple: Tuple[str, str] | None = (username, password) if username and password else None
 
+    options = dict(entry.options)
+
     # Erstelle und speichere die Koordinatoren
     measurements_coordinator = FroniusSmartmeterDataCoordinator(
         hass, "Fronius Measurements", f"{base_url}{API_PATH_MEASUREMENTS}",
-        auth_tuple, API_QUERY_PARAMS, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS, is_measurements=True
+        auth_tuple, API_QUERY_PARAMS,
+        options.get(CONF_MEASUREMENTS_INTERVAL, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS),
+        is_measurements=True, options=options,
     )
     config_coordinator = FroniusSmartmeterDataCoordinator(
         hass, "Fronius Configuration", f"{base_url}{API_PATH_CONFIG}",
-        auth_tuple, API_QUERY_PARAMS, DEFAULT_CONFIG_INTERVAL_SECONDS
+        auth_tuple, API_QUERY_PARAMS,
+        options.get(CONF_CONFIG_INTERVAL, DEFAULT_CONFIG_INTERVAL_SECONDS),
+        options=options,
     )
 
-    # Lade initiale Daten für die Koordinatoren
-    await measurements_coordinator.async_config_entry_first_refresh()
-    await config_coordinator.async_config_entry_first_refresh()
+    # Letzte Messwerte aus dem Snapshot laden, damit die Entitäten sofort Werte haben
+    snapshot_store = SnapshotStore(hass, entry.entry_id)
+    measurements_coordinator.snapshot_store = snapshot_store
+    snapshot = await snapshot_store.async_load()
+    archive = ColumnArchive(hass, entry.entry_id) if options.get(CONF_ARCHIVE_ENABLED, DEFAULT_ARCHIVE_ENABLED) else None
+    measurements_coordinator.archive = archive
+
+    # Mit aktuellem Snapshot nicht auf das (evtl. offline) Gerät warten; die erste Abfrage läuft im Hintergrund
+    restored = snapshot is not None and measurements_coordinator.async_restore_snapshot(snapshot[1], snapshot[0])
+    if not restored:
+        # Lade initiale Daten für die Koordinatoren
+        try:
+            await measurements_coordinator.async_config_entry_first_refresh()
+            await config_coordinator.async_config_entry_first_refresh()
+        except Exception:
+            # Setup schlägt fehl und async_unload_entry wird nicht aufgerufen: HTTP-Clients hier schließen
+            await measurements_coordinator.async_shutdown()
+            await config_coordinator.async_shutdown()
+            hass.data[DOMAIN].pop(entry.entry_id, None)
+            raise
 
     # Speichere die Koordinatoren in hass.data, damit Plattformen darauf zugreifen können
     hass.data[DOMAIN][entry.entry_id]['measurements_coordinator'] = measurements_coordinator
     hass.data[DOMAIN][entry.entry_id]['config_coordinator'] = config_coordinator
+    hass.data[DOMAIN][entry.entry_id]['archive'] = archive
+    hass.data[DOMAIN][entry.entry_id]['phase_devices'] = options.get(CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES)
     # Die Konfiguration selbst ist über entry.data zugänglich
 
     # Lade die Plattformen (sensor, binary_sensor)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    if not hass.data[DOMAIN][entry.entry_id]['phase_devices']:
+        # Leere Phasen-Geräte entfernen, nachdem die Entitäten wieder am Hauptgerät hängen
+        device_registry = dr.async_get(hass)
+        for phase in PHASE_NAMES:
+            device = device_registry.async_get_device(identifiers={(DOMAIN, f"{entry.entry_id}_{phase}")})
+            if device is not None:
+                device_registry.async_remove_device(device.id)
+
+    if restored:
+        entry.async_create_background_task(
+            hass, measurements_coordinator.async_refresh(), f"{DOMAIN} measurements first refresh"
+        )
+        entry.async_create_background_task(
+            hass, config_coordinator.async_refresh(), f"{DOMAIN} configuration first refresh"
+        )
+
+    # Options-Änderungen werden live übernommen, ohne den Eintrag neu zu laden
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+
+    async def _async_save_snapshot(_event: Event) -> None:
+        await snapshot_store.async_flush()
+        if measurements_coordinator.archive is not None:
+            await measurements_coordinator.archive.async_flush()
+
+    entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_save_snapshot))
+
+    _LOGGER.debug("Set up %s in %.1f ms", entry.title, (time.perf_counter() - started) * 1000)
     return True
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running coordinators."""
+    domain_data = hass.data[DOMAIN][entry.entry_id]
+    options = dict(entry.options)
+    if options.get(CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES) != domain_data['phase_devices']:
+        # Das Gerätemodell kann nur beim Einrichten der Entitäten geändert werden
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    measurements_coordinator = domain_data['measurements_coordinator']
+    archive_enabled = options.get(CONF_ARCHIVE_ENABLED, DEFAULT_ARCHIVE_ENABLED)
+    if archive_enabled and measurements_coordinator.archive is None:
+        measurements_coordinator.archive = ColumnArchive(hass, entry.entry_id)
+    elif not archive_enabled and measurements_coordinator.archive is not None:
+        # Bereits archivierte Daten bleiben für den Export erhalten
+        await measurements_coordinator.archive.async_flush()
+        measurements_coordinator.archive = None
+    domain_data['archive'] = measurements_coordinator.archive
+    await measurements_coordinator.async_apply_options(
+        options.get(CONF_MEASUREMENTS_INTERVAL, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS), options
+    )
+    await domain_data['config_coordinator'].async_apply_options(
+        options.get(CONF_CONFIG_INTERVAL, DEFAULT_CONFIG_INTERVAL_SECONDS), options
+    )
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    started = time.perf_counter()
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
+        measurements_coordinator = hass.data[DOMAIN][entry.entry_id]['measurements_coordinator']
+        # Polling beenden und HTTP-Clients schließen, sonst bleibt bei jedem Reload ein Client offen
+        await measurements_coordinator.async_shutdown()
+        await hass.data[DOMAIN][entry.entry_id]['config_coordinator'].async_shutdown()
+        if measurements_coordinator.snapshot_store is not None:
+            await measurements_coordinator.snapshot_store.async_flush()
+        if measurements_coordinator.archive is not None:
+            await measurements_coordinator.archive.async_flush()
         # Entferne die Daten dieser entry_id aus hass.data
         hass.data[DOMAIN].pop(entry.entry_id, None) # Füge , None hinzu, um KeyError zu vermeiden, falls nicht vorhanden
-    return unload_ok
\ No newline at end of file
+        _LOGGER.debug("Unloaded %s in %.1f ms", entry.title, (time.perf_counter() - started) * 1000)
+    return unload_ok
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data of a deleted config entry."""
+    await SnapshotStore(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(remove_archive, archive_directory(hass, entry.entry_id))
@@ -0,0 +1,97 @@
+"""Phasor and power-triangle analytics derived from one measurements snapshot."""
+import cmath
+import math
+from typing import Any
+
+from .const import (
+    KEY_VOLTAGE_A, KEY_VOLTAGE_B, KEY_VOLTAGE_C,
+    KEY_VOLTAGE_PHASE_ANGLE_A, KEY_VOLTAGE_PHASE_ANGLE_B, KEY_VOLTAGE_PHASE_ANGLE_C,
+    KEY_ACTIVE_POWER_A, KEY_ACTIVE_POWER_B, KEY_ACTIVE_POWER_C, KEY_ACTIVE_POWER_TOTAL,
+    KEY_REACTIVE_POWER_A, KEY_REACTIVE_POWER_B, KEY_REACTIVE_POWER_C, KEY_REACTIVE_POWER_TOTAL,
+    KEY_APPARENT_POWER_A, KEY_APPARENT_POWER_B, KEY_APPARENT_POWER_C, KEY_APPARENT_POWER_TOTAL,
+    KEY_POWER_FACTOR_A, KEY_POWER_FACTOR_B, KEY_POWER_FACTOR_C,
+    KEY_THD_CURRENT_A, KEY_THD_CURRENT_B, KEY_THD_CURRENT_C,
+    KEY_VOLTAGE_SEQUENCE_POSITIVE, KEY_VOLTAGE_SEQUENCE_NEGATIVE, KEY_VOLTAGE_SEQUENCE_ZERO,
+    KEY_VOLTAGE_UNBALANCE, KEY_PHASE_ROTATION, PHASE_ROTATION_POSITIVE, PHASE_ROTATION_NEGATIVE,
+    KEY_DISPLACEMENT_POWER_FACTOR_A, KEY_DISPLACEMENT_POWER_FACTOR_B, KEY_DISPLACEMENT_POWER_FACTOR_C,
+    KEY_DISTORTION_POWER_FACTOR_A, KEY_DISTORTION_POWER_FACTOR_B, KEY_DISTORTION_POWER_FACTOR_C,
+    KEY_DISTORTION_POWER_A, KEY_DISTORTION_POWER_B, KEY_DISTORTION_POWER_C, KEY_DISTORTION_POWER_TOTAL,
+)
+
+# Drehoperator a = 1∠120° und a² = 1∠240°
+_A = cmath.rect(1.0, 2 * math.pi / 3)
+_A2 = _A * _A
+
+_VOLTAGE_PHASORS = (
+    (KEY_VOLTAGE_A, KEY_VOLTAGE_PHASE_ANGLE_A),
+    (KEY_VOLTAGE_B, KEY_VOLTAGE_PHASE_ANGLE_B),
+    (KEY_VOLTAGE_C, KEY_VOLTAGE_PHASE_ANGLE_C),
+)
+# (PF, THD Strom, Verschiebungsfaktor, Verzerrungsfaktor) je Phase
+_POWER_FACTOR_PHASES = (
+    (KEY_POWER_FACTOR_A, KEY_THD_CURRENT_A, KEY_DISPLACEMENT_POWER_FACTOR_A, KEY_DISTORTION_POWER_FACTOR_A),
+    (KEY_POWER_FACTOR_B, KEY_THD_CURRENT_B, KEY_DISPLACEMENT_POWER_FACTOR_B, KEY_DISTORTION_POWER_FACTOR_B),
+    (KEY_POWER_FACTOR_C, KEY_THD_CURRENT_C, KEY_DISPLACEMENT_POWER_FACTOR_C, KEY_DISTORTION_POWER_FACTOR_C),
+)
+# (P, Q, S, Verzerrungsleistung D) je Phase und gesamt
+_POWER_TRIANGLES = (
+    (KEY_ACTIVE_POWER_A, KEY_REACTIVE_POWER_A, KEY_APPARENT_POWER_A, KEY_DISTORTION_POWER_A),
+    (KEY_ACTIVE_POWER_B, KEY_REACTIVE_POWER_B, KEY_APPARENT_POWER_B, KEY_DISTORTION_POWER_B),
+    (KEY_ACTIVE_POWER_C, KEY_REACTIVE_POWER_C, KEY_APPARENT_POWER_C, KEY_DISTORTION_POWER_C),
+    (KEY_ACTIVE_POWER_TOTAL, KEY_REACTIVE_POWER_TOTAL, KEY_APPARENT_POWER_TOTAL, KEY_DISTORTION_POWER_TOTAL),
+)
+
+
+def _number(data: dict[str, Any], key: str) -> float | None:
+    value = data.get(key)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def add_phasor_analytics(data: dict[str, Any]) -> None:
+    """Add symmetrical components, power factor split and distortion power to a decoded payload.
+
+    Values whose inputs are missing (e.g. a deselected key group) are left out.
+    """
+    # Symmetrische Komponenten der Spannungen (Fortescue)
+    phasors = []
+    for magnitude_key, angle_key in _VOLTAGE_PHASORS:
+        magnitude = _number(data, magnitude_key)
+        angle = _number(data, angle_key)
+        if magnitude is None or angle is None:
+            break
+        phasors.append(cmath.rect(magnitude, math.radians(angle)))
+    else:
+        va, vb, vc = phasors
+        v0 = abs(va + vb + vc) / 3
+        v1 = abs(va + _A * vb + _A2 * vc) / 3
+        v2 = abs(va + _A2 * vb + _A * vc) / 3
+        data[KEY_VOLTAGE_SEQUENCE_ZERO] = v0
+        data[KEY_VOLTAGE_SEQUENCE_POSITIVE] = v1
+        data[KEY_VOLTAGE_SEQUENCE_NEGATIVE] = v2
+        # Unsymmetrie bezogen auf das überwiegende System: bei Linksdrehfeld ist das Mitsystem nur
+        # Rundungsrauschen, v2 / v1 wäre dann beliebig groß
+        dominant, opposing = (v1, v2) if v1 >= v2 else (v2, v1)
+        data[KEY_VOLTAGE_UNBALANCE] = opposing / dominant * 100 if dominant > 0 else None
+        # Rechtsdrehfeld, wenn das Mitsystem überwiegt
+        data[KEY_PHASE_ROTATION] = PHASE_ROTATION_POSITIVE if v1 >= v2 else PHASE_ROTATION_NEGATIVE
+
+    # Leistungsfaktor = Verschiebungsfaktor (cos φ) x Verzerrungsfaktor (1 / sqrt(1 + THDi²))
+    for pf_key, thd_key, displacement_key, distortion_key in _POWER_FACTOR_PHASES:
+        power_factor = _number(data, pf_key)
+        thd_current = _number(data, thd_key)
+        if power_factor is None or thd_current is None:
+            continue
+        distortion_pf = 1 / math.sqrt(1 + (thd_current / 100) ** 2)
+        data[distortion_key] = distortion_pf
+        data[displacement_key] = max(-1.0, min(1.0, power_factor / distortion_pf))
+
+    # Leistungsdreieck: D = sqrt(S² - P² - Q²)
+    for p_key, q_key, s_key, d_key in _POWER_TRIANGLES:
+        active = _number(data, p_key)
+        reactive = _number(data, q_key)
+        apparent = _number(data, s_key)
+        if active is None or reactive is None or apparent is None:
+            continue
+        data[d_key] = math.sqrt(max(apparent * apparent - active * active - reactive * reactive, 0.0))
@@ -0,0 +1,440 @@
+"""Append-only columnar archive of decoded measurements, rotated daily."""
+import asyncio
+import csv
+import logging
+import math
+import os
+import shutil
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date, datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Any, BinaryIO
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import ARCHIVE_BLOCK_ROWS, ARCHIVE_RETENTION_DAYS, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Block: Header | Zeitstempel (ms, Delta-kodiert) | Spaltenverzeichnis | je Spalte: Kodierung + Werte
+# Das Verzeichnis (Schlüssel durch NUL getrennt, dann die Längen der Spalten als uint32) erlaubt es,
+# gewünschte Spalten direkt anzuspringen, ohne die übrigen Spalten einzeln zu durchlaufen.
+# Werte mit wenigen Nachkommastellen (wie sie der Zähler liefert) werden als skalierte Ganzzahlen
+# Delta-kodiert, in der kleinsten passenden Breite; konstante Spalten als ein einzelner Wert; alles
+# andere als float64. Die Zahlenfelder werden byte-weise transponiert ("shuffle") und mit zlib
+# komprimiert: gleichartige Bytes (z.B. die führenden Nullen der Deltas) stehen so nebeneinander.
+# Länge und CRC32 im Header erkennen Blöcke, die z.B. bei einem Stromausfall nur halb geschrieben wurden.
+_MAGIC = b"FSMB"
+_VERSION = 3
+_VERSION_FLOAT_COLUMNS = 2 # Älteres Format: alle Spalten als float64, ohne Kodierungsbyte
+# Magic, Version, Zeilen, Spalten, erster/letzter Zeitstempel (ms), Länge der Nutzdaten, CRC32
+_BLOCK_HEADER = struct.Struct("<4sBIIqqII")
+_LENGTH = struct.Struct("<I")
+_KEY_LENGTH = struct.Struct("<H")
+_FILE_SUFFIX = ".fsma"
+
+# Kodierung einer Spalte
+_CODEC_FLOAT = 0 # float64
+_CODEC_CONSTANT = 1 # Ein float64 für alle Zeilen
+_CODEC_SCALED_DELTA = 2 # Zehnerexponent, Typcode, Startwert, Deltas der skalierten Ganzzahlen
+_CODEC = struct.Struct("<B")
+_CONSTANT = struct.Struct("<d")
+_SCALED_DELTA = struct.Struct("<Bcq")
+_MAX_DECIMALS = 6
+_DELTA_TYPECODES = "bhiq"
+
+
+def _shuffle(raw: bytes, width: int = 8) -> bytes:
+    return b"".join(raw[i::width] for i in range(width))
+
+
+def _unshuffle(planes: bytes, width: int = 8) -> bytes:
+    count = len(planes) // width
+    raw = bytearray(len(planes))
+    for i in range(width):
+        raw[i::width] = planes[i * count:(i + 1) * count]
+    return bytes(raw)
+
+
+def _scaled_integers(values: array) -> tuple[int, list[int]] | None:
+    """Return (decimals, integers) with integer / 10**decimals == value for every value, if possible."""
+    for decimals in range(_MAX_DECIMALS + 1):
+        scale = 10.0 ** decimals
+        try:
+            if all(round(value * scale) / scale == value for value in values):
+                integers = [round(value * scale) for value in values]
+                break
+        except (OverflowError, ValueError):
+            return None # Unendlich oder NaN
+    else:
+        return None
+    if max(map(abs, integers)) >= 2**53:
+        return None # Nicht mehr exakt als float64 darstellbar
+    return decimals, integers
+
+
+def _encode_column(values: array) -> bytes:
+    raw = values.tobytes()
+    if raw == raw[:8] * len(values):
+        return _CODEC.pack(_CODEC_CONSTANT) + raw[:8]
+    scaled = _scaled_integers(values)
+    if scaled is not None:
+        decimals, integers = scaled
+        deltas = [b - a for a, b in zip(integers, integers[1:])]
+        smallest, largest = min(deltas), max(deltas)
+        for typecode in _DELTA_TYPECODES:
+            limit = 1 << (8 * array(typecode).itemsize - 1)
+            if -limit <= smallest and largest < limit:
+                break
+        packed = array(typecode, deltas)
+        encoded = (
+            _CODEC.pack(_CODEC_SCALED_DELTA) + _SCALED_DELTA.pack(decimals, typecode.encode(), integers[0])
+            + zlib.compress(_shuffle(packed.tobytes(), packed.itemsize))
+        )
+        # Vorzeichen von -0.0 geht beim Skalieren verloren: nur verwenden, wenn die Werte bitgenau zurückkommen
+        if _decode_column(memoryview(encoded), len(values)).tobytes() == raw:
+            return encoded
+    return _CODEC.pack(_CODEC_FLOAT) + zlib.compress(_shuffle(raw))
+
+
+def _decode_column(data: memoryview, rows: int) -> array:
+    (codec,) = _CODEC.unpack_from(data)
+    data = data[_CODEC.size:]
+    if codec == _CODEC_FLOAT:
+        values = array("d")
+        values.frombytes(_unshuffle(zlib.decompress(data)))
+    elif codec == _CODEC_CONSTANT:
+        values = array("d", _CONSTANT.unpack_from(data)) * rows
+    elif codec == _CODEC_SCALED_DELTA:
+        decimals, typecode, first = _SCALED_DELTA.unpack_from(data)
+        deltas = array(typecode.decode())
+        deltas.frombytes(_unshuffle(zlib.decompress(data[_SCALED_DELTA.size:]), deltas.itemsize))
+        integers = accumulate(deltas, initial=first)
+        values = array("d", map((10.0 ** decimals).__rtruediv__, integers) if decimals else integers)
+    else:
+        raise ValueError(f"Unknown column encoding {codec}")
+    return values
+
+
+def encode_block(timestamps_ms: array, columns: dict[str, array]) -> bytes:
+    """Encode one block of rows; timestamps_ms is array('q'), each column array('d')."""
+    deltas = array("q", [timestamps_ms[0]])
+    deltas.extend(b - a for a, b in zip(timestamps_ms, timestamps_ms[1:]))
+    compressed = zlib.compress(_shuffle(deltas.tobytes()))
+    keys = "\0".join(columns).encode()
+    encoded = [_encode_column(values) for values in columns.values()]
+    payload = b"".join((
+        _LENGTH.pack(len(compressed)), compressed, _LENGTH.pack(len(keys)), keys,
+        array("I", map(len, encoded)).tobytes(), *encoded,
+    ))
+    fields = (len(timestamps_ms), len(columns), timestamps_ms[0], timestamps_ms[-1], len(payload))
+    crc = zlib.crc32(payload, zlib.crc32(struct.pack("<IIqqI", *fields)))
+    return _BLOCK_HEADER.pack(_MAGIC, _VERSION, *fields, crc) + payload
+
+
+def _read_block(
+    file: BinaryIO, path: str, skip_payload: Callable[[int, int], bool]
+) -> tuple[tuple[Any, ...], bytes | None] | None:
+    """Read the next block of file and return its header fields and payload.
+
+    The payload is None if skip_payload(first_ms, last_ms) is True. Returns None at the end of
+    the file and at the first incomplete or damaged block, which is logged.
+    """
+    header = file.read(_BLOCK_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _BLOCK_HEADER.size:
+        _LOGGER.warning("Ignoring truncated block header at the end of %s", path)
+        return None
+    fields = _BLOCK_HEADER.unpack(header)
+    magic, version, rows, column_count, first_ms, last_ms, length, crc = fields
+    if magic != _MAGIC or version not in (_VERSION, _VERSION_FLOAT_COLUMNS):
+        _LOGGER.warning("Ignoring %s from offset %d: unknown block format", path, file.tell() - len(header))
+        return None
+    if skip_payload(first_ms, last_ms):
+        file.seek(length, os.SEEK_CUR)
+        return fields, None
+    payload = file.read(length)
+    if len(payload) < length or zlib.crc32(payload, zlib.crc32(header[5:-4])) != crc:
+        offset = file.tell() - len(payload) - len(header)
+        _LOGGER.warning("Ignoring %s from offset %d: incomplete or damaged block", path, offset)
+        return None
+    return fields, payload
+
+
+def _decode_payload(
+    payload: bytes, rows: int, column_count: int, wanted: set[str] | None, version: int = _VERSION
+) -> tuple[array, dict[str, array]]:
+    view = memoryview(payload)
+    (length,) = _LENGTH.unpack_from(view)
+    offset = _LENGTH.size + length
+    deltas = array("q")
+    deltas.frombytes(_unshuffle(zlib.decompress(view[_LENGTH.size:offset])))
+    timestamps = array("q", accumulate(deltas))
+    if len(timestamps) != rows:
+        raise ValueError(f"Block has {len(timestamps)} timestamps instead of {rows}")
+    if version == _VERSION_FLOAT_COLUMNS:
+        return timestamps, _decode_float_columns(view, offset, rows, column_count, wanted)
+
+    (length,) = _LENGTH.unpack_from(view, offset)
+    offset += _LENGTH.size
+    keys = bytes(view[offset:offset + length]).decode().split("\0") if column_count else []
+    offset += length
+    lengths = array("I")
+    lengths.frombytes(view[offset:offset + 4 * column_count])
+    offset += 4 * column_count
+    if len(keys) != column_count or len(lengths) != column_count:
+        raise ValueError(f"Column directory does not match {column_count} columns")
+    ends = list(accumulate(lengths, initial=offset))
+    columns: dict[str, array] = {}
+    for index, key in enumerate(keys):
+        if wanted is not None and key not in wanted:
+            continue
+        values = _decode_column(view[ends[index]:ends[index + 1]], rows)
+        if len(values) != rows:
+            raise ValueError(f"Column {key} has {len(values)} instead of {rows} values")
+        columns[key] = values
+    return timestamps, columns
+
+
+def _decode_float_columns(
+    view: memoryview, offset: int, rows: int, column_count: int, wanted: set[str] | None
+) -> dict[str, array]:
+    """Decode the columns of a version 2 block: key and float64 values one after the other."""
+    columns: dict[str, array] = {}
+    for _ in range(column_count):
+        (key_length,) = _KEY_LENGTH.unpack_from(view, offset)
+        offset += _KEY_LENGTH.size
+        key = bytes(view[offset:offset + key_length]).decode()
+        offset += key_length
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        if wanted is None or key in wanted:
+            values = array("d")
+            values.frombytes(_unshuffle(zlib.decompress(view[offset:offset + length])))
+            if len(values) != rows:
+                raise ValueError(f"Column {key} has {len(values)} instead of {rows} values")
+            columns[key] = values
+        offset += length
+    return columns
+
+
+def iter_blocks(
+    path: str, start_ms: int | None = None, end_ms: int | None = None, keys: Iterable[str] | None = None
+) -> Iterator[tuple[array, dict[str, array]]]:
+    """Yield (timestamps_ms, columns) per block of an archive file.
+
+    Blocks outside [start_ms, end_ms] are skipped without reading them and columns not in keys
+    without decompressing them. Reading stops with a warning at the first damaged block, so the
+    blocks before a torn append stay readable.
+    """
+    wanted = set(keys) if keys is not None else None
+
+    def outside(first_ms: int, last_ms: int) -> bool:
+        return (start_ms is not None and last_ms < start_ms) or (end_ms is not None and first_ms > end_ms)
+
+    with open(path, "rb") as file:
+        while block := _read_block(file, path, outside):
+            fields, payload = block
+            if payload is None:
+                continue
+            try:
+                yield _decode_payload(payload, fields[2], fields[3], wanted, fields[1])
+            except (zlib.error, struct.error, ValueError) as err:
+                _LOGGER.warning("Ignoring %s from the block starting at %d ms: %s", path, fields[4], err)
+                return
+
+
+def _valid_length(path: str) -> int:
+    """Return the length of the leading run of intact blocks of an archive file."""
+    valid = 0
+    with open(path, "rb") as file:
+        while _read_block(file, path, lambda first_ms, last_ms: False):
+            valid = file.tell()
+    return valid
+
+
+def iter_columns(
+    directory: str, start: datetime, end: datetime, keys: list[str] | None = None
+) -> Iterator[tuple[array, dict[str, array]]]:
+    """Stream the archived values between start and end as (timestamps_ms, columns) per block.
+
+    Missing values are NaN. Only one block is in memory at a time.
+    """
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    day = start.astimezone(timezone.utc).date()
+    last_day = end.astimezone(timezone.utc).date()
+    while day <= last_day:
+        path = os.path.join(directory, f"{day.isoformat()}{_FILE_SUFFIX}")
+        day += timedelta(days=1)
+        if not os.path.exists(path):
+            continue
+        for timestamps, columns in iter_blocks(path, start_ms, end_ms, keys):
+            if timestamps[0] < start_ms or timestamps[-1] > end_ms:
+                # Block ragt über den Zeitraum hinaus: nur die Zeilen darin behalten
+                first = bisect_left(timestamps, start_ms)
+                last = bisect_right(timestamps, end_ms)
+                timestamps = timestamps[first:last]
+                columns = {key: values[first:last] for key, values in columns.items()}
+            if timestamps:
+                yield timestamps, columns
+
+
+def iter_rows(
+    directory: str, start: datetime, end: datetime, keys: list[str] | None = None
+) -> Iterator[tuple[datetime, dict[str, float | None]]]:
+    """Stream the archived rows between start and end, one block in memory at a time."""
+    for timestamps, columns in iter_columns(directory, start, end, keys):
+        for index, timestamp_ms in enumerate(timestamps):
+            row = {}
+            for key, values in columns.items():
+                value = values[index]
+                row[key] = None if math.isnan(value) else value
+            yield datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc), row
+
+
+def _csv_column(values: array) -> Iterable[float | str]:
+    # Fehlende Werte (NaN) als leere Zelle; die meisten Spalten haben keine und bleiben unverändert
+    if any(map(math.isnan, values)):
+        return ["" if math.isnan(value) else value for value in values]
+    return values
+
+
+def export_csv(
+    directory: str, path: str, start: datetime, end: datetime, keys: list[str] | None = None
+) -> int:
+    """Write the archived rows between start and end to a CSV file and return the row count."""
+    count = 0
+    header: list[str] | None = list(keys) if keys else None
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        for timestamps, columns in iter_columns(directory, start, end, keys):
+            if header is None:
+                header = sorted(columns) # Ohne Schlüsselauswahl: Spalten des ersten Blocks
+            if count == 0:
+                writer.writerow(["timestamp", *header])
+            # Spaltenweise statt Zeile für Zeile: keine Zwischen-Dicts pro Zeile
+            missing = [""] * len(timestamps)
+            stamps = [
+                datetime.fromtimestamp(timestamp_ms / 1000, timezone.utc).isoformat() for timestamp_ms in timestamps
+            ]
+            writer.writerows(zip(stamps, *(
+                _csv_column(columns[key]) if key in columns else missing for key in header
+            )))
+            count += len(timestamps)
+    return count
+
+
+def _append(directory: str, day: date, blob: bytes, repair: bool = False) -> None:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{day.isoformat()}{_FILE_SUFFIX}")
+    if repair and os.path.exists(path):
+        # Erster Schreibvorgang in diese Datei seit dem Start: einen abgerissenen Block vom
+        # letzten Lauf abschneiden, damit die neuen Blöcke lesbar bleiben
+        valid = _valid_length(path)
+        if valid < os.path.getsize(path):
+            _LOGGER.warning("Truncating %s to its last intact block at offset %d", path, valid)
+            os.truncate(path, valid)
+    with open(path, "ab") as file:
+        file.write(blob)
+
+
+def _remove_expired(directory: str, oldest: date) -> None:
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if not name.endswith(_FILE_SUFFIX):
+            continue
+        try:
+            day = date.fromisoformat(name[: -len(_FILE_SUFFIX)])
+        except ValueError:
+            continue
+        if day < oldest:
+            os.remove(os.path.join(directory, name))
+
+
+class ColumnArchive:
+    """Buffer decoded snapshots of one meter and append them to the archive in blocks."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        self.hass = hass
+        self.directory = archive_directory(hass, entry_id)
+        self._timestamps = array("q")
+        self._columns: dict[str, array] = {}
+        self._day: date | None = None
+        self._write_lock = asyncio.Lock()
+        self._checked_days: set[date] = set() # Dateien, deren Ende in dieser Sitzung geprüft wurde
+
+    @callback
+    def async_append(self, timestamp: float, data: dict[str, Any]) -> None:
+        """Add one decoded snapshot to the buffer; full blocks are written in the executor."""
+        day = datetime.fromtimestamp(timestamp, timezone.utc).date()
+        if self._day is not None and day != self._day:
+            # Tageswechsel: Puffer in die Datei des alten Tages schreiben
+            self._async_write_in_background(self._async_take_block(), rotate=True)
+        self._day = day
+        rows = len(self._timestamps)
+        self._timestamps.append(int(timestamp * 1000))
+        for key, value in data.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            column = self._columns.get(key)
+            if column is None:
+                # Neue Spalte: bisherige Zeilen mit NaN auffüllen
+                column = self._columns[key] = array("d", [math.nan]) * rows
+            column.append(value)
+        for column in self._columns.values():
+            if len(column) <= rows:
+                column.append(math.nan)
+        if len(self._timestamps) >= ARCHIVE_BLOCK_ROWS:
+            self._async_write_in_background(self._async_take_block())
+
+    @callback
+    def _async_take_block(self) -> tuple[array, dict[str, array], date] | None:
+        if not self._timestamps or self._day is None:
+            return None
+        block = (self._timestamps, self._columns, self._day)
+        self._timestamps, self._columns = array("q"), {}
+        return block
+
+    @callback
+    def _async_write_in_background(
+        self, block: tuple[array, dict[str, array], date] | None, rotate: bool = False
+    ) -> None:
+        if block is not None:
+            self.hass.async_create_background_task(self._async_write(block, rotate), f"{DOMAIN} archive write")
+
+    async def _async_write(self, block: tuple[array, dict[str, array], date], rotate: bool = False) -> None:
+        timestamps, columns, day = block
+        async with self._write_lock: # Blöcke in der Reihenfolge ihrer Entstehung anhängen
+            try:
+                blob = await self.hass.async_add_executor_job(encode_block, timestamps, columns)
+                await self.hass.async_add_executor_job(
+                    _append, self.directory, day, blob, day not in self._checked_days
+                )
+                self._checked_days.add(day)
+                if rotate:
+                    await self.hass.async_add_executor_job(
+                        _remove_expired, self.directory, day - timedelta(days=ARCHIVE_RETENTION_DAYS)
+                    )
+            except OSError as err:
+                _LOGGER.warning("Could not write archive block to %s: %s", self.directory, err)
+
+    async def async_flush(self) -> None:
+        """Write the buffered rows immediately (used on shutdown and unload)."""
+        block = self._async_take_block()
+        if block is not None:
+            await self._async_write(block)
+
+
+def archive_directory(hass: HomeAssistant, entry_id: str) -> str:
+    return hass.config.path(DOMAIN, "archive", entry_id)
+
+
+def remove_archive(directory: str) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
@@ -1,14 +1,15 @@
 """Binary sensor platform for Fronius Smartmeter IP."""
 import logging
+from datetime import timedelta
 from typing import Tuple # Sicherstellen, dass Tuple für Type Hints importiert wird, falls nicht schon globaler
 
 from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
-    BinarySensorDeviceClass, # Wird hier nicht direkt verwendet, aber guter Import für die Plattform
+    BinarySensorDeviceClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_URL # Für DeviceInfo benötigt
+from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.device_registry import DeviceInfo
@@ -16,12 +17,16 @@ from homeassistant.helpers.device_registry import DeviceInfo
 # Importiere die Basis-Entitätsklasse und den Datenkoordinator.
 # Diese werden jetzt in __init__.py erstellt und in hass.data gespeichert.
 # Die Klassendefinitionen können in sensor.py bleiben, da sie dort auch für Sensoren verwendet werden.
-from .sensor import FroniusSmartmeterDataCoordinator, FroniusSmartmeterEntity
+from .sensor import FroniusSmartmeterDataCoordinator, FroniusSmartmeterEntity, build_device_info
 from .const import (
     DOMAIN,
-    SENSOR_NAME_PREFIX,
     STATUS_BIT_DEFINITIONS,
+    STATUS_BIT_PHASES,
     KEY_STATUS_RAW,
+    CONF_PHASE_DEVICES,
+    DEFAULT_PHASE_DEVICES,
+    KEY_DATA_STALE,
+    HEALTH_REFRESH_SECONDS,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -35,6 +40,13 @@ BINARY_SENSOR_DESCRIPTIONS: tuple[BinarySensorEntityDescription, ...] = tuple(
     ) for bit, desc in STATUS_BIT_DEFINITIONS.items()
 )
 
+STALE_BINARY_SENSOR_DESCRIPTION = BinarySensorEntityDescription(
+    key=KEY_DATA_STALE,
+    name="Data Stale",
+    device_class=BinarySensorDeviceClass.PROBLEM,
+    entity_category=EntityCategory.DIAGNOSTIC,
+)
+
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
@@ -49,17 +61,9 @@ async def async_setup_entry(
         _LOGGER.error("Measurements coordinator not found for binary sensor setup. Ensure it's set up in __init__.py.")
         return
 
-    # Erstelle DeviceInfo (konsistent mit sensor.py)
-    # CONF_URL sollte in entry.data verfügbar sein
-    base_url = entry.data[CONF_URL].rstrip('/')
-    device_name_suffix = base_url.split('//')[-1].split(':')[0]
-    device_info = DeviceInfo(
-        identifiers={(DOMAIN, entry.entry_id)},
-        name=f"{SENSOR_NAME_PREFIX} ({device_name_suffix})",
-        manufacturer="Fronius (Custom)",
-        model="Smartmeter IP API",
-        configuration_url=base_url,
-    )
+    # DeviceInfo kommt aus sensor.py, damit Geräte und Phasen-Geräte konsistent sind
+    phase_devices = entry.options.get(CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES)
+    device_info = build_device_info(entry)
 
     entities_to_add = []
     for description in BINARY_SENSOR_DESCRIPTIONS:
@@ -70,11 +74,20 @@ async def async_setup_entry(
             _LOGGER.error("Could not parse bit_index from binary_sensor key %s: %s", description.key, e)
             continue
 
+        bit_device_info = device_info
+        if phase_devices and bit_index in STATUS_BIT_PHASES:
+            bit_device_info = build_device_info(entry, STATUS_BIT_PHASES[bit_index])
+
         entities_to_add.append(
             FroniusSmartmeterStatusBinarySensor(
-                measurements_coordinator, description, device_info, entry.entry_id, bit_index
+                measurements_coordinator, description, bit_device_info, entry.entry_id, bit_index
             )
         )
+    entities_to_add.append(
+        FroniusSmartmeterStaleBinarySensor(
+            measurements_coordinator, STALE_BINARY_SENSOR_DESCRIPTION, device_info, entry.entry_id
+        )
+    )
     async_add_entities(entities_to_add)
 
 
@@ -90,7 +103,7 @@ class FroniusSmartmeterStatusBinarySensor(FroniusSmartmeterEntity, BinarySensorE
         entry_id: str,
         status_bit_index: int,
     ):
-        super().__init__(coordinator, description, device_info, entry_id) # Ruft Basisklasse auf
+        super().__init__(coordinator, description, device_info, entry_id, data_key=KEY_STATUS_RAW) # Ruft Basisklasse auf
         self._status_bit_index = status_bit_index
         # Der Name wird automatisch durch _attr_has_entity_name = True in der Basisklasse und die description.name gesetzt
 
@@ -102,4 +115,31 @@ class FroniusSmartmeterStatusBinarySensor(FroniusSmartmeterEntity, BinarySensorE
             if isinstance(status_value, int):
                 # Bit ist gesetzt bedeutet "OK" (is_on = True)
                 return bool(status_value & (1 << self._status_bit_index))
-        return None
\ No newline at end of file
+        return None
+
+
+class FroniusSmartmeterStaleBinarySensor(FroniusSmartmeterEntity, BinarySensorEntity):
+    """On while the sample and time counters of the meter have not advanced for stale_after seconds.
+
+    This includes outages, in which no new counters arrive at all.
+    """
+    entity_description: BinarySensorEntityDescription
+    _refresh_interval = timedelta(seconds=HEALTH_REFRESH_SECONDS)
+
+    def __init__(
+        self,
+        coordinator: FroniusSmartmeterDataCoordinator,
+        description: BinarySensorEntityDescription,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ):
+        super().__init__(coordinator, description, device_info, entry_id)
+        self.coordinator_context = None # Bei jedem Dispatch neu bewerten
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.health is not None
+
+    @property
+    def is_on(self) -> bool:
+        return self.coordinator.data_stale
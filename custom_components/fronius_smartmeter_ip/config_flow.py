@@ -5,14 +5,42 @@ from typing import Any
 import httpx
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import ConfigEntry, ConfigFlow, ConfigFlowResult, OptionsFlow
 from homeassistant.const import CONF_URL, CONF_USERNAME, CONF_PASSWORD
+from homeassistant.core import HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.httpx_client import get_async_client
 
 from .const import (
     DOMAIN,
     API_PATH_MEASUREMENTS,
     API_QUERY_PARAMS,
+    CONF_SUBNET,
+    CONF_MEASUREMENTS_INTERVAL,
+    CONF_CONFIG_INTERVAL,
+    CONF_CONNECT_TIMEOUT,
+    CONF_READ_TIMEOUT,
+    CONF_MAX_CONNECTIONS,
+    CONF_KEY_GROUPS,
+    CONF_DEADBAND_PERCENT,
+    CONF_OFFLOAD_DECODE,
+    CONF_PHASE_DEVICES,
+    CONF_ARCHIVE_ENABLED,
+    CONF_UNAVAILABLE_WHEN_STALE,
+    DEFAULT_MEASUREMENTS_INTERVAL_SECONDS,
+    DEFAULT_CONFIG_INTERVAL_SECONDS,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_KEY_GROUPS,
+    DEFAULT_DEADBAND_PERCENT,
+    DEFAULT_OFFLOAD_DECODE,
+    DEFAULT_PHASE_DEVICES,
+    DEFAULT_ARCHIVE_ENABLED,
+    DEFAULT_UNAVAILABLE_WHEN_STALE,
+    KEY_GROUPS,
 )
+from .discovery import async_scan_subnet, async_url_keys, url_key
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,7 +50,13 @@ DATA_SCHEMA = vol.Schema({
     vol.Required(CONF_PASSWORD): str, # Behalte diese bei
 })
 
-async def validate_input(data: dict[str, Any]) -> dict[str, Any]:
+SCAN_SCHEMA = vol.Schema({
+    vol.Required(CONF_SUBNET, default="192.168.1.0/24"): str,
+    vol.Optional(CONF_USERNAME, default=""): str, # Wird für die Erkennung htaccess-geschützter Geräte benötigt
+    vol.Optional(CONF_PASSWORD, default=""): str,
+})
+
+async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
     base_url = data[CONF_URL].rstrip('/')
     username = data.get(CONF_USERNAME) # Verwende .get() falls die Felder optional sein könnten
@@ -33,14 +67,15 @@ async def validate_input(data: dict[str, Any]) -> dict[str, Any]:
     auth_tuple = (username, password) if username and password else None
 
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(
-                api_url,
-                auth=auth_tuple, # <--- GEÄNDERT: Tupel verwenden
-                params=API_QUERY_PARAMS
-            )
-            response.raise_for_status()
-            response.json()
+        # Gemeinsamer Client von HA: kein neuer Client (und SSL-Kontext) pro Versuch, nichts zu schließen
+        response = await get_async_client(hass).get(
+            api_url,
+            auth=auth_tuple, # <--- GEÄNDERT: Tupel verwenden
+            params=API_QUERY_PARAMS,
+            timeout=10,
+        )
+        response.raise_for_status()
+        response.json()
     except httpx.HTTPStatusError as http_err:
         _LOGGER.error("HTTP error during validation (%s): %s", api_url, http_err)
         if http_err.response.status_code == 401:
@@ -66,8 +101,84 @@ async def validate_input(data: dict[str, Any]) -> dict[str, Any]:
 class FroniusSmartmeterIPConfigFlow(ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    def __init__(self) -> None:
+        self._discovered_urls: list[str] = []
+        self._scan_input: dict[str, Any] = {}
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow for this handler."""
+        return FroniusSmartmeterIPOptionsFlow()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Let the user choose between a network scan and manual setup."""
+        return self.async_show_menu(step_id="user", menu_options=["scan", "manual"])
+
+    async def async_step_scan(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Scan a subnet for Fronius Smartmeter IP devices."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            username = user_input.get(CONF_USERNAME)
+            password = user_input.get(CONF_PASSWORD)
+            auth_tuple = (username, password) if username and password else None
+            try:
+                found = await async_scan_subnet(self.hass, user_input[CONF_SUBNET], auth_tuple)
+            except ValueError as err:
+                errors["base"] = str(err)
+            else:
+                # Bereits eingerichtete Geräte ausblenden; verglichen werden Schema, Host und Port,
+                # Hostnamen werden aufgelöst (z.B. "http://meter.local:80/" statt "http://192.168.1.5")
+                configured = await async_url_keys(self.hass, [
+                    url
+                    for entry in self._async_current_entries(include_ignore=True)
+                    for url in (entry.unique_id, entry.data.get(CONF_URL))
+                    if url
+                ])
+                self._discovered_urls = [url for url in found if url_key(url) not in configured]
+                if self._discovered_urls:
+                    self._scan_input = user_input
+                    return await self.async_step_select()
+                errors["base"] = "no_devices_found"
+
+        return self.async_show_form(
+            step_id="scan", data_schema=SCAN_SCHEMA, errors=errors
+        )
+
+    async def async_step_select(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Let the user pick one of the discovered meters."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            entry_data = {
+                CONF_URL: user_input[CONF_URL],
+                CONF_USERNAME: self._scan_input.get(CONF_USERNAME, ""),
+                CONF_PASSWORD: self._scan_input.get(CONF_PASSWORD, ""),
+            }
+            await self.async_set_unique_id(entry_data[CONF_URL])
+            self._abort_if_unique_id_configured()
+            try:
+                info = await validate_input(self.hass, entry_data)
+                return self.async_create_entry(title=info["title"], data=entry_data)
+            except vol.Invalid as err_type:
+                errors["base"] = str(err_type)
+            except Exception:
+                _LOGGER.exception("Unexpected exception in config flow")
+                errors["base"] = "unknown"
+
+        return self.async_show_form(
+            step_id="select",
+            data_schema=vol.Schema({vol.Required(CONF_URL): vol.In(self._discovered_urls)}),
+            errors=errors,
+        )
+
+    async def async_step_manual(
+        self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         errors: dict[str, str] = {}
         if user_input is not None:
@@ -84,7 +195,7 @@ class FroniusSmartmeterIPConfigFlow(ConfigFlow, domain=DOMAIN):
             self._abort_if_unique_id_configured()
 
             try:
-                info = await validate_input(processed_input) # Verwende processed_input
+                info = await validate_input(self.hass, processed_input) # Verwende processed_input
                 # Speichere die originalen user_input (können leere Strings sein),
                 # da HA leere Strings in der Konfiguration speichert, nicht None, wenn das Schema es so definiert.
                 return self.async_create_entry(title=info["title"], data=user_input)
@@ -108,5 +219,64 @@ class FroniusSmartmeterIPConfigFlow(ConfigFlow, domain=DOMAIN):
         # Da die API htaccess-geschützt ist, bleiben wir bei Required.
 
         return self.async_show_form(
-            step_id="user", data_schema=DATA_SCHEMA, errors=errors
-        )
\ No newline at end of file
+            step_id="manual", data_schema=DATA_SCHEMA, errors=errors
+        )
+
+
+class FroniusSmartmeterIPOptionsFlow(OptionsFlow):
+    """Options flow for the polling and performance settings of one meter."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        options_schema = vol.Schema({
+            vol.Required(
+                CONF_MEASUREMENTS_INTERVAL,
+                default=options.get(CONF_MEASUREMENTS_INTERVAL, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+            vol.Required(
+                CONF_CONFIG_INTERVAL,
+                default=options.get(CONF_CONFIG_INTERVAL, DEFAULT_CONFIG_INTERVAL_SECONDS),
+            ): vol.All(vol.Coerce(int), vol.Range(min=10, max=86400)),
+            vol.Required(
+                CONF_CONNECT_TIMEOUT,
+                default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT_SECONDS),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+            vol.Required(
+                CONF_READ_TIMEOUT,
+                default=options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT_SECONDS),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+            vol.Required(
+                CONF_MAX_CONNECTIONS,
+                default=options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS),
+            ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+            vol.Required(
+                CONF_KEY_GROUPS,
+                default=options.get(CONF_KEY_GROUPS, DEFAULT_KEY_GROUPS),
+            ): cv.multi_select({group: group.capitalize() for group in KEY_GROUPS}),
+            vol.Required(
+                CONF_DEADBAND_PERCENT,
+                default=options.get(CONF_DEADBAND_PERCENT, DEFAULT_DEADBAND_PERCENT),
+            ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+            vol.Required(
+                CONF_OFFLOAD_DECODE,
+                default=options.get(CONF_OFFLOAD_DECODE, DEFAULT_OFFLOAD_DECODE),
+            ): bool,
+            vol.Required(
+                CONF_PHASE_DEVICES,
+                default=options.get(CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES),
+            ): bool,
+            vol.Required(
+                CONF_ARCHIVE_ENABLED,
+                default=options.get(CONF_ARCHIVE_ENABLED, DEFAULT_ARCHIVE_ENABLED),
+            ): bool,
+            vol.Required(
+                CONF_UNAVAILABLE_WHEN_STALE,
+                default=options.get(CONF_UNAVAILABLE_WHEN_STALE, DEFAULT_UNAVAILABLE_WHEN_STALE),
+            ): bool,
+        })
+        return self.async_show_form(step_id="init", data_schema=options_schema)
@@ -11,11 +11,73 @@ DOMAIN = "fronius_smartmeter_ip"
 DEFAULT_MEASUREMENTS_INTERVAL_SECONDS = 10
 DEFAULT_CONFIG_INTERVAL_SECONDS = 300
 
+# Options (über den Options-Flow zur Laufzeit änderbar)
+CONF_MEASUREMENTS_INTERVAL = "measurements_interval"
+CONF_CONFIG_INTERVAL = "config_interval"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_READ_TIMEOUT = "read_timeout"
+CONF_MAX_CONNECTIONS = "max_connections"
+CONF_KEY_GROUPS = "key_groups"
+CONF_DEADBAND_PERCENT = "deadband_percent"
+CONF_OFFLOAD_DECODE = "offload_decode"
+CONF_PHASE_DEVICES = "phase_devices"
+CONF_ARCHIVE_ENABLED = "archive_enabled"
+CONF_UNAVAILABLE_WHEN_STALE = "unavailable_when_stale"
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_READ_TIMEOUT_SECONDS = 10.0
+DEFAULT_MAX_CONNECTIONS = 2 # Der Webserver des Meters verträgt nur wenige parallele Verbindungen
+DEFAULT_DEADBAND_PERCENT = 0.0
+DEFAULT_OFFLOAD_DECODE = False # JSON-Dekodierung im Executor statt auf dem Event-Loop
+DEFAULT_PHASE_DEVICES = False # Ein Gerät pro Phase statt eines einzigen Geräts
+DEFAULT_ARCHIVE_ENABLED = False # Messwerte zusätzlich im Spaltenarchiv ablegen
+DEFAULT_UNAVAILABLE_WHEN_STALE = False # Messwert-Entitäten bei eingefrorenen Daten auf "nicht verfügbar" setzen
+
+# Persistierter Snapshot der letzten Messwerte (für sofortige Werte nach einem Neustart)
+SNAPSHOT_SAVE_INTERVAL_SECONDS = 60
+SNAPSHOT_MAX_AGE_SECONDS = 3600 # Ältere Messwerte werden nicht wiederhergestellt (der Lastgang schon)
+ATTR_RESTORED = "restored" # Attribut an Sensoren, solange nur Snapshot-Werte vorliegen
+ATTR_RESTORED_AT = "restored_at" # Zeitpunkt, zu dem die wiederhergestellten Werte gespeichert wurden
+
+# Lastgang: 15-Minuten-Mittelwerte der Wirkleistung (demand.py)
+DEMAND_INTERVAL_SECONDS = 900
+DEMAND_MAX_GAP_SECONDS = 300 # Längere Lücken zwischen zwei Abfragen werden nicht integriert
+DEMAND_STATE_PREFIX = "_demand." # Schlüsselpräfix des Integrator-Zustands im Snapshot
+
+# Spaltenarchiv der Messwerte (archive.py), eine Datei pro Tag (UTC)
+ARCHIVE_BLOCK_ROWS = 360 # Zeilen pro komprimiertem Block (1 h bei 10 s Intervall)
+ARCHIVE_RETENTION_DAYS = 400
+
+# Service zum Export des Archivs
+SERVICE_EXPORT_HISTORY = "export_history"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_FILENAME = "filename"
+ATTR_KEYS = "keys"
+
+# Zustandsbewertung des Meters (health.py)
+HEALTH_STALE_INTERVALS = 3 # Daten gelten als veraltet, wenn die Zähler so viele Intervalle stehen ...
+HEALTH_STALE_MIN_SECONDS = 30 # ... mindestens aber so viele Sekunden
+HEALTH_SKEW_TOLERANCE_PERCENT = 1.0 # Erlaubte Abweichung der Betriebszeit von der Wanduhr
+HEALTH_REBOOT_PENALTY_SECONDS = 3600 # So lange zählt ein Neustart in die Bewertung
+HEALTH_REFRESH_SECONDS = 10 # Zustandsentitäten werden auch ohne erfolgreiche Abfrage so oft neu bewertet
+
+# Manuelle Refreshes innerhalb dieses Alters der letzten Abfrage aus dem Cache beantworten
+MIN_REFRESH_AGE_SECONDS = 2.0
+
 # API Paths & Params
 API_PATH_MEASUREMENTS = "/wizard/public/api/measurements"
 API_PATH_CONFIG = "/wizard/public/api/measurements/configuration"
 API_QUERY_PARAMS = {"status": "1"}
 
+# Netzwerk-Discovery
+CONF_SUBNET = "subnet"
+DEFAULT_DISCOVERY_CONCURRENCY = 64
+DEFAULT_DISCOVERY_TIMEOUT_SECONDS = 1.5
+DISCOVERY_CACHE_SECONDS = 300
+DISCOVERY_MAX_HOSTS = 1024 # Maximal ein /22 scannen
+
 # Sensor Name Prefix
 SENSOR_NAME_PREFIX = "Fronius SM"
 
@@ -171,6 +233,38 @@ KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_C = "ERCH"
 KEY_OPERATING_TIME_SECONDS = "operating_time_seconds"
 KEY_IMAX_CALCULATED = "imax_calculated"
 
+# Zustandswerte des Meters (health.py); werden nicht über die API geliefert
+KEY_HEALTH_SCORE = "health_score"
+KEY_DATA_STALE = "data_stale"
+KEY_SAMPLE_RATE = "sample_rate"
+KEY_CLOCK_SKEW = "clock_skew"
+KEY_METER_REBOOTS = "meter_reboots"
+KEY_POLL_ROUND_TRIP_TIME = "poll_round_trip_time"
+KEY_POLL_ROUND_TRIP_JITTER = "poll_round_trip_jitter"
+
+# Berechnete Phasor- und Leistungsdreieck-Kennwerte (analytics.py)
+KEY_VOLTAGE_SEQUENCE_POSITIVE = "voltage_sequence_positive"
+KEY_VOLTAGE_SEQUENCE_NEGATIVE = "voltage_sequence_negative"
+KEY_VOLTAGE_SEQUENCE_ZERO = "voltage_sequence_zero"
+KEY_VOLTAGE_UNBALANCE = "voltage_unbalance_factor"
+KEY_PHASE_ROTATION = "phase_rotation"
+KEY_DISPLACEMENT_POWER_FACTOR_A = "displacement_power_factor_a"
+KEY_DISPLACEMENT_POWER_FACTOR_B = "displacement_power_factor_b"
+KEY_DISPLACEMENT_POWER_FACTOR_C = "displacement_power_factor_c"
+KEY_DISTORTION_POWER_FACTOR_A = "distortion_power_factor_a"
+KEY_DISTORTION_POWER_FACTOR_B = "distortion_power_factor_b"
+KEY_DISTORTION_POWER_FACTOR_C = "distortion_power_factor_c"
+KEY_DISTORTION_POWER_A = "distortion_power_a"
+KEY_DISTORTION_POWER_B = "distortion_power_b"
+KEY_DISTORTION_POWER_C = "distortion_power_c"
+KEY_DISTORTION_POWER_TOTAL = "distortion_power_total"
+
+PHASE_ROTATION_POSITIVE = "positive" # Rechtsdrehfeld L1-L2-L3
+PHASE_ROTATION_NEGATIVE = "negative" # Linksdrehfeld L1-L3-L2
+
+# Schlüssel, die jede Measurements-Antwort enthält (Erkennungsmerkmal für die Discovery)
+DISCOVERY_FINGERPRINT_KEYS = (KEY_SAMPLES, KEY_FREQUENCY, KEY_ACTIVE_POWER_TOTAL)
+
 
 # Status Bits (from JS logic & screenshot interpretation)
 STATUS_BIT_DEFINITIONS = {
@@ -180,4 +274,122 @@ STATUS_BIT_DEFINITIONS = {
     4: "Phase A Current Data OK",
     5: "Phase B Current Data OK",
     6: "Phase C Current Data OK",
-}
\ No newline at end of file
+}
+
+# Schlüsselgruppen, die über die Options einzeln abgewählt werden können.
+# Nicht aufgeführte Schlüssel (STATUS, SAMPLES, TIME, ...) werden immer dekodiert.
+KEY_GROUP_VOLTAGE = "voltage"
+KEY_GROUP_CURRENT = "current"
+KEY_GROUP_POWER = "power"
+KEY_GROUP_ENERGY = "energy"
+KEY_GROUP_QUALITY = "quality"
+
+KEY_GROUPS: dict[str, tuple[str, ...]] = {
+    KEY_GROUP_VOLTAGE: (
+        KEY_VOLTAGE_A, KEY_VOLTAGE_B, KEY_VOLTAGE_C,
+        KEY_VOLTAGE_L1_L2, KEY_VOLTAGE_L2_L3, KEY_VOLTAGE_L3_L1,
+        KEY_VOLTAGE_AVG_LN, KEY_VOLTAGE_AVG_LL,
+        KEY_VOLTAGE_PHASE_ANGLE_A, KEY_VOLTAGE_PHASE_ANGLE_B, KEY_VOLTAGE_PHASE_ANGLE_C,
+    ),
+    KEY_GROUP_CURRENT: (
+        KEY_CURRENT_A, KEY_CURRENT_B, KEY_CURRENT_C, KEY_CURRENT_N, KEY_CURRENT_N0,
+        KEY_CURRENT_PHASE_ANGLE_A, KEY_CURRENT_PHASE_ANGLE_B, KEY_CURRENT_PHASE_ANGLE_C,
+    ),
+    KEY_GROUP_POWER: (
+        KEY_ACTIVE_POWER_A, KEY_ACTIVE_POWER_B, KEY_ACTIVE_POWER_C, KEY_ACTIVE_POWER_TOTAL,
+        KEY_ACTIVE_POWER_FUNDAMENTAL_A, KEY_ACTIVE_POWER_FUNDAMENTAL_B, KEY_ACTIVE_POWER_FUNDAMENTAL_C, KEY_ACTIVE_POWER_FUNDAMENTAL_TOTAL,
+        KEY_ACTIVE_POWER_HARMONIC_A, KEY_ACTIVE_POWER_HARMONIC_B, KEY_ACTIVE_POWER_HARMONIC_C, KEY_ACTIVE_POWER_HARMONIC_TOTAL,
+        KEY_REACTIVE_POWER_A, KEY_REACTIVE_POWER_B, KEY_REACTIVE_POWER_C, KEY_REACTIVE_POWER_TOTAL,
+        KEY_APPARENT_POWER_A, KEY_APPARENT_POWER_B, KEY_APPARENT_POWER_C, KEY_APPARENT_POWER_TOTAL,
+        KEY_POWER_FACTOR_A, KEY_POWER_FACTOR_B, KEY_POWER_FACTOR_C, KEY_POWER_FACTOR_TOTAL,
+    ),
+    KEY_GROUP_ENERGY: (
+        KEY_ENERGY_EXPORT_ACTIVE_A, KEY_ENERGY_EXPORT_ACTIVE_B, KEY_ENERGY_EXPORT_ACTIVE_C, KEY_ENERGY_EXPORT_ACTIVE_TOTAL,
+        KEY_ENERGY_EXPORT_REACTIVE_A, KEY_ENERGY_EXPORT_REACTIVE_B, KEY_ENERGY_EXPORT_REACTIVE_C, KEY_ENERGY_EXPORT_REACTIVE_TOTAL,
+        KEY_ENERGY_IMPORT_ACTIVE_A, KEY_ENERGY_IMPORT_ACTIVE_B, KEY_ENERGY_IMPORT_ACTIVE_C, KEY_ENERGY_IMPORT_ACTIVE_TOTAL,
+        KEY_ENERGY_IMPORT_REACTIVE_A, KEY_ENERGY_IMPORT_REACTIVE_B, KEY_ENERGY_IMPORT_REACTIVE_C, KEY_ENERGY_IMPORT_REACTIVE_TOTAL,
+        KEY_ENERGY_APPARENT_A, KEY_ENERGY_APPARENT_B, KEY_ENERGY_APPARENT_C, KEY_ENERGY_APPARENT_TOTAL,
+        KEY_ENERGY_EXPORT_APPARENT_A, KEY_ENERGY_EXPORT_APPARENT_B, KEY_ENERGY_EXPORT_APPARENT_C, KEY_ENERGY_EXPORT_APPARENT_TOTAL,
+        KEY_ENERGY_IMPORT_APPARENT_A, KEY_ENERGY_IMPORT_APPARENT_B, KEY_ENERGY_IMPORT_APPARENT_C, KEY_ENERGY_IMPORT_APPARENT_TOTAL,
+        KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_TOTAL, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_TOTAL,
+        KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_TOTAL, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_TOTAL,
+        KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_A, KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_B, KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_C,
+        KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_A, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_B, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_C,
+        KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_A, KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_B, KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_C,
+        KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_A, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_B, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_C,
+    ),
+    KEY_GROUP_QUALITY: (
+        KEY_FREQUENCY, KEY_TEMPERATURE,
+        KEY_THD_VOLTAGE_A, KEY_THD_VOLTAGE_B, KEY_THD_VOLTAGE_C,
+        KEY_THD_CURRENT_A, KEY_THD_CURRENT_B, KEY_THD_CURRENT_C,
+    ),
+}
+DEFAULT_KEY_GROUPS = list(KEY_GROUPS)
+
+# Zählerstände und Statuswerte werden immer weitergereicht, auch wenn eine Totzone konfiguriert ist
+DEADBAND_EXEMPT_KEYS = frozenset(KEY_GROUPS[KEY_GROUP_ENERGY]) | {
+    KEY_STATUS_RAW, KEY_SAMPLES, KEY_OPERATING_TIME_MILLISECONDS, KEY_OPERATING_TIME_SECONDS,
+}
+
+# Lastgang-Kanäle (Leistungsschlüssel -> Suffix) und Schlüsselvorlagen der berechneten Werte
+DEMAND_CHANNELS: dict[str, str] = {
+    KEY_ACTIVE_POWER_TOTAL: "total",
+    KEY_ACTIVE_POWER_A: "a",
+    KEY_ACTIVE_POWER_B: "b",
+    KEY_ACTIVE_POWER_C: "c",
+}
+KEY_DEMAND_LAST_INTERVAL = "demand_last_interval_{}"
+KEY_DEMAND_FORECAST = "demand_forecast_{}"
+KEY_DEMAND_MONTHLY_PEAK = "demand_monthly_peak_{}"
+
+# Aufteilung in Phasen-Geräte (L1/L2/L3/N); alle übrigen Schlüssel gehören zum Gesamt-Gerät
+PHASE_L1 = "l1"
+PHASE_L2 = "l2"
+PHASE_L3 = "l3"
+PHASE_N = "n"
+
+PHASE_NAMES = {PHASE_L1: "L1", PHASE_L2: "L2", PHASE_L3: "L3", PHASE_N: "N"}
+
+PHASE_KEYS: dict[str, tuple[str, ...]] = {
+    PHASE_L1: (
+        KEY_VOLTAGE_A, KEY_VOLTAGE_PHASE_ANGLE_A, KEY_CURRENT_A, KEY_CURRENT_PHASE_ANGLE_A,
+        KEY_ACTIVE_POWER_A, KEY_ACTIVE_POWER_FUNDAMENTAL_A, KEY_ACTIVE_POWER_HARMONIC_A,
+        KEY_REACTIVE_POWER_A, KEY_APPARENT_POWER_A, KEY_POWER_FACTOR_A,
+        KEY_THD_VOLTAGE_A, KEY_THD_CURRENT_A,
+        KEY_ENERGY_EXPORT_ACTIVE_A, KEY_ENERGY_EXPORT_REACTIVE_A, KEY_ENERGY_IMPORT_ACTIVE_A, KEY_ENERGY_IMPORT_REACTIVE_A,
+        KEY_ENERGY_APPARENT_A, KEY_ENERGY_EXPORT_APPARENT_A, KEY_ENERGY_IMPORT_APPARENT_A,
+        KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_A, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_A,
+        KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_A, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_A,
+        KEY_DISPLACEMENT_POWER_FACTOR_A, KEY_DISTORTION_POWER_FACTOR_A, KEY_DISTORTION_POWER_A,
+        KEY_DEMAND_LAST_INTERVAL.format("a"), KEY_DEMAND_FORECAST.format("a"), KEY_DEMAND_MONTHLY_PEAK.format("a"),
+    ),
+    PHASE_L2: (
+        KEY_VOLTAGE_B, KEY_VOLTAGE_PHASE_ANGLE_B, KEY_CURRENT_B, KEY_CURRENT_PHASE_ANGLE_B,
+        KEY_ACTIVE_POWER_B, KEY_ACTIVE_POWER_FUNDAMENTAL_B, KEY_ACTIVE_POWER_HARMONIC_B,
+        KEY_REACTIVE_POWER_B, KEY_APPARENT_POWER_B, KEY_POWER_FACTOR_B,
+        KEY_THD_VOLTAGE_B, KEY_THD_CURRENT_B,
+        KEY_ENERGY_EXPORT_ACTIVE_B, KEY_ENERGY_EXPORT_REACTIVE_B, KEY_ENERGY_IMPORT_ACTIVE_B, KEY_ENERGY_IMPORT_REACTIVE_B,
+        KEY_ENERGY_APPARENT_B, KEY_ENERGY_EXPORT_APPARENT_B, KEY_ENERGY_IMPORT_APPARENT_B,
+        KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_B, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_B,
+        KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_B, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_B,
+        KEY_DISPLACEMENT_POWER_FACTOR_B, KEY_DISTORTION_POWER_FACTOR_B, KEY_DISTORTION_POWER_B,
+        KEY_DEMAND_LAST_INTERVAL.format("b"), KEY_DEMAND_FORECAST.format("b"), KEY_DEMAND_MONTHLY_PEAK.format("b"),
+    ),
+    PHASE_L3: (
+        KEY_VOLTAGE_C, KEY_VOLTAGE_PHASE_ANGLE_C, KEY_CURRENT_C, KEY_CURRENT_PHASE_ANGLE_C,
+        KEY_ACTIVE_POWER_C, KEY_ACTIVE_POWER_FUNDAMENTAL_C, KEY_ACTIVE_POWER_HARMONIC_C,
+        KEY_REACTIVE_POWER_C, KEY_APPARENT_POWER_C, KEY_POWER_FACTOR_C,
+        KEY_THD_VOLTAGE_C, KEY_THD_CURRENT_C,
+        KEY_ENERGY_EXPORT_ACTIVE_C, KEY_ENERGY_EXPORT_REACTIVE_C, KEY_ENERGY_IMPORT_ACTIVE_C, KEY_ENERGY_IMPORT_REACTIVE_C,
+        KEY_ENERGY_APPARENT_C, KEY_ENERGY_EXPORT_APPARENT_C, KEY_ENERGY_IMPORT_APPARENT_C,
+        KEY_ENERGY_EXPORT_ACTIVE_FUNDAMENTAL_C, KEY_ENERGY_EXPORT_ACTIVE_HARMONIC_C,
+        KEY_ENERGY_IMPORT_ACTIVE_FUNDAMENTAL_C, KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_C,
+        KEY_DISPLACEMENT_POWER_FACTOR_C, KEY_DISTORTION_POWER_FACTOR_C, KEY_DISTORTION_POWER_C,
+        KEY_DEMAND_LAST_INTERVAL.format("c"), KEY_DEMAND_FORECAST.format("c"), KEY_DEMAND_MONTHLY_PEAK.format("c"),
+    ),
+    PHASE_N: (KEY_CURRENT_N, KEY_CURRENT_N0),
+}
+KEY_PHASES: dict[str, str] = {key: phase for phase, keys in PHASE_KEYS.items() for key in keys}
+
+# Status-Bits je Phase (siehe STATUS_BIT_DEFINITIONS)
+STATUS_BIT_PHASES = {0: PHASE_L1, 1: PHASE_L2, 2: PHASE_L3, 4: PHASE_L1, 5: PHASE_L2, 6: PHASE_L3}
@@ -0,0 +1,164 @@
+"""Incremental 15-minute demand integration of active power."""
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import Any
+
+from .const import (
+    DEMAND_CHANNELS,
+    DEMAND_INTERVAL_SECONDS,
+    DEMAND_MAX_GAP_SECONDS,
+    DEMAND_STATE_PREFIX,
+    KEY_DEMAND_FORECAST,
+    KEY_DEMAND_LAST_INTERVAL,
+    KEY_DEMAND_MONTHLY_PEAK,
+)
+
+# Reihenfolge der Zustandswerte für die Persistenz
+_STATE_FIELDS = (
+    "interval_start", "energy", "covered", "last_ts", "last_power",
+    "last_interval_average", "peak_month", "peak_value",
+)
+
+
+def _utc_month(timestamp: float) -> int:
+    moment = datetime.fromtimestamp(timestamp, timezone.utc)
+    return moment.year * 12 + moment.month - 1
+
+
+class DemandIntegrator:
+    """Time-weighted interval average, forecast and monthly peak of one power channel.
+
+    Samples are integrated with the trapezoidal rule and split exactly at interval
+    boundaries. Gaps longer than max_gap are not integrated; the interval average is
+    then taken over the covered time only. Memory use is constant.
+    """
+
+    __slots__ = (*_STATE_FIELDS, "_interval", "_max_gap", "_month_of")
+
+    def __init__(
+        self,
+        interval: float = DEMAND_INTERVAL_SECONDS,
+        max_gap: float = DEMAND_MAX_GAP_SECONDS,
+        month_of: Callable[[float], int] = _utc_month,
+    ) -> None:
+        self._interval = interval
+        self._max_gap = max_gap
+        self._month_of = month_of
+        self.interval_start: float | None = None
+        self.energy = 0.0 # Ws im laufenden Intervall
+        self.covered = 0.0 # Integrierte Sekunden im laufenden Intervall
+        self.last_ts: float | None = None
+        self.last_power: float | None = None
+        self.last_interval_average: float | None = None
+        self.peak_month: int | None = None
+        self.peak_value: float | None = None
+
+    def _close_interval(self) -> None:
+        if self.interval_start is not None and self.covered > 0:
+            average = self.energy / self.covered
+            self.last_interval_average = average
+            month = self._month_of(self.interval_start)
+            if month != self.peak_month:
+                self.peak_month = month
+                self.peak_value = average
+            elif self.peak_value is None or average > self.peak_value:
+                self.peak_value = average
+        else:
+            self.last_interval_average = None # Intervall ohne Messwerte
+        self.energy = 0.0
+        self.covered = 0.0
+
+    def add_sample(self, timestamp: float, power: float) -> None:
+        """Integrate a new power sample (W) taken at timestamp (epoch seconds)."""
+        if self.last_ts is not None and timestamp <= self.last_ts:
+            return # Doppelte oder rückwärts laufende Zeitstempel ignorieren
+        start = timestamp - timestamp % self._interval
+
+        if self.last_ts is None or self.last_power is None or timestamp - self.last_ts > self._max_gap:
+            # Erste Messung oder Lücke: nicht über die Lücke integrieren
+            if self.interval_start is not None and start != self.interval_start:
+                closed = self.interval_start
+                self._close_interval()
+                if closed + self._interval != start:
+                    # Die Lücke umfasst ganze Intervalle: das letzte Intervall hat keinen Wert
+                    self.last_interval_average = None
+            self.interval_start = start
+        else:
+            t0, p0 = self.last_ts, self.last_power
+            slope = (power - p0) / (timestamp - t0)
+            boundary = self.interval_start + self._interval
+            while boundary <= timestamp:
+                # Segment bis zur Intervallgrenze integrieren und Intervall abschließen
+                p_boundary = p0 + slope * (boundary - t0)
+                self.energy += (p0 + p_boundary) / 2 * (boundary - t0)
+                self.covered += boundary - t0
+                self._close_interval()
+                t0, p0 = boundary, p_boundary
+                self.interval_start = boundary
+                boundary += self._interval
+            self.energy += (p0 + power) / 2 * (timestamp - t0)
+            self.covered += timestamp - t0
+
+        self.last_ts = timestamp
+        self.last_power = power
+
+    @property
+    def forecast(self) -> float | None:
+        """Expected average of the running interval if the current power persists."""
+        if self.interval_start is None or self.last_ts is None or self.last_power is None:
+            return None
+        remaining = max(0.0, self.interval_start + self._interval - self.last_ts)
+        total_time = self.covered + remaining
+        if total_time <= 0:
+            return None
+        return (self.energy + self.last_power * remaining) / total_time
+
+    def monthly_peak(self, timestamp: float) -> float | None:
+        """Highest interval average of the month that contains timestamp."""
+        if self.peak_month is None or self.peak_month != self._month_of(timestamp):
+            return None
+        return self.peak_value
+
+    def as_state(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, field) for field in _STATE_FIELDS)
+
+    def restore_state(self, state: tuple[Any, ...]) -> None:
+        for field, value in zip(_STATE_FIELDS, state):
+            setattr(self, field, value)
+        if self.peak_month is not None:
+            self.peak_month = int(self.peak_month)
+
+
+class DemandTracker:
+    """Demand integrators for total and per-phase active power of one meter."""
+
+    def __init__(self, month_of: Callable[[float], int] = _utc_month) -> None:
+        self._integrators = {
+            power_key: (suffix, DemandIntegrator(month_of=month_of))
+            for power_key, suffix in DEMAND_CHANNELS.items()
+        }
+
+    def add_samples(self, timestamp: float, data: dict[str, Any]) -> None:
+        """Integrate the power values of a decoded payload and add the demand values to it."""
+        for power_key, (suffix, integrator) in self._integrators.items():
+            power = data.get(power_key)
+            if isinstance(power, (int, float)) and not isinstance(power, bool):
+                integrator.add_sample(timestamp, float(power))
+            data[KEY_DEMAND_LAST_INTERVAL.format(suffix)] = integrator.last_interval_average
+            data[KEY_DEMAND_FORECAST.format(suffix)] = integrator.forecast
+            data[KEY_DEMAND_MONTHLY_PEAK.format(suffix)] = integrator.monthly_peak(timestamp)
+
+    def as_state(self) -> dict[str, Any]:
+        """Flatten the integrator state into snapshot keys."""
+        state: dict[str, Any] = {}
+        for suffix, integrator in self._integrators.values():
+            for field, value in zip(_STATE_FIELDS, integrator.as_state()):
+                state[f"{DEMAND_STATE_PREFIX}{suffix}.{field}"] = value
+        return state
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """Restore the integrators from snapshot keys created by as_state."""
+        for suffix, integrator in self._integrators.values():
+            keys = [f"{DEMAND_STATE_PREFIX}{suffix}.{field}" for field in _STATE_FIELDS]
+            if all(key in state for key in keys):
+                integrator.restore_state(tuple(state[key] for key in keys))
@@ -0,0 +1,136 @@
+"""Network discovery for Fronius Smartmeter IP devices."""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from collections.abc import Iterable
+from typing import Any, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.httpx_client import get_async_client
+
+from .const import (
+    API_PATH_MEASUREMENTS,
+    API_QUERY_PARAMS,
+    DISCOVERY_CACHE_SECONDS,
+    DISCOVERY_FINGERPRINT_KEYS,
+    DEFAULT_DISCOVERY_CONCURRENCY,
+    DEFAULT_DISCOVERY_TIMEOUT_SECONDS,
+    DISCOVERY_MAX_HOSTS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Ergebnis-Cache pro (Subnetz, Port, Auth): Zeitstempel (monotonic) und gefundene URLs
+_DISCOVERY_CACHE: dict[tuple[str, int | None, Tuple[str, str] | None], tuple[float, list[str]]] = {}
+
+
+def parse_subnet(subnet: str) -> ipaddress.IPv4Network:
+    """Parse and validate the subnet entered by the user."""
+    try:
+        network = ipaddress.ip_network(subnet.strip(), strict=False)
+    except ValueError as err:
+        raise ValueError("invalid_subnet") from err
+    if not isinstance(network, ipaddress.IPv4Network):
+        raise ValueError("invalid_subnet")
+    if network.num_addresses > DISCOVERY_MAX_HOSTS:
+        raise ValueError("subnet_too_large")
+    return network
+
+
+def is_smartmeter_payload(data: Any) -> bool:
+    """Return True if a measurements response looks like a Fronius Smartmeter IP."""
+    return isinstance(data, dict) and all(key in data for key in DISCOVERY_FINGERPRINT_KEYS)
+
+
+def url_key(url: str) -> tuple[str, str, int]:
+    """Return (scheme, host, port) of a meter URL, so that equivalent URLs compare equal."""
+    parts = urlsplit(url.strip() if "//" in url else f"http://{url.strip()}")
+    scheme = (parts.scheme or "http").lower()
+    return scheme, (parts.hostname or "").lower(), parts.port or (443 if scheme == "https" else 80)
+
+
+async def async_url_keys(hass: HomeAssistant, urls: Iterable[str]) -> set[tuple[str, str, int]]:
+    """Return the url_key of each URL, plus the keys of the addresses its host name resolves to."""
+    keys: set[tuple[str, str, int]] = set()
+    for url in urls:
+        scheme, host, port = key = url_key(url)
+        keys.add(key)
+        try:
+            ipaddress.ip_address(host)
+            continue # Bereits eine IP-Adresse
+        except ValueError:
+            pass
+        try:
+            async with asyncio.timeout(DEFAULT_DISCOVERY_TIMEOUT_SECONDS):
+                infos = await hass.loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except (OSError, TimeoutError):
+            continue # Nicht auflösbar: nur der Hostname selbst wird verglichen
+        keys.update((scheme, str(info[4][0]).lower(), port) for info in infos)
+    return keys
+
+
+async def _async_probe_host(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    base_url: str,
+    auth: Tuple[str, str] | None,
+    timeout: float,
+) -> str | None:
+    """Probe a single host and return its base URL if it is a smart meter."""
+    async with semaphore:
+        try:
+            response = await client.get(
+                f"{base_url}{API_PATH_MEASUREMENTS}", auth=auth, params=API_QUERY_PARAMS, timeout=timeout
+            )
+            if response.status_code != 200:
+                return None
+            if is_smartmeter_payload(response.json()):
+                return base_url
+        except (httpx.HTTPError, ValueError):
+            return None # Nicht erreichbar oder kein passendes JSON
+    return None
+
+
+async def async_scan_subnet(
+    hass: HomeAssistant,
+    subnet: str,
+    auth: Tuple[str, str] | None = None,
+    concurrency: int = DEFAULT_DISCOVERY_CONCURRENCY,
+    timeout: float = DEFAULT_DISCOVERY_TIMEOUT_SECONDS,
+    use_cache: bool = True,
+    port: int | None = None,
+) -> list[str]:
+    """Probe all hosts of a subnet concurrently and return the base URLs of found meters."""
+    network = parse_subnet(subnet)
+    cache_key = (str(network), port, auth)
+    cached = _DISCOVERY_CACHE.get(cache_key)
+    if use_cache and cached and time.monotonic() - cached[0] < DISCOVERY_CACHE_SECONDS:
+        _LOGGER.debug("Using cached discovery result for %s: %s", network, cached[1])
+        return list(cached[1])
+
+    hosts = list(network.hosts()) or [network.network_address]
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    # Gemeinsamer Client von HA: kein Aufbau eines SSL-Kontexts auf dem Event-Loop; die
+    # Parallelität begrenzt das Semaphore
+    client = get_async_client(hass)
+    suffix = f":{port}" if port else ""
+    results = await asyncio.gather(
+        *(_async_probe_host(client, semaphore, f"http://{host}{suffix}", auth, timeout) for host in hosts)
+    )
+    found = [url for url in results if url]
+    _LOGGER.debug(
+        "Scanned %d hosts in %s in %.2f s, found %d meter(s)",
+        len(hosts), network, time.perf_counter() - started, len(found),
+    )
+    if found:
+        # Leere Ergebnisse nicht merken: nach dem Anschließen eines Geräts soll ein neuer Scan es finden
+        _DISCOVERY_CACHE[cache_key] = (time.monotonic(), found)
+    else:
+        _DISCOVERY_CACHE.pop(cache_key, None)
+    return list(found)
@@ -0,0 +1,158 @@
+"""Incremental health scoring and stale-data detection of one meter."""
+from typing import Any
+
+from .const import (
+    HEALTH_REBOOT_PENALTY_SECONDS,
+    HEALTH_SKEW_TOLERANCE_PERCENT,
+    KEY_HEALTH_SCORE,
+    KEY_DATA_STALE,
+    KEY_SAMPLE_RATE,
+    KEY_CLOCK_SKEW,
+    KEY_METER_REBOOTS,
+    KEY_POLL_ROUND_TRIP_TIME,
+    KEY_POLL_ROUND_TRIP_JITTER,
+)
+
+# Glättungsfaktoren der gleitenden Mittelwerte
+_ALPHA_RTT = 1 / 8 # wie SRTT bei TCP (RFC 6298)
+_ALPHA_JITTER = 1 / 16 # wie der Interarrival-Jitter von RTP (RFC 3550)
+_ALPHA_FAST = 0.3
+_ALPHA_SLOW = 0.02
+_ALPHA_FAILURE = 0.1
+# Abtastrate gilt als eingebrochen, wenn der schnelle Mittelwert unter diesen Anteil des langsamen fällt
+_SAMPLE_RATE_DROP = 0.5
+
+
+def _ewma(average: float | None, value: float, alpha: float) -> float:
+    return value if average is None else average + alpha * (value - average)
+
+
+class MeterHealth:
+    """Track whether a meter's counters advance as expected between polls.
+
+    SAMPLES and TIME (operating milliseconds) are compared with the poll wall-clock
+    time to detect frozen, rebooted and clock-skewed meters. Only running averages
+    and the previous poll are kept, so memory use is constant.
+    """
+
+    __slots__ = (
+        "last_poll", "last_samples", "last_time_ms", "last_progress",
+        "rtt", "rtt_jitter", "_last_rtt", "sample_rate", "_sample_rate_slow",
+        "time_ratio", "failure_rate", "reboots", "last_reboot", "frozen_polls",
+    )
+
+    def __init__(self) -> None:
+        self.last_poll: float | None = None # Wanduhrzeit der letzten erfolgreichen Abfrage
+        self.last_samples: int | None = None
+        self.last_time_ms: float | None = None
+        self.last_progress: float | None = None # Wanduhrzeit, zu der die Zähler zuletzt weiterliefen
+        self.rtt: float | None = None
+        self.rtt_jitter = 0.0
+        self._last_rtt: float | None = None
+        self.sample_rate: float | None = None # Samples pro Sekunde (schneller Mittelwert)
+        self._sample_rate_slow: float | None = None
+        self.time_ratio: float | None = None # Betriebszeit-Fortschritt / Wanduhr-Fortschritt
+        self.failure_rate = 0.0
+        self.reboots = 0
+        self.last_reboot: float | None = None
+        self.frozen_polls = 0
+
+    def add_poll(self, timestamp: float, rtt: float, samples: Any, time_ms: Any) -> None:
+        """Record a successful poll with its round-trip time and the meter counters."""
+        self.failure_rate = _ewma(self.failure_rate, 0.0, _ALPHA_FAILURE)
+        if self._last_rtt is not None:
+            self.rtt_jitter += _ALPHA_JITTER * (abs(rtt - self._last_rtt) - self.rtt_jitter)
+        self._last_rtt = rtt
+        self.rtt = _ewma(self.rtt, rtt, _ALPHA_RTT)
+
+        if isinstance(samples, bool) or not isinstance(samples, int):
+            samples = None
+        if isinstance(time_ms, bool) or not isinstance(time_ms, (int, float)):
+            time_ms = None
+        if samples is None and time_ms is None:
+            # Ohne Zähler lässt sich nur der Erfolg der Abfrage bewerten
+            self.last_progress = timestamp
+            self.last_poll = timestamp
+            return
+
+        if self.last_poll is None or timestamp <= self.last_poll:
+            self.last_progress = timestamp # Erste Abfrage: Ausgangswerte
+        elif (
+            (samples is not None and self.last_samples is not None and samples < self.last_samples)
+            or (time_ms is not None and self.last_time_ms is not None and time_ms < self.last_time_ms)
+        ):
+            # Zähler sind zurückgelaufen: das Gerät wurde neu gestartet
+            self.reboots += 1
+            self.last_reboot = timestamp
+            self.frozen_polls = 0
+            self.last_progress = timestamp
+        else:
+            elapsed = timestamp - self.last_poll
+            samples_delta = samples - self.last_samples if samples is not None and self.last_samples is not None else None
+            time_delta = time_ms - self.last_time_ms if time_ms is not None and self.last_time_ms is not None else None
+            if samples_delta or time_delta:
+                self.frozen_polls = 0
+                self.last_progress = timestamp
+            else:
+                self.frozen_polls += 1
+            if samples_delta is not None:
+                rate = samples_delta / elapsed
+                self.sample_rate = _ewma(self.sample_rate, rate, _ALPHA_FAST)
+                self._sample_rate_slow = _ewma(self._sample_rate_slow, rate, _ALPHA_SLOW)
+            if time_delta:
+                self.time_ratio = _ewma(self.time_ratio, time_delta / 1000 / elapsed, _ALPHA_SLOW)
+
+        self.last_poll = timestamp
+        self.last_samples = samples
+        self.last_time_ms = time_ms
+
+    def add_failure(self) -> None:
+        """Record a failed poll."""
+        self.failure_rate = _ewma(self.failure_rate, 1.0, _ALPHA_FAILURE)
+
+    def is_stale(self, now: float, stale_after: float) -> bool:
+        """Return True if the counters have not advanced for stale_after seconds."""
+        return self.last_progress is not None and now - self.last_progress > stale_after
+
+    @property
+    def clock_skew(self) -> float | None:
+        """Deviation of the meter's operating time from wall-clock time, in percent."""
+        if self.time_ratio is None:
+            return None
+        return (self.time_ratio - 1) * 100
+
+    def score(self, now: float, stale_after: float) -> int | None:
+        """Return a health score from 0 (stale) to 100."""
+        if self.last_progress is None:
+            return None
+        if self.is_stale(now, stale_after):
+            return 0
+        score = 100.0 - 50 * self.failure_rate
+        score -= min(20.0, 20.0 * self.frozen_polls)
+        skew = self.clock_skew
+        if skew is not None and abs(skew) > HEALTH_SKEW_TOLERANCE_PERCENT:
+            score -= min(20.0, 4 * abs(skew))
+        if (
+            self.sample_rate is not None
+            and self._sample_rate_slow
+            and self.sample_rate < self._sample_rate_slow * _SAMPLE_RATE_DROP
+        ):
+            score -= 15
+        if self.last_reboot is not None and now - self.last_reboot < HEALTH_REBOOT_PENALTY_SECONDS:
+            score -= 10
+        if self.rtt:
+            # Jitter relativ zur mittleren Antwortzeit, höchstens 15 Punkte
+            score -= min(15.0, 15 * self.rtt_jitter / self.rtt)
+        return max(0, min(100, round(score)))
+
+    def as_dict(self, now: float, stale_after: float) -> dict[str, Any]:
+        """Return the published health values."""
+        return {
+            KEY_HEALTH_SCORE: self.score(now, stale_after),
+            KEY_DATA_STALE: self.is_stale(now, stale_after),
+            KEY_SAMPLE_RATE: self.sample_rate,
+            KEY_CLOCK_SKEW: self.clock_skew,
+            KEY_METER_REBOOTS: self.reboots,
+            KEY_POLL_ROUND_TRIP_TIME: self.rtt * 1000 if self.rtt is not None else None,
+            KEY_POLL_ROUND_TRIP_JITTER: self.rtt_jitter * 1000,
+        }
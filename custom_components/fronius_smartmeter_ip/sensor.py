@@ -1,7 +1,10 @@
 """Sensor platform for Fronius Smartmeter IP."""
+import asyncio
+import json
 import logging
 import math
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
 from typing import Any, cast, Tuple
 
 import httpx
@@ -16,11 +19,12 @@ from homeassistant.components.sensor import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_URL,
-    CONF_USERNAME,
-    CONF_PASSWORD,
+    EntityCategory,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity, # Wird von FroniusSmartmeterEntity verwendet
     DataUpdateCoordinator, # Wird von FroniusSmartmeterDataCoordinator verwendet
@@ -28,15 +32,55 @@ from homeassistant.helpers.update_coordinator import (
 )
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.util import dt as dt_util
+from homeassistant.util.ssl import client_context
+
+from .analytics import add_phasor_analytics
+from .archive import ColumnArchive
+from .demand import DemandTracker
+from .health import MeterHealth
+from .snapshot import SnapshotStore
 
 from .const import (
     DOMAIN,
-    DEFAULT_MEASUREMENTS_INTERVAL_SECONDS,
-    DEFAULT_CONFIG_INTERVAL_SECONDS,
-    API_PATH_MEASUREMENTS,
-    API_PATH_CONFIG,
-    API_QUERY_PARAMS,
     SENSOR_NAME_PREFIX,
+    DEMAND_CHANNELS,
+    DEMAND_STATE_PREFIX,
+    KEY_DEMAND_LAST_INTERVAL,
+    KEY_DEMAND_FORECAST,
+    KEY_DEMAND_MONTHLY_PEAK,
+    CONF_PHASE_DEVICES,
+    DEFAULT_PHASE_DEVICES,
+    KEY_PHASES,
+    PHASE_NAMES,
+    MIN_REFRESH_AGE_SECONDS,
+    ATTR_RESTORED,
+    ATTR_RESTORED_AT,
+    SNAPSHOT_MAX_AGE_SECONDS,
+    CONF_CONNECT_TIMEOUT,
+    CONF_READ_TIMEOUT,
+    CONF_MAX_CONNECTIONS,
+    CONF_KEY_GROUPS,
+    CONF_DEADBAND_PERCENT,
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_DEADBAND_PERCENT,
+    CONF_OFFLOAD_DECODE,
+    DEFAULT_OFFLOAD_DECODE,
+    DEFAULT_KEY_GROUPS,
+    KEY_GROUPS,
+    DEADBAND_EXEMPT_KEYS,
+    CONF_UNAVAILABLE_WHEN_STALE,
+    DEFAULT_UNAVAILABLE_WHEN_STALE,
+    HEALTH_STALE_INTERVALS,
+    HEALTH_STALE_MIN_SECONDS,
+    HEALTH_REFRESH_SECONDS,
+    KEY_HEALTH_SCORE,
+    KEY_SAMPLE_RATE,
+    KEY_CLOCK_SKEW,
+    KEY_METER_REBOOTS,
+    KEY_POLL_ROUND_TRIP_TIME,
+    KEY_POLL_ROUND_TRIP_JITTER,
 
     # Einheiten (wie in const.py definiert, egal ob HA-Konstante oder String)
     UNIT_WATT,
@@ -159,6 +203,23 @@ from .const import (
     KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_C,
     KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_TOTAL,
     # Falls noch weitere spezifische Energie-Keys (ERT1 etc.) verwendet werden, hier auch importieren
+    KEY_VOLTAGE_SEQUENCE_POSITIVE, # Berechnete Phasor-Kennwerte
+    KEY_VOLTAGE_SEQUENCE_NEGATIVE,
+    KEY_VOLTAGE_SEQUENCE_ZERO,
+    KEY_VOLTAGE_UNBALANCE,
+    KEY_PHASE_ROTATION,
+    PHASE_ROTATION_POSITIVE,
+    PHASE_ROTATION_NEGATIVE,
+    KEY_DISPLACEMENT_POWER_FACTOR_A,
+    KEY_DISPLACEMENT_POWER_FACTOR_B,
+    KEY_DISPLACEMENT_POWER_FACTOR_C,
+    KEY_DISTORTION_POWER_FACTOR_A,
+    KEY_DISTORTION_POWER_FACTOR_B,
+    KEY_DISTORTION_POWER_FACTOR_C,
+    KEY_DISTORTION_POWER_A,
+    KEY_DISTORTION_POWER_B,
+    KEY_DISTORTION_POWER_C,
+    KEY_DISTORTION_POWER_TOTAL,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -297,6 +358,56 @@ DETAILED_ENERGY_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(key=KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_B, name="Reverse Active Harmonic Energy L2", native_unit_of_measurement=UNIT_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL_INCREASING, entity_registry_enabled_default=False, suggested_display_precision=3),
     SensorEntityDescription(key=KEY_ENERGY_IMPORT_ACTIVE_HARMONIC_C, name="Reverse Active Harmonic Energy L3", native_unit_of_measurement=UNIT_WATT_HOUR, device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL_INCREASING, entity_registry_enabled_default=False, suggested_display_precision=3),
 )
+
+# Berechnete Phasor- und Leistungsdreieck-Kennwerte (standardmäßig deaktiviert)
+ANALYTICS_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(key=KEY_VOLTAGE_SEQUENCE_POSITIVE, name="Voltage Positive Sequence", native_unit_of_measurement=UNIT_VOLT, device_class=SensorDeviceClass.VOLTAGE, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_VOLTAGE_SEQUENCE_NEGATIVE, name="Voltage Negative Sequence", native_unit_of_measurement=UNIT_VOLT, device_class=SensorDeviceClass.VOLTAGE, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_VOLTAGE_SEQUENCE_ZERO, name="Voltage Zero Sequence", native_unit_of_measurement=UNIT_VOLT, device_class=SensorDeviceClass.VOLTAGE, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_VOLTAGE_UNBALANCE, name="Voltage Unbalance Factor", native_unit_of_measurement=UNIT_PERCENTAGE, icon="mdi:scale-unbalanced", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_PHASE_ROTATION, name="Phase Rotation", device_class=SensorDeviceClass.ENUM, options=[PHASE_ROTATION_POSITIVE, PHASE_ROTATION_NEGATIVE], icon="mdi:rotate-right", entity_registry_enabled_default=False),
+    SensorEntityDescription(key=KEY_DISPLACEMENT_POWER_FACTOR_A, name="Displacement Power Factor L1", icon="mdi:cosine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISPLACEMENT_POWER_FACTOR_B, name="Displacement Power Factor L2", icon="mdi:cosine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISPLACEMENT_POWER_FACTOR_C, name="Displacement Power Factor L3", icon="mdi:cosine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_FACTOR_A, name="Distortion Power Factor L1", icon="mdi:sine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_FACTOR_B, name="Distortion Power Factor L2", icon="mdi:sine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_FACTOR_C, name="Distortion Power Factor L3", icon="mdi:sine-wave", state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=3),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_A, name="Distortion Power L1", native_unit_of_measurement=UNIT_VOLT_AMPERE, device_class=SensorDeviceClass.APPARENT_POWER, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=1),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_B, name="Distortion Power L2", native_unit_of_measurement=UNIT_VOLT_AMPERE, device_class=SensorDeviceClass.APPARENT_POWER, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=1),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_C, name="Distortion Power L3", native_unit_of_measurement=UNIT_VOLT_AMPERE, device_class=SensorDeviceClass.APPARENT_POWER, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=1),
+    SensorEntityDescription(key=KEY_DISTORTION_POWER_TOTAL, name="Distortion Power Total", native_unit_of_measurement=UNIT_VOLT_AMPERE, device_class=SensorDeviceClass.APPARENT_POWER, state_class=SensorStateClass.MEASUREMENT, entity_registry_enabled_default=False, suggested_display_precision=1),
+)
+
+# Lastgang: 15-Minuten-Mittelwerte je Kanal (Phasen standardmäßig deaktiviert)
+_DEMAND_CHANNEL_NAMES = {"total": "Total", "a": "L1", "b": "L2", "c": "L3"}
+DEMAND_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = tuple(
+    SensorEntityDescription(
+        key=key_template.format(suffix),
+        name=f"{name} {_DEMAND_CHANNEL_NAMES[suffix]}",
+        native_unit_of_measurement=UNIT_WATT,
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:chart-timeline-variant",
+        entity_registry_enabled_default=suffix == "total",
+        suggested_display_precision=0,
+    )
+    for suffix in DEMAND_CHANNELS.values()
+    for key_template, name in (
+        (KEY_DEMAND_LAST_INTERVAL, "Demand Last 15 min"),
+        (KEY_DEMAND_FORECAST, "Demand Forecast 15 min"),
+        (KEY_DEMAND_MONTHLY_PEAK, "Demand Monthly Peak"),
+    )
+)
+
+# Zustand des Meters (health.py); Score standardmäßig aktiv, Detailwerte deaktiviert
+HEALTH_SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(key=KEY_HEALTH_SCORE, name="Health Score", icon="mdi:heart-pulse", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC),
+    SensorEntityDescription(key=KEY_SAMPLE_RATE, name="Sample Rate", native_unit_of_measurement="1/s", icon="mdi:speedometer", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False, suggested_display_precision=1),
+    SensorEntityDescription(key=KEY_CLOCK_SKEW, name="Clock Skew", native_unit_of_measurement=UNIT_PERCENTAGE, icon="mdi:clock-alert-outline", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False, suggested_display_precision=2),
+    SensorEntityDescription(key=KEY_METER_REBOOTS, name="Meter Reboots", icon="mdi:restart", state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False),
+    SensorEntityDescription(key=KEY_POLL_ROUND_TRIP_TIME, name="Poll Round Trip Time", native_unit_of_measurement=UnitOfTime.MILLISECONDS, device_class=SensorDeviceClass.DURATION, state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False, suggested_display_precision=0),
+    SensorEntityDescription(key=KEY_POLL_ROUND_TRIP_JITTER, name="Poll Round Trip Jitter", native_unit_of_measurement=UnitOfTime.MILLISECONDS, device_class=SensorDeviceClass.DURATION, state_class=SensorStateClass.MEASUREMENT, entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False, suggested_display_precision=1),
+)
 # --- Ende der Sensorbeschreibungen ---
 
 async def async_setup_entry(
@@ -305,42 +416,40 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the Fronius Smartmeter IP sensors from a config entry."""
-    config = entry.data
-    base_url = config[CONF_URL].rstrip('/')
-    username = config.get(CONF_USERNAME)
-    password = config.get(CONF_PASSWORD)
-    auth_tuple: Tuple[str, str] | None = (username, password) if username and password else None
+    # Verwende die in __init__.py erstellten Koordinatoren, statt eigene (doppelte) Instanzen anzulegen
+    domain_data = hass.data.get(DOMAIN, {}).get(entry.entry_id, {})
+    measurements_coordinator = domain_data.get('measurements_coordinator')
+    config_coordinator = domain_data.get('config_coordinator')
 
-    device_name_suffix = base_url.split('//')[-1].split(':')[0]
-    device_info = DeviceInfo(
-        identifiers={(DOMAIN, entry.entry_id)},
-        name=f"{SENSOR_NAME_PREFIX} ({device_name_suffix})",
-        manufacturer="Fronius (Custom)",
-        model="Smartmeter IP API",
-        configuration_url=base_url,
-    )
+    if not measurements_coordinator or not config_coordinator:
+        _LOGGER.error("Coordinators not found for sensor setup. Ensure they are set up in __init__.py.")
+        return
 
-    measurements_coordinator = FroniusSmartmeterDataCoordinator(
-        hass, "Fronius Measurements", f"{base_url}{API_PATH_MEASUREMENTS}",
-        auth_tuple, API_QUERY_PARAMS, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS, is_measurements=True
-    )
-    config_coordinator = FroniusSmartmeterDataCoordinator(
-        hass, "Fronius Configuration", f"{base_url}{API_PATH_CONFIG}",
-        auth_tuple, API_QUERY_PARAMS, DEFAULT_CONFIG_INTERVAL_SECONDS
-    )
+    phase_devices = entry.options.get(CONF_PHASE_DEVICES, DEFAULT_PHASE_DEVICES)
+    device_info = build_device_info(entry)
+    phase_device_infos = {phase: build_device_info(entry, phase) for phase in PHASE_NAMES}
 
-    await measurements_coordinator.async_config_entry_first_refresh()
-    await config_coordinator.async_config_entry_first_refresh()
+    def _device_info_for(key: str) -> DeviceInfo:
+        # Optional: Entitäten einer Phase hängen an einem eigenen Phasen-Gerät
+        if phase_devices and key in KEY_PHASES:
+            return phase_device_infos[KEY_PHASES[key]]
+        return device_info
 
     entities_to_add: list[SensorEntity] = []
 
-    # Füge zuerst die primären Sensoren hinzu
-    for description in SENSOR_DESCRIPTIONS:
-        entities_to_add.append(FroniusSmartmeterSensor(measurements_coordinator, description, device_info, entry.entry_id))
-    
-    # Füge dann die detaillierten Energie-Sensoren hinzu (meist standardmäßig deaktiviert)
-    for description in DETAILED_ENERGY_SENSOR_DESCRIPTIONS:
-        entities_to_add.append(FroniusSmartmeterSensor(measurements_coordinator, description, device_info, entry.entry_id))
+    # Füge zuerst die primären Sensoren hinzu, dann die detaillierten Energie-Sensoren (meist standardmäßig deaktiviert),
+    # die berechneten Phasor-Kennwerte (standardmäßig deaktiviert) und die Lastgang-Werte
+    for description in (
+        *SENSOR_DESCRIPTIONS, *DETAILED_ENERGY_SENSOR_DESCRIPTIONS, *ANALYTICS_SENSOR_DESCRIPTIONS, *DEMAND_SENSOR_DESCRIPTIONS
+    ):
+        entities_to_add.append(
+            FroniusSmartmeterSensor(measurements_coordinator, description, _device_info_for(description.key), entry.entry_id)
+        )
+
+    for description in HEALTH_SENSOR_DESCRIPTIONS:
+        entities_to_add.append(
+            FroniusSmartmeterHealthSensor(measurements_coordinator, description, device_info, entry.entry_id)
+        )
 
     cfg_sensor_desc = SensorEntityDescription(key="configuration_data", name="Configuration Data", icon="mdi:cog-outline")
     entities_to_add.append(FroniusSmartmeterConfigSensor(config_coordinator, cfg_sensor_desc, device_info, entry.entry_id))
@@ -348,66 +457,362 @@ async def async_setup_entry(
     async_add_entities(entities_to_add)
 
 
+def _local_month(timestamp: float) -> int:
+    """Return a month index in local time, used for the monthly demand peak."""
+    moment = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+    return moment.year * 12 + moment.month - 1
+
+
+def decode_payload(
+    raw: bytes, is_measurements: bool, excluded_keys: frozenset[str], source: str
+) -> dict[str, Any]:
+    """Decode a raw API response and add the derived values.
+
+    Runs either on the event loop or in an executor thread, so it must not touch hass.
+    """
+    data = cast(dict[str, Any], json.loads(raw))
+    if excluded_keys and isinstance(data, dict):
+        data = {key: value for key, value in data.items() if key not in excluded_keys}
+    if _LOGGER.isEnabledFor(logging.DEBUG): # str(data) nur bauen, wenn es auch geloggt wird
+        text = str(data)
+        _LOGGER.debug("Data from %s: %s", source, text[:800] + "..." if len(text) > 800 else text) # Log more data
+
+    if is_measurements and isinstance(data, dict):
+        if KEY_CURRENT_A in data: # Stromgruppe kann über die Options abgewählt sein
+            ia = float(data.get(KEY_CURRENT_A, 0) or 0)
+            ib = float(data.get(KEY_CURRENT_B, 0) or 0)
+            ic = float(data.get(KEY_CURRENT_C, 0) or 0)
+            data[KEY_IMAX_CALCULATED] = math.ceil(max(ia, ib, ic, 0.1))
+        time_ms = data.get(KEY_OPERATING_TIME_MILLISECONDS) # Verwende korrigierten Schlüssel
+        if isinstance(time_ms, (int, float)):
+            data[KEY_OPERATING_TIME_SECONDS] = time_ms / 1000.0 # Verwende korrigierten Schlüssel
+        else:
+            data[KEY_OPERATING_TIME_SECONDS] = None
+        add_phasor_analytics(data)
+    return data
+
+
 class FroniusSmartmeterDataCoordinator(DataUpdateCoordinator[dict[str, Any]]):
     def __init__(
         self, hass: HomeAssistant, name: str, url: str,
         auth: Tuple[str, str] | None,
-        params: dict | None, interval_seconds: int, is_measurements: bool = False
+        params: dict | None, interval_seconds: int, is_measurements: bool = False,
+        options: dict[str, Any] | None = None,
     ):
         self.api_url = url
         self.auth_tuple = auth
         self.params = params
         self.is_measurements = is_measurements
-        self._client = httpx.AsyncClient(timeout=10)
+        self._apply_tuning(options or {})
+        # Zustand des gebündelten Listener-Dispatchs
+        self._dispatched_data: dict[str, Any] | None = None
+        self._dispatched_success: bool | None = None
+        self.last_dispatch_callbacks = 0
+        self.last_dispatch_duration = 0.0
+        self.last_decode_duration = 0.0
+        # Persistenz der letzten Messwerte; wird von __init__.py gesetzt
+        self.snapshot_store: SnapshotStore | None = None
+        self.data_restored = False
+        self.restored_at: float | None = None # Speicherzeitpunkt der wiederhergestellten Werte
+        self.archive: ColumnArchive | None = None # Spaltenarchiv; wird von __init__.py gesetzt
+        self.demand = DemandTracker(month_of=_local_month) if is_measurements else None
+        self.health = MeterHealth() if is_measurements else None
+        self._dispatched_stale = False
+        # Single-Flight: laufende Abfrage, Zeitpunkt der letzten erfolgreichen Abfrage und Zähler
+        self._inflight: asyncio.Task[dict[str, Any]] | None = None
+        self._last_fetch: float | None = None
+        self.coalesced_requests = 0
+        self.cached_responses = 0
         super().__init__(hass, _LOGGER, name=name, update_interval=timedelta(seconds=interval_seconds))
+        self._client = self._create_client()
+
+    def _apply_tuning(self, options: dict[str, Any]) -> None:
+        """Take over the performance related options of the config entry."""
+        self.connect_timeout = float(options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT_SECONDS))
+        self.read_timeout = float(options.get(CONF_READ_TIMEOUT, DEFAULT_READ_TIMEOUT_SECONDS))
+        self.max_connections = int(options.get(CONF_MAX_CONNECTIONS, DEFAULT_MAX_CONNECTIONS))
+        self.deadband_percent = float(options.get(CONF_DEADBAND_PERCENT, DEFAULT_DEADBAND_PERCENT))
+        self.offload_decode = bool(options.get(CONF_OFFLOAD_DECODE, DEFAULT_OFFLOAD_DECODE))
+        self.unavailable_when_stale = bool(options.get(CONF_UNAVAILABLE_WHEN_STALE, DEFAULT_UNAVAILABLE_WHEN_STALE))
+        enabled_groups = options.get(CONF_KEY_GROUPS, DEFAULT_KEY_GROUPS)
+        self.excluded_keys = frozenset(
+            key for group, keys in KEY_GROUPS.items() if group not in enabled_groups for key in keys
+        )
+
+    def _create_client(self) -> httpx.AsyncClient:
+        # Zwischengespeicherten SSL-Kontext von HA verwenden, statt bei jedem (Neu-)Laden die
+        # Zertifikate blockierend auf dem Event-Loop zu laden. Eigener Client (nicht create_async_httpx_client),
+        # da Timeouts und Limits pro Meter gelten und der Client in async_shutdown geschlossen wird.
+        return httpx.AsyncClient(
+            verify=client_context(),
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.max_connections),
+        )
+
+    async def async_apply_options(self, interval_seconds: int, options: dict[str, Any]) -> None:
+        """Apply changed options at runtime, without reloading the config entry."""
+        client_settings = (self.connect_timeout, self.read_timeout, self.max_connections)
+        self._apply_tuning(options)
+        if client_settings != (self.connect_timeout, self.read_timeout, self.max_connections):
+            old_client, self._client = self._client, self._create_client()
+            await old_client.aclose()
+        self._dispatched_data = None # Nächster Dispatch weckt alle Entitäten (geänderte Schlüsselgruppen)
+        self.update_interval = timedelta(seconds=interval_seconds)
+        self._last_fetch = None # Cache umgehen, damit neue Schlüsselgruppen sofort gelten
+        # Sofort abfragen, damit das neue Intervall ab jetzt gilt
+        await self.async_request_refresh()
+
+    async def async_shutdown(self) -> None:
+        """Stop polling, cancel a running fetch and close the HTTP client."""
+        await super().async_shutdown()
+        if self._inflight is not None:
+            self._inflight.cancel()
+        await self._client.aclose()
+
+    def stale_after(self) -> float:
+        """Seconds without advancing meter counters after which the data counts as stale."""
+        interval = self.update_interval.total_seconds() if self.update_interval is not None else 0
+        return max(HEALTH_STALE_MIN_SECONDS, HEALTH_STALE_INTERVALS * interval)
+
+    @property
+    def data_stale(self) -> bool:
+        """Return True if no advancing counters arrived for stale_after seconds (frozen meter or outage)."""
+        return self.health is not None and self.health.is_stale(time.time(), self.stale_after())
+
+    @callback
+    def async_restore_snapshot(self, data: dict[str, Any], saved_at: float) -> bool:
+        """Seed the coordinator with persisted data until the first fresh poll.
+
+        Returns False if the measurements were too old to be shown; the demand state is restored anyway.
+        """
+        if self.demand is not None:
+            self.demand.restore_state(data)
+        age = time.time() - saved_at
+        if not 0 <= age <= SNAPSHOT_MAX_AGE_SECONDS:
+            _LOGGER.info("Not restoring measurements of %s saved %.0f s ago", self.name, age)
+            return False
+        self.data = {key: value for key, value in data.items() if not key.startswith(DEMAND_STATE_PREFIX)}
+        self.data_restored = True
+        self.restored_at = saved_at
+        return True
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Write the states of all listeners whose data changed in one pass.
+
+        Only entities whose value changed are woken. Their states are written back to back within a
+        single event loop iteration, so callers scheduled by state changes (automations, templates)
+        see all values of one poll together and never a mix of old and new values.
+        """
+        started = time.perf_counter()
+        changed_keys = self._async_collect_changed_keys()
+        pending = [
+            update_callback
+            for update_callback, context in list(self._listeners.values())
+            # Listener ohne Kontext (z.B. Config-Sensor) werden immer aktualisiert
+            if changed_keys is None or context is None or context in changed_keys
+        ]
+        for update_callback in pending:
+            update_callback()
+        self.last_dispatch_callbacks = len(pending)
+        self.last_dispatch_duration = time.perf_counter() - started
+        _LOGGER.debug(
+            "Dispatched %d of %d listener updates for %s in %.2f ms",
+            len(pending), len(self._listeners), self.name, self.last_dispatch_duration * 1000,
+        )
+
+    @callback
+    def _async_collect_changed_keys(self) -> set[str] | None:
+        """Return the keys changed since the last dispatch, or None if every listener is due."""
+        data = self.data if isinstance(self.data, dict) else None
+        previous = self._dispatched_data
+        success_changed = self.last_update_success != self._dispatched_success
+        stale = self.data_stale
+        stale_changed = stale != self._dispatched_stale
+        self._dispatched_stale = stale
+        self._dispatched_data = dict(data) if data is not None else None
+        self._dispatched_success = self.last_update_success
+        if previous is None or data is None or success_changed or stale_changed:
+            return None # Verfügbarkeit aller Entitäten kann sich geändert haben
+        deadband = self.deadband_percent / 100
+        changed: set[str] = set()
+        for key, value in data.items():
+            if key not in previous:
+                changed.add(key)
+                continue
+            old_value = previous[key]
+            if old_value == value:
+                continue
+            if (
+                deadband
+                and key not in DEADBAND_EXEMPT_KEYS
+                and isinstance(value, (int, float))
+                and isinstance(old_value, (int, float))
+                and abs(value - old_value) <= abs(old_value) * deadband
+            ):
+                # Änderung innerhalb der Totzone: alten Referenzwert behalten, damit sich Drift aufsummiert
+                self._dispatched_data[key] = old_value
+                continue
+            changed.add(key)
+        changed.update(previous.keys() - data.keys())
+        return changed
 
     async def _async_update_data(self) -> dict[str, Any]:
+        """Fetch new data, joining a fetch in flight or answering from a fresh cache."""
+        if self._inflight is not None:
+            self.coalesced_requests += 1
+            return await asyncio.shield(self._inflight)
+        if (
+            self.data is not None
+            and self._last_fetch is not None
+            and time.monotonic() - self._last_fetch < self._min_refresh_age()
+        ):
+            # Abfrage kam direkt nach einer erfolgreichen Abfrage: das Gerät nicht erneut belasten
+            self.cached_responses += 1
+            return self.data
+        self._inflight = self.hass.async_create_task(self._async_fetch_data(), f"{self.name} fetch")
+        self._inflight.add_done_callback(self._async_clear_inflight)
+        return await asyncio.shield(self._inflight)
+
+    def _min_refresh_age(self) -> float:
+        if self.update_interval is None:
+            return MIN_REFRESH_AGE_SECONDS
+        # Bei sehr kurzen Intervallen dürfen reguläre Abfragen nie aus dem Cache bedient werden
+        return min(MIN_REFRESH_AGE_SECONDS, self.update_interval.total_seconds() / 2)
+
+    @callback
+    def _async_clear_inflight(self, task: asyncio.Task[dict[str, Any]]) -> None:
+        if self._inflight is task:
+            self._inflight = None
+        if not task.cancelled():
+            task.exception() # Fehler gilt als abgerufen, auch wenn kein Aufrufer mehr wartet
+
+    async def _async_fetch_data(self) -> dict[str, Any]:
         try:
+            requested = time.monotonic()
             response = await self._client.get(self.api_url, auth=self.auth_tuple, params=self.params)
+            round_trip = time.monotonic() - requested
             response.raise_for_status()
-            data = cast(dict[str, Any], response.json())
-            _LOGGER.debug("Data from %s: %s", self.api_url, str(data)[:800] + "..." if len(str(data)) > 800 else data) # Log more data
-
-            if self.is_measurements and isinstance(data, dict):
-                ia = float(data.get(KEY_CURRENT_A, 0) or 0)
-                ib = float(data.get(KEY_CURRENT_B, 0) or 0)
-                ic = float(data.get(KEY_CURRENT_C, 0) or 0)
-                data[KEY_IMAX_CALCULATED] = math.ceil(max(ia, ib, ic, 0.1))
-                time_ms = data.get(KEY_OPERATING_TIME_MILLISECONDS) # Verwende korrigierten Schlüssel
-                if isinstance(time_ms, (int, float)):
-                    data[KEY_OPERATING_TIME_SECONDS] = time_ms / 1000.0 # Verwende korrigierten Schlüssel
-                else:
-                    data[KEY_OPERATING_TIME_SECONDS] = None
+            started = time.perf_counter()
+            if self.offload_decode:
+                # Dekodieren und Berechnen im Executor; das Ergebnis-Dict wird ohne Kopie übernommen
+                data = await self.hass.async_add_executor_job(
+                    decode_payload, response.content, self.is_measurements, self.excluded_keys, self.api_url
+                )
+            else:
+                data = decode_payload(response.content, self.is_measurements, self.excluded_keys, self.api_url)
+            self.last_decode_duration = time.perf_counter() - started
+            if self.data_restored:
+                self.data_restored = False
+                self.restored_at = None
+                self._dispatched_data = None # Alle Entitäten wecken, damit das Restored-Attribut verschwindet
+            fetched_at = time.time()
+            if self.demand is not None and isinstance(data, dict):
+                self.demand.add_samples(fetched_at, data)
+            if self.archive is not None and isinstance(data, dict):
+                self.archive.async_append(fetched_at, data)
+            if self.health is not None and isinstance(data, dict):
+                self.health.add_poll(
+                    fetched_at, round_trip, data.get(KEY_SAMPLES), data.get(KEY_OPERATING_TIME_MILLISECONDS)
+                )
+            if self.snapshot_store is not None:
+                snapshot = data if self.demand is None else {**data, **self.demand.as_state()}
+                self.snapshot_store.async_schedule_save(snapshot)
+            self._last_fetch = time.monotonic()
+            _LOGGER.debug(
+                "Decoded %s %s in %.2f ms", self.name,
+                "in executor" if self.offload_decode else "on event loop", self.last_decode_duration * 1000,
+            )
             return data
         except httpx.HTTPStatusError as err:
+            self._record_failure()
             _LOGGER.error("HTTP error for %s (%s): %s", self.name, self.api_url, err) # Log coordinator name
             raise UpdateFailed(f"Error communicating with API ({self.name} - {self.api_url}): {err}") from err
         except (httpx.RequestError, httpx.TimeoutException) as err:
+            self._record_failure()
             _LOGGER.error("Request error for %s (%s): %s", self.name, self.api_url, err)
             raise UpdateFailed(f"Error communicating with API ({self.name} - {self.api_url}): {err}") from err
         except (ValueError, TypeError) as err:
+            self._record_failure()
             _LOGGER.error("JSON parsing error for %s (%s): %s", self.name, self.api_url, err)
             raise UpdateFailed(f"Invalid JSON response from API ({self.name} - {self.api_url}): {err}") from err
 
+    def _record_failure(self) -> None:
+        if self.health is not None:
+            self.health.add_failure()
+
+
+def build_device_info(entry: ConfigEntry, phase: str | None = None) -> DeviceInfo:
+    """Return the device info of a meter, or of one of its phase sub-devices."""
+    base_url = entry.data[CONF_URL].rstrip('/')
+    device_name_suffix = base_url.split('//')[-1].split(':')[0]
+    if phase is None:
+        return DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=f"{SENSOR_NAME_PREFIX} ({device_name_suffix})",
+            manufacturer="Fronius (Custom)",
+            model="Smartmeter IP API",
+            configuration_url=base_url,
+        )
+    return DeviceInfo(
+        identifiers={(DOMAIN, f"{entry.entry_id}_{phase}")},
+        name=f"{SENSOR_NAME_PREFIX} ({device_name_suffix}) {PHASE_NAMES[phase]}",
+        manufacturer="Fronius (Custom)",
+        model="Smartmeter IP API Phase",
+        via_device=(DOMAIN, entry.entry_id),
+    )
+
 
 class FroniusSmartmeterEntity(CoordinatorEntity[FroniusSmartmeterDataCoordinator]):
     _attr_has_entity_name = True
+    # Zusätzliche zeitgesteuerte Aktualisierung für Zustände, die von der Uhrzeit abhängen
+    _refresh_interval: timedelta | None = None
+
     def __init__(
         self,
         coordinator: FroniusSmartmeterDataCoordinator,
         description: SensorEntityDescription,
         device_info: DeviceInfo,
         entry_id: str,
+        data_key: str | None = None,
     ):
-        super().__init__(coordinator)
+        # Der Datenschlüssel dient als Dispatch-Kontext: die Entität wird nur geweckt, wenn sich dieser Wert ändert
+        super().__init__(coordinator, context=data_key or description.key)
         self.entity_description = description
         self._attr_device_info = device_info
         self._attr_unique_id = f"{DOMAIN}_{entry_id}_{description.key.lower()}" # Lowercase key for ID
 
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if self._refresh_interval is not None:
+            # Bei einem Ausfall ruft der Koordinator die Listener nach dem ersten Fehler nicht mehr auf
+            self.async_on_remove(async_track_time_interval(
+                self.hass, self._async_refresh_state, self._refresh_interval, name=f"{self.entity_id} refresh"
+            ))
+
+    @callback
+    def _async_refresh_state(self, _now: datetime) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        # Optional: eingefrorene Werte nicht weiter als aktuell anzeigen
+        if self.coordinator.unavailable_when_stale and self.coordinator.data_stale:
+            return False
+        return super().available
+
 
 class FroniusSmartmeterSensor(FroniusSmartmeterEntity, SensorEntity):
     entity_description: SensorEntityDescription
 
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        # Werte aus dem Snapshot sind veraltet, bis die erste Abfrage erfolgreich war
+        restored_at = self.coordinator.restored_at
+        if self.coordinator.data_restored and restored_at is not None:
+            return {ATTR_RESTORED: True, ATTR_RESTORED_AT: dt_util.utc_from_timestamp(restored_at).isoformat()}
+        return None
+
     @property
     def native_value(self) -> Any:
         if self.coordinator.data and isinstance(self.coordinator.data, dict):
@@ -451,6 +856,7 @@ class FroniusSmartmeterConfigSensor(FroniusSmartmeterEntity, SensorEntity):
         entry_id: str,
     ):
         super().__init__(coordinator, description, device_info, entry_id)
+        self.coordinator_context = None # Zeigt alle Konfigurationsdaten an, daher bei jedem Update wecken
         self._attr_extra_state_attributes: dict[str, Any] = {}
 
     @property
@@ -468,4 +874,31 @@ class FroniusSmartmeterConfigSensor(FroniusSmartmeterEntity, SensorEntity):
             }
         else:
             self._attr_extra_state_attributes = {}
-        super()._handle_coordinator_update()
\ No newline at end of file
+        super()._handle_coordinator_update()
+
+
+class FroniusSmartmeterHealthSensor(FroniusSmartmeterEntity, SensorEntity):
+    """Health value of the meter; stays available while polls fail or data is stale."""
+    entity_description: SensorEntityDescription
+    _refresh_interval = timedelta(seconds=HEALTH_REFRESH_SECONDS)
+
+    def __init__(
+        self,
+        coordinator: FroniusSmartmeterDataCoordinator,
+        description: SensorEntityDescription,
+        device_info: DeviceInfo,
+        entry_id: str,
+    ):
+        super().__init__(coordinator, description, device_info, entry_id)
+        self.coordinator_context = None # Zustand ändert sich auch ohne neue Messwerte
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.health is not None
+
+    @property
+    def native_value(self) -> Any:
+        health = self.coordinator.health
+        if health is None:
+            return None
+        return health.as_dict(time.time(), self.coordinator.stale_after()).get(self.entity_description.key)
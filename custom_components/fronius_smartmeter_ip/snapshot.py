@@ -0,0 +1,177 @@
+"""Compact persisted snapshot of the last decoded measurements."""
+import logging
+import os
+import struct
+import time
+from array import array
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from .const import DOMAIN, SNAPSHOT_SAVE_INTERVAL_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Aufbau: Header | Schlüssel (UTF-8, durch \0 getrennt) | Zeichenketten-Tabelle (ab Version 2) |
+# Typ-Bytes | Werte als float64 (bei Zeichenketten der Index in die Tabelle)
+_MAGIC = b"FSMS"
+_VERSION = 2
+_PREFIX = struct.Struct("<4sB") # Magic, Version
+_HEADER_V1 = struct.Struct("<4sBdHI") # ..., Zeitstempel, Anzahl Werte, Länge der Schlüssel
+_HEADER = struct.Struct("<4sBdHIHI") # ..., Anzahl und Länge der Zeichenketten
+_TYPE_FLOAT = 0
+_TYPE_INT = 1
+_TYPE_NONE = 2
+_TYPE_STR = 3
+_MAX_STRING_BYTES = 64 # Längere Texte (z.B. Log-Ausgaben) werden nicht persistiert
+
+
+def encode_snapshot(data: dict[str, Any], saved_at: float) -> bytes:
+    """Pack the numeric and short string values of a decoded payload into a compact binary blob."""
+    keys: list[str] = []
+    types = bytearray()
+    values = array("d")
+    strings: dict[str, int] = {} # Jede Zeichenkette (z.B. die Drehfeldrichtung) nur einmal speichern
+    for key, value in data.items():
+        if value is None:
+            types.append(_TYPE_NONE)
+            values.append(0.0)
+        elif isinstance(value, str):
+            if "\0" in value or len(value.encode()) > _MAX_STRING_BYTES:
+                continue
+            types.append(_TYPE_STR)
+            values.append(strings.setdefault(value, len(strings)))
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue # Listen, Dicts usw. werden nicht persistiert
+        elif isinstance(value, int):
+            types.append(_TYPE_INT)
+            values.append(float(value))
+        else:
+            types.append(_TYPE_FLOAT)
+            values.append(value)
+        keys.append(key)
+    key_blob = "\0".join(keys).encode()
+    string_blob = "\0".join(strings).encode()
+    header = _HEADER.pack(_MAGIC, _VERSION, saved_at, len(keys), len(key_blob), len(strings), len(string_blob))
+    return b"".join((header, key_blob, string_blob, bytes(types), values.tobytes()))
+
+
+def decode_snapshot(blob: bytes) -> tuple[float, dict[str, Any]]:
+    """Unpack a blob created by encode_snapshot into (saved_at, data)."""
+    try:
+        magic, version = _PREFIX.unpack_from(blob)
+        if magic != _MAGIC or version not in (1, _VERSION):
+            raise ValueError("Unknown snapshot format")
+        if version == 1:
+            _magic, _version, saved_at, count, key_len = _HEADER_V1.unpack_from(blob)
+            string_count = string_len = 0
+            offset = _HEADER_V1.size
+        else:
+            _magic, _version, saved_at, count, key_len, string_count, string_len = _HEADER.unpack_from(blob)
+            offset = _HEADER.size
+    except struct.error as err:
+        raise ValueError("Snapshot header is truncated") from err
+    keys = blob[offset:offset + key_len].decode().split("\0") if count else []
+    offset += key_len
+    strings = blob[offset:offset + string_len].decode().split("\0") if string_count else []
+    offset += string_len
+    types = blob[offset:offset + count]
+    offset += count
+    values = array("d")
+    values.frombytes(blob[offset:offset + count * 8])
+    if len(keys) != count or len(strings) != string_count or len(types) != count or len(values) != count:
+        raise ValueError("Snapshot is truncated")
+    data: dict[str, Any] = {}
+    for key, value_type, value in zip(keys, types, values):
+        if value_type == _TYPE_NONE:
+            data[key] = None
+        elif value_type == _TYPE_INT:
+            data[key] = int(value)
+        elif value_type == _TYPE_STR:
+            if not 0 <= value < string_count:
+                raise ValueError("Snapshot string index is out of range")
+            data[key] = strings[int(value)]
+        else:
+            data[key] = value
+    return saved_at, data
+
+
+def _write_atomic(path: str, blob: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(blob)
+    os.replace(tmp_path, path)
+
+
+def _read(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SnapshotStore:
+    """Persist the last measurements of one meter, written at most every save_interval seconds."""
+
+    def __init__(
+        self, hass: HomeAssistant, entry_id: str, save_interval: float = SNAPSHOT_SAVE_INTERVAL_SECONDS
+    ) -> None:
+        self.hass = hass
+        self.path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry_id}.snapshot")
+        self._save_interval = save_interval
+        self._pending: dict[str, Any] | None = None
+        self._last_save = 0.0 # time.monotonic() des letzten Schreibvorgangs
+        self._unsub_save: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> tuple[float, dict[str, Any]] | None:
+        """Load the persisted snapshot, or None if there is no usable one."""
+        blob = await self.hass.async_add_executor_job(_read, self.path)
+        if blob is None:
+            return None
+        try:
+            return decode_snapshot(blob)
+        except (ValueError, UnicodeDecodeError) as err:
+            _LOGGER.warning("Ignoring unreadable snapshot %s: %s", self.path, err)
+            return None
+
+    @callback
+    def async_schedule_save(self, data: dict[str, Any]) -> None:
+        """Remember the latest data and write it once the save interval has passed."""
+        self._pending = data
+        if self._unsub_save is not None:
+            return
+        delay = max(0.0, self._save_interval - (time.monotonic() - self._last_save))
+        self._unsub_save = async_call_later(self.hass, delay, self._async_handle_save)
+
+    async def _async_handle_save(self, _now: Any) -> None:
+        self._unsub_save = None
+        await self.async_flush()
+
+    async def async_flush(self) -> None:
+        """Write pending data immediately (used on shutdown and unload)."""
+        if self._unsub_save is not None:
+            self._unsub_save()
+            self._unsub_save = None
+        if self._pending is None:
+            return
+        blob = encode_snapshot(self._pending, time.time())
+        self._pending = None
+        self._last_save = time.monotonic()
+        try:
+            await self.hass.async_add_executor_job(_write_atomic, self.path, blob)
+        except OSError as err:
+            _LOGGER.warning("Could not write snapshot %s: %s", self.path, err)
+
+    async def async_remove(self) -> None:
+        """Delete the persisted snapshot."""
+        await self.hass.async_add_executor_job(_remove, self.path)
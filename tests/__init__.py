@@ -0,0 +1 @@
+"""Tests for the Fronius Smartmeter IP integration."""
@@ -0,0 +1,71 @@
+"""Fixtures for the Fronius Smartmeter IP tests."""
+import logging
+from collections.abc import AsyncGenerator, Generator
+from unittest.mock import PropertyMock, patch
+
+import pytest
+
+from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import Entity
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.fronius_smartmeter_ip.const import DOMAIN
+
+from .fake_meter import FakeMeter
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> Generator[None]:
+    """Load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture(autouse=True)
+def isolated_config_dir(hass: HomeAssistant, tmp_path) -> None:
+    """Write snapshots and archives to a temporary directory."""
+    hass.config.config_dir = str(tmp_path)
+    (tmp_path / ".storage").mkdir()
+
+
+@pytest.fixture
+async def fake_meter(socket_enabled: None) -> AsyncGenerator[FakeMeter]:
+    """Run a fake meter on an ephemeral localhost port."""
+    meter = FakeMeter()
+    await meter.start()
+    yield meter
+    await meter.stop()
+
+
+@pytest.fixture
+def all_entities_enabled() -> Generator[None]:
+    """Enable the entities that are disabled by default, as a fully configured meter would have."""
+    with patch.object(Entity, "entity_registry_enabled_default", new_callable=PropertyMock, return_value=True):
+        yield
+
+
+@pytest.fixture
+def production_loop(hass: HomeAssistant) -> Generator[None]:
+    """Measure without asyncio debug mode and debug logging, as in a normal installation."""
+    debug = hass.loop.get_debug()
+    levels = {name: logging.getLogger(name).level for name in ("", "custom_components", "homeassistant", "httpx")}
+    hass.loop.set_debug(False)
+    for name in levels:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    yield
+    hass.loop.set_debug(debug)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def create_entry(hass: HomeAssistant, base_url: str, options: dict | None = None) -> MockConfigEntry:
+    """Add a config entry for a meter at base_url."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=base_url.split("//")[-1],
+        unique_id=base_url,
+        data={CONF_URL: base_url, CONF_USERNAME: "", CONF_PASSWORD: ""},
+        options=options or {},
+    )
+    entry.add_to_hass(hass)
+    return entry
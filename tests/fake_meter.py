@@ -0,0 +1,94 @@
+"""Local HTTP server that mimics the API of a Fronius Smartmeter IP."""
+import asyncio
+import time
+from typing import Any
+
+from aiohttp import web
+
+from custom_components.fronius_smartmeter_ip import const
+from custom_components.fronius_smartmeter_ip.const import (
+    API_PATH_CONFIG,
+    API_PATH_MEASUREMENTS,
+    KEY_OPERATING_TIME_MILLISECONDS,
+    KEY_SAMPLES,
+    KEY_STATUS_RAW,
+    KEY_VOLTAGE_PHASE_ANGLE_A,
+    KEY_VOLTAGE_PHASE_ANGLE_B,
+    KEY_VOLTAGE_PHASE_ANGLE_C,
+)
+
+# Alle API-Schlüssel aus const.py (Großbuchstaben, z.B. "VA", "PT", "EFAA")
+API_KEYS = sorted({
+    value for name, value in vars(const).items()
+    if name.startswith("KEY_") and isinstance(value, str) and value.isupper()
+})
+_ANGLES = {KEY_VOLTAGE_PHASE_ANGLE_A: 0.0, KEY_VOLTAGE_PHASE_ANGLE_B: -120.0, KEY_VOLTAGE_PHASE_ANGLE_C: 120.0}
+
+
+class FakeMeter:
+    """Serve measurements under any path prefix, so one server can act as many meters."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> None:
+        self.host = host
+        self.port = port
+        self.delay = delay # Antwortverzögerung in Sekunden
+        self.status = 200
+        self.frozen = False # Zähler SAMPLES/TIME nicht weiterlaufen lassen
+        self.sample_rate = 50 # Samples pro Sekunde
+        self.clock_rate = 1.0 # Fortschritt von TIME relativ zur Wanduhr (1.05 = 5 % zu schnell)
+        self.requests = 0
+        self.samples = 1000
+        self.time_ms = 3_600_000
+        self.tick = 0
+        self.last_measurements: dict[str, Any] | None = None # Zuletzt ausgelieferte Messwerte
+        self._last_request: float | None = None
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def measurements(self) -> dict[str, Any]:
+        """Return the next measurements payload; most values change on every call."""
+        now = time.monotonic()
+        if not self.frozen:
+            elapsed = 10.0 if self._last_request is None else now - self._last_request
+            self.samples += max(1, int(elapsed * self.sample_rate))
+            self.time_ms += max(1, int(elapsed * 1000 * self.clock_rate))
+            self.tick += 1
+        self._last_request = now
+        data: dict[str, Any] = {
+            key: round(100 + index + (self.tick % 7) * 0.5, 3) for index, key in enumerate(API_KEYS)
+        }
+        data.update(_ANGLES)
+        data[KEY_SAMPLES] = self.samples
+        data[KEY_OPERATING_TIME_MILLISECONDS] = self.time_ms
+        data[KEY_STATUS_RAW] = 0x77
+        return data
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        if request.path.endswith(API_PATH_CONFIG):
+            return web.json_response({"SERIAL": "12345678", "FIRMWARE": "1.0"})
+        if request.path.endswith(API_PATH_MEASUREMENTS):
+            self.last_measurements = self.measurements()
+            return web.json_response(self.last_measurements)
+        return web.Response(status=404)
@@ -0,0 +1,184 @@
+"""Tests for the phasor and power-triangle analytics."""
+import math
+
+import pytest
+
+from custom_components.fronius_smartmeter_ip.analytics import add_phasor_analytics
+from custom_components.fronius_smartmeter_ip.const import (
+    KEY_ACTIVE_POWER_A,
+    KEY_ACTIVE_POWER_B,
+    KEY_ACTIVE_POWER_TOTAL,
+    KEY_APPARENT_POWER_A,
+    KEY_APPARENT_POWER_B,
+    KEY_APPARENT_POWER_TOTAL,
+    KEY_DISPLACEMENT_POWER_FACTOR_A,
+    KEY_DISPLACEMENT_POWER_FACTOR_B,
+    KEY_DISTORTION_POWER_A,
+    KEY_DISTORTION_POWER_B,
+    KEY_DISTORTION_POWER_FACTOR_A,
+    KEY_DISTORTION_POWER_FACTOR_B,
+    KEY_DISTORTION_POWER_TOTAL,
+    KEY_PHASE_ROTATION,
+    KEY_POWER_FACTOR_A,
+    KEY_POWER_FACTOR_B,
+    KEY_REACTIVE_POWER_A,
+    KEY_REACTIVE_POWER_B,
+    KEY_REACTIVE_POWER_TOTAL,
+    KEY_THD_CURRENT_A,
+    KEY_THD_CURRENT_B,
+    KEY_VOLTAGE_A,
+    KEY_VOLTAGE_B,
+    KEY_VOLTAGE_C,
+    KEY_VOLTAGE_PHASE_ANGLE_A,
+    KEY_VOLTAGE_PHASE_ANGLE_B,
+    KEY_VOLTAGE_PHASE_ANGLE_C,
+    KEY_VOLTAGE_SEQUENCE_NEGATIVE,
+    KEY_VOLTAGE_SEQUENCE_POSITIVE,
+    KEY_VOLTAGE_SEQUENCE_ZERO,
+    KEY_VOLTAGE_UNBALANCE,
+    PHASE_ROTATION_NEGATIVE,
+    PHASE_ROTATION_POSITIVE,
+)
+
+SEQUENCE_KEYS = (
+    KEY_VOLTAGE_SEQUENCE_ZERO, KEY_VOLTAGE_SEQUENCE_POSITIVE, KEY_VOLTAGE_SEQUENCE_NEGATIVE,
+    KEY_VOLTAGE_UNBALANCE, KEY_PHASE_ROTATION,
+)
+
+
+def _voltages(va: float, vb: float, vc: float, angles: tuple[float, float, float]) -> dict[str, float]:
+    return {
+        KEY_VOLTAGE_A: va, KEY_VOLTAGE_B: vb, KEY_VOLTAGE_C: vc,
+        KEY_VOLTAGE_PHASE_ANGLE_A: angles[0], KEY_VOLTAGE_PHASE_ANGLE_B: angles[1], KEY_VOLTAGE_PHASE_ANGLE_C: angles[2],
+    }
+
+
+def _analyse(data: dict) -> dict:
+    add_phasor_analytics(data)
+    return data
+
+
+def test_balanced_positive_sequence() -> None:
+    data = _analyse(_voltages(230.0, 230.0, 230.0, (0.0, -120.0, 120.0)))
+    assert data[KEY_VOLTAGE_SEQUENCE_POSITIVE] == pytest.approx(230.0)
+    assert data[KEY_VOLTAGE_SEQUENCE_NEGATIVE] == pytest.approx(0.0, abs=1e-9)
+    assert data[KEY_VOLTAGE_SEQUENCE_ZERO] == pytest.approx(0.0, abs=1e-9)
+    assert data[KEY_VOLTAGE_UNBALANCE] == pytest.approx(0.0, abs=1e-9)
+    assert data[KEY_PHASE_ROTATION] == PHASE_ROTATION_POSITIVE
+
+
+def test_balanced_negative_sequence() -> None:
+    # B und C vertauscht: Linksdrehfeld, das Mitsystem ist nur Rundungsrauschen
+    data = _analyse(_voltages(230.0, 230.0, 230.0, (0.0, 120.0, -120.0)))
+    assert data[KEY_VOLTAGE_SEQUENCE_POSITIVE] == pytest.approx(0.0, abs=1e-9)
+    assert data[KEY_VOLTAGE_SEQUENCE_NEGATIVE] == pytest.approx(230.0)
+    assert data[KEY_VOLTAGE_UNBALANCE] == pytest.approx(0.0, abs=1e-9)
+    assert data[KEY_PHASE_ROTATION] == PHASE_ROTATION_NEGATIVE
+
+
+def test_rotation_does_not_depend_on_reference_angle() -> None:
+    data = _analyse(_voltages(230.0, 230.0, 230.0, (37.0, -83.0, 157.0)))
+    assert data[KEY_VOLTAGE_SEQUENCE_POSITIVE] == pytest.approx(230.0)
+    assert data[KEY_PHASE_ROTATION] == PHASE_ROTATION_POSITIVE
+
+
+def test_unbalanced_magnitude() -> None:
+    # Nur Phase A um 30 V höher: V0 = V2 = 30/3, V1 = 230 + 30/3
+    data = _analyse(_voltages(260.0, 230.0, 230.0, (0.0, -120.0, 120.0)))
+    assert data[KEY_VOLTAGE_SEQUENCE_ZERO] == pytest.approx(10.0)
+    assert data[KEY_VOLTAGE_SEQUENCE_POSITIVE] == pytest.approx(240.0)
+    assert data[KEY_VOLTAGE_SEQUENCE_NEGATIVE] == pytest.approx(10.0)
+    assert data[KEY_VOLTAGE_UNBALANCE] == pytest.approx(10.0 / 240.0 * 100)
+
+
+def test_unbalanced_angle() -> None:
+    # Phase C um 10° verschoben: Komponenten aus den Phasoren von Hand gerechnet
+    data = _analyse(_voltages(230.0, 230.0, 230.0, (0.0, -120.0, 130.0)))
+    shift = 230.0 * abs(complex(math.cos(math.radians(10.0)), math.sin(math.radians(10.0))) - 1) / 3
+    assert data[KEY_VOLTAGE_SEQUENCE_ZERO] == pytest.approx(shift)
+    assert data[KEY_VOLTAGE_SEQUENCE_NEGATIVE] == pytest.approx(shift)
+    assert data[KEY_VOLTAGE_SEQUENCE_POSITIVE] == pytest.approx(
+        abs(2 + complex(math.cos(math.radians(10.0)), math.sin(math.radians(10.0)))) * 230.0 / 3
+    )
+    assert data[KEY_PHASE_ROTATION] == PHASE_ROTATION_POSITIVE
+
+
+def test_zero_voltage_has_no_unbalance() -> None:
+    data = _analyse(_voltages(0.0, 0.0, 0.0, (0.0, -120.0, 120.0)))
+    assert data[KEY_VOLTAGE_UNBALANCE] is None
+
+
+@pytest.mark.parametrize("missing", [KEY_VOLTAGE_C, KEY_VOLTAGE_PHASE_ANGLE_B])
+def test_sequence_needs_all_phasors(missing: str) -> None:
+    data = _voltages(230.0, 230.0, 230.0, (0.0, -120.0, 120.0))
+    del data[missing]
+    assert not set(SEQUENCE_KEYS) & set(_analyse(data))
+
+
+def test_sequence_ignores_non_numbers() -> None:
+    data = _voltages(230.0, 230.0, 230.0, (0.0, -120.0, 120.0))
+    data[KEY_VOLTAGE_B] = None
+    data[KEY_VOLTAGE_PHASE_ANGLE_C] = True
+    assert not set(SEQUENCE_KEYS) & set(_analyse(data))
+
+
+@pytest.mark.parametrize(
+    ("power_factor", "thd", "distortion", "displacement"),
+    [
+        (0.9, 0.0, 1.0, 0.9), # Ohne Oberschwingungen ist PF = cos φ
+        (0.6, 75.0, 0.8, 0.75), # 1 / sqrt(1 + 0,75²) = 0,8
+        (0.95, 75.0, 0.8, 1.0), # PF / 0,8 > 1: auf 1 begrenzt
+        (-0.95, 75.0, 0.8, -1.0), # Einspeisung: auf -1 begrenzt
+        (-0.4, 75.0, 0.8, -0.5),
+    ],
+)
+def test_power_factor_split(power_factor: float, thd: float, distortion: float, displacement: float) -> None:
+    data = _analyse({KEY_POWER_FACTOR_A: power_factor, KEY_THD_CURRENT_A: thd})
+    assert data[KEY_DISTORTION_POWER_FACTOR_A] == pytest.approx(distortion)
+    assert data[KEY_DISPLACEMENT_POWER_FACTOR_A] == pytest.approx(displacement)
+
+
+def test_power_factor_split_per_phase() -> None:
+    # Phase B ohne THD-Wert: nur Phase A wird aufgeteilt
+    data = _analyse({
+        KEY_POWER_FACTOR_A: 0.6, KEY_THD_CURRENT_A: 75.0, KEY_POWER_FACTOR_B: 0.9, KEY_THD_CURRENT_B: None,
+    })
+    assert data[KEY_DISPLACEMENT_POWER_FACTOR_A] == pytest.approx(0.75)
+    assert KEY_DISPLACEMENT_POWER_FACTOR_B not in data
+    assert KEY_DISTORTION_POWER_FACTOR_B not in data
+
+
+def test_distortion_power() -> None:
+    data = _analyse({
+        KEY_ACTIVE_POWER_A: 12.0, KEY_REACTIVE_POWER_A: 3.0, KEY_APPARENT_POWER_A: 13.0,
+        KEY_ACTIVE_POWER_TOTAL: -3000.0, KEY_REACTIVE_POWER_TOTAL: 400.0, KEY_APPARENT_POWER_TOTAL: 5000.0,
+    })
+    assert data[KEY_DISTORTION_POWER_A] == pytest.approx(4.0) # sqrt(169 - 144 - 9)
+    assert data[KEY_DISTORTION_POWER_TOTAL] == pytest.approx(math.sqrt(5000**2 - 3000**2 - 400**2))
+
+
+def test_distortion_power_never_negative() -> None:
+    # Durch Messtoleranzen kann S² kleiner als P² + Q² sein
+    data = _analyse({KEY_ACTIVE_POWER_A: 1000.0, KEY_REACTIVE_POWER_A: 100.0, KEY_APPARENT_POWER_A: 1000.0})
+    assert data[KEY_DISTORTION_POWER_A] == 0.0
+
+
+@pytest.mark.parametrize(
+    "triangle",
+    [
+        {KEY_ACTIVE_POWER_B: 12.0, KEY_REACTIVE_POWER_B: 3.0}, # S fehlt
+        {KEY_ACTIVE_POWER_B: 12.0, KEY_APPARENT_POWER_B: 13.0}, # Q fehlt
+        {KEY_ACTIVE_POWER_B: None, KEY_REACTIVE_POWER_B: 3.0, KEY_APPARENT_POWER_B: 13.0},
+        {KEY_ACTIVE_POWER_B: "12", KEY_REACTIVE_POWER_B: 3.0, KEY_APPARENT_POWER_B: 13.0},
+    ],
+)
+def test_distortion_power_needs_all_inputs(triangle: dict) -> None:
+    data = _analyse({
+        KEY_ACTIVE_POWER_A: 12, KEY_REACTIVE_POWER_A: 3, KEY_APPARENT_POWER_A: 13, **triangle,
+    })
+    assert data[KEY_DISTORTION_POWER_A] == pytest.approx(4.0) # Ganzzahlen werden wie Fließkommazahlen behandelt
+    assert KEY_DISTORTION_POWER_B not in data
+
+
+def test_empty_payload_is_unchanged() -> None:
+    assert _analyse({}) == {}
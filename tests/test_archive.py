@@ -0,0 +1,207 @@
+"""Tests for the columnar archive and the history export."""
+import csv
+import math
+import os
+import random
+import struct
+import zlib
+from array import array
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.setup import async_setup_component
+
+from custom_components.fronius_smartmeter_ip.archive import (
+    _append,
+    _shuffle,
+    archive_directory,
+    encode_block,
+    export_csv,
+    iter_blocks,
+    iter_columns,
+    iter_rows,
+)
+from custom_components.fronius_smartmeter_ip.const import (
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_END,
+    ATTR_FILENAME,
+    ATTR_KEYS,
+    ATTR_START,
+    CONF_ARCHIVE_ENABLED,
+    DOMAIN,
+    SERVICE_EXPORT_HISTORY,
+)
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+DAY = date(2024, 5, 1)
+MIDNIGHT = datetime(2024, 5, 1, tzinfo=timezone.utc)
+ROWS = 10
+
+
+def _block(index: int) -> bytes:
+    """Block with ROWS rows, one per second, starting index * ROWS seconds after midnight."""
+    first = int(MIDNIGHT.timestamp() * 1000) + index * ROWS * 1000
+    timestamps = array("q", range(first, first + ROWS * 1000, 1000))
+    return encode_block(timestamps, {
+        "PT": array("d", (index * ROWS + row for row in range(ROWS))),
+        "VA": array("d", [230.0] * ROWS),
+    })
+
+
+def _rows(directory: str, keys: list[str] | None = None) -> list[tuple[datetime, dict]]:
+    return list(iter_rows(directory, MIDNIGHT, MIDNIGHT + timedelta(days=1), keys))
+
+
+def _path(directory: str) -> str:
+    return os.path.join(directory, f"{DAY.isoformat()}.fsma")
+
+
+def test_round_trip(tmp_path) -> None:
+    directory = str(tmp_path)
+    for index in range(3):
+        _append(directory, DAY, _block(index))
+    rows = _rows(directory)
+    assert [row["PT"] for _timestamp, row in rows] == list(range(3 * ROWS))
+    assert rows[1][0] == MIDNIGHT + timedelta(seconds=1)
+    assert list(rows[0][1]) == ["PT", "VA"]
+    assert [row for _timestamp, row in _rows(directory, ["VA"])][0] == {"VA": 230.0}
+
+    # Zeitraum mitten in einem Block und Blöcke außerhalb werden übersprungen
+    selected = list(iter_rows(directory, MIDNIGHT + timedelta(seconds=15), MIDNIGHT + timedelta(seconds=22)))
+    assert [row["PT"] for _timestamp, row in selected] == list(range(15, 23))
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [230.0] * ROWS, # Konstant
+        [230.1, 229.9, 230.4, 231.0, 230.0, 229.5, 230.2, 230.3, 230.1, 230.0],
+        [1.234, -0.001, 5e-6, 123456.789, 0.0, 2.5, -7.125, 1e6, 3.0, 0.1], # Unterschiedliche Stellen
+        [0.0, -0.0, 1.5, 2.5, 0.0, 1.0, 2.0, 3.0, 4.0, 5.0], # -0.0 muss erhalten bleiben
+        [math.nan, math.nan, 1.0, 2.0, 3.0, math.inf, -math.inf, 4.0, 5.0, 6.0],
+        [2.0**60, 1.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0], # Nicht als skalierte Ganzzahl darstellbar
+        [math.pi * index for index in range(ROWS)],
+        [0.0, 1e12, -1e12, 0.5, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0], # Deltas brauchen 64 Bit
+    ],
+)
+def test_column_encodings_are_exact(tmp_path, values: list[float]) -> None:
+    path = tmp_path / "block.fsma"
+    path.write_bytes(encode_block(array("q", range(0, ROWS * 1000, 1000)), {"X": array("d", values)}))
+    [(_timestamps, columns)] = iter_blocks(str(path))
+    assert columns["X"].tobytes() == array("d", values).tobytes()
+
+
+def test_scaled_columns_are_smaller() -> None:
+    rng = random.Random(1)
+    timestamps = array("q", range(0, 360_000, 1000))
+    columns = {
+        "EFAA": array("d", (1_234_567.0 + index // 7 for index in range(360))),
+        "VA": array("d", (round(rng.gauss(230, 0.5), 1) for _ in range(360))),
+        "PT": array("d", (round(rng.uniform(-3000, 8000), 3) for _ in range(360))),
+    }
+    as_float = sum(len(zlib.compress(_shuffle(values.tobytes()))) for values in columns.values())
+    assert len(encode_block(timestamps, columns)) < as_float * 0.6
+
+
+def test_reads_version_2_blocks(tmp_path) -> None:
+    # Format vor der Delta-Kodierung: jede Spalte als float64 ohne Kodierungsbyte
+    timestamps = array("q", [1000, 2000, 3000])
+    deltas = zlib.compress(_shuffle(array("q", [1000, 1000, 1000]).tobytes()))
+    column = zlib.compress(_shuffle(array("d", [1.5, 2.5, 3.5]).tobytes()))
+    payload = b"".join((
+        struct.pack("<I", len(deltas)), deltas, struct.pack("<H", 2), b"PT", struct.pack("<I", len(column)), column
+    ))
+    fields = (3, 1, timestamps[0], timestamps[-1], len(payload))
+    crc = zlib.crc32(payload, zlib.crc32(struct.pack("<IIqqI", *fields)))
+    path = tmp_path / "2024-05-01.fsma"
+    path.write_bytes(struct.pack("<4sBIIqqII", b"FSMB", 2, *fields, crc) + payload)
+    assert [(list(stamps), list(columns["PT"])) for stamps, columns in iter_blocks(str(path))] == [
+        ([1000, 2000, 3000], [1.5, 2.5, 3.5])
+    ]
+
+
+def test_iter_columns_trims_to_range(tmp_path) -> None:
+    directory = str(tmp_path)
+    for index in range(3):
+        _append(directory, DAY, _block(index))
+    blocks = list(iter_columns(directory, MIDNIGHT + timedelta(seconds=15), MIDNIGHT + timedelta(seconds=22), ["PT"]))
+    assert [list(columns["PT"]) for _timestamps, columns in blocks] == [list(range(15, 20)), list(range(20, 23))]
+    assert blocks[0][0][0] == int((MIDNIGHT + timedelta(seconds=15)).timestamp() * 1000)
+
+
+@pytest.mark.parametrize("cut", [5, 30, 60, -1])
+def test_torn_append_keeps_intact_blocks(tmp_path, cut: int) -> None:
+    directory = str(tmp_path)
+    _append(directory, DAY, _block(0) + _block(1))
+    _append(directory, DAY, _block(2)[:cut]) # Abgebrochener Schreibvorgang, z.B. Stromausfall
+    assert [row["PT"] for _timestamp, row in _rows(directory)] == list(range(2 * ROWS))
+
+    # Ohne Reparatur wäre ein danach angehängter Block hinter dem kaputten verloren
+    _append(directory, DAY, _block(3), repair=True)
+    assert os.path.getsize(_path(directory)) == len(_block(0) + _block(1) + _block(3))
+    assert [row["PT"] for _timestamp, row in _rows(directory)] == [*range(2 * ROWS), *range(3 * ROWS, 4 * ROWS)]
+
+
+def test_damaged_block_stops_reading(tmp_path) -> None:
+    directory = str(tmp_path)
+    blob = bytearray(_block(0) + _block(1) + _block(2))
+    blob[len(_block(0)) + 60] ^= 0xFF # Ein Bit-Fehler in den Nutzdaten des zweiten Blocks
+    with open(_path(directory), "wb") as file:
+        file.write(blob)
+    assert [row["PT"] for _timestamp, row in _rows(directory)] == list(range(ROWS))
+
+
+def test_export_csv_with_torn_block(tmp_path) -> None:
+    directory = str(tmp_path / "archive")
+    _append(directory, DAY, _block(0))
+    _append(directory, DAY, _block(1)[:-7])
+    target = str(tmp_path / "export.csv")
+    assert export_csv(directory, target, MIDNIGHT, MIDNIGHT + timedelta(hours=1), ["PT"]) == ROWS
+    with open(target, encoding="utf-8") as file:
+        lines = list(csv.reader(file))
+    assert lines[0] == ["timestamp", "PT"]
+    assert lines[-1] == [(MIDNIGHT + timedelta(seconds=ROWS - 1)).isoformat(), "9.0"]
+
+
+def test_export_csv_missing_values(tmp_path) -> None:
+    directory = str(tmp_path / "archive")
+    timestamps = array("q", range(int(MIDNIGHT.timestamp() * 1000), int(MIDNIGHT.timestamp() * 1000) + 3000, 1000))
+    _append(directory, DAY, encode_block(timestamps, {"PT": array("d", [1.0, math.nan, 3.0]), "VA": array("d", [230.0] * 3)}))
+    target = str(tmp_path / "export.csv")
+    assert export_csv(directory, target, MIDNIGHT, MIDNIGHT + timedelta(hours=1), ["PT", "VA", "IA"]) == 3
+    with open(target, encoding="utf-8") as file:
+        lines = list(csv.reader(file))
+    assert [line[1:] for line in lines] == [["PT", "VA", "IA"], ["1.0", "230.0", ""], ["", "230.0", ""], ["3.0", "230.0", ""]]
+
+
+async def test_export_service(hass: HomeAssistant, fake_meter: FakeMeter, tmp_path) -> None:
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    entry = create_entry(hass, fake_meter.url, {CONF_ARCHIVE_ENABLED: True})
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    directory = archive_directory(hass, entry.entry_id)
+    await hass.async_add_executor_job(_append, directory, DAY, _block(0) + _block(1)[:-3])
+
+    service_data = {
+        ATTR_CONFIG_ENTRY_ID: entry.entry_id,
+        ATTR_START: MIDNIGHT,
+        ATTR_END: MIDNIGHT + timedelta(hours=1),
+        ATTR_FILENAME: str(tmp_path / "export.csv"),
+        ATTR_KEYS: ["PT"],
+    }
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_EXPORT_HISTORY, service_data, blocking=True, return_response=True
+    )
+    assert response == {"path": str(tmp_path / "export.csv"), "rows": ROWS}
+
+    # Schreibfehler werden als Fehler des Dienstes gemeldet
+    with pytest.raises(HomeAssistantError, match="Could not export"):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_EXPORT_HISTORY, {**service_data, ATTR_FILENAME: str(tmp_path)}, blocking=True
+        )
+    assert await hass.config_entries.async_unload(entry.entry_id)
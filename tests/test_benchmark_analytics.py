@@ -0,0 +1,50 @@
+"""Benchmark: cost of the derived phasor and power-triangle values for a fleet polled every second.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_analytics.py
+"""
+import json
+import time
+
+import pytest
+
+from custom_components.fronius_smartmeter_ip.analytics import add_phasor_analytics
+from custom_components.fronius_smartmeter_ip.sensor import decode_payload
+
+from .fake_meter import FakeMeter
+
+FLEET_SIZES = (1, 10, 50, 200)
+SECONDS = 20 # Simulierte Abfragen pro Meter (1 s Intervall)
+REPEATS = 5 # Schnellster Durchlauf zählt, das glättet Störungen durch andere Prozesse
+
+
+def _payloads(count: int) -> list[bytes]:
+    meter = FakeMeter()
+    return [json.dumps(meter.measurements()).encode() for _ in range(count)]
+
+
+def _timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+@pytest.mark.benchmark
+def test_analytics_per_second() -> None:
+    print(f"\n{SECONDS} polls per meter at 1 s, times per simulated second")
+    print(f"{'meters':>6} {'analytics':>10} {'decode':>10} {'share':>7} {'of 1 s':>7}")
+    for fleet in FLEET_SIZES:
+        raw = _payloads(fleet * SECONDS)
+        decoded = [json.loads(payload) for payload in raw]
+        analytics = min(_timed(lambda: [add_phasor_analytics(data) for data in decoded]) for _ in range(REPEATS))
+        assert all(data.get("phase_rotation") == "positive" for data in decoded)
+        # Zum Vergleich: die ganze Dekodierung einer Antwort, in der die Analyse enthalten ist
+        decode = min(
+            _timed(lambda: [decode_payload(payload, True, frozenset(), "benchmark") for payload in raw])
+            for _ in range(REPEATS)
+        )
+        analytics /= SECONDS
+        decode /= SECONDS
+        print(
+            f"{fleet:>6} {analytics * 1000:>8.2f}ms {decode * 1000:>8.2f}ms"
+            f" {analytics / decode * 100:>6.1f}% {decode * 100:>6.2f}%"
+        )
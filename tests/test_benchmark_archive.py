@@ -0,0 +1,129 @@
+"""Benchmark: size and read time of one month of archived 10 s measurements.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_archive.py
+"""
+import os
+import random
+import time
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.fronius_smartmeter_ip.archive import (
+    _BLOCK_HEADER,
+    _append,
+    _shuffle,
+    encode_block,
+    export_csv,
+    iter_columns,
+    iter_rows,
+)
+from custom_components.fronius_smartmeter_ip.const import ARCHIVE_BLOCK_ROWS, ARCHIVE_RETENTION_DAYS
+
+DAYS = 30
+ROWS_PER_DAY = 8640 # Alle 10 s
+COLUMNS = 150
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def _day_columns(rng: random.Random) -> dict[str, list[float]]:
+    """Columns shaped like the meter's values: counters, voltages, powers, factors and constants."""
+    columns: dict[str, list[float]] = {}
+    for index in range(COLUMNS):
+        kind = index % 5
+        if kind == 0: # Energiezähler in Wh
+            value = rng.uniform(1e5, 1e7)
+            values = []
+            for _ in range(ROWS_PER_DAY):
+                value += rng.choice((0, 0, 1, 2))
+                values.append(float(value))
+        elif kind == 1: # Spannung mit 0,1 V Auflösung
+            values = [round(rng.gauss(230, 0.8), 1) for _ in range(ROWS_PER_DAY)]
+        elif kind == 2: # Leistung/Strom mit 3 Nachkommastellen
+            value = rng.uniform(-3000, 8000)
+            values = []
+            for _ in range(ROWS_PER_DAY):
+                value += rng.gauss(0, 20)
+                values.append(round(value, 3))
+        elif kind == 3: # Frequenz, Leistungsfaktor
+            values = [round(rng.gauss(50, 0.02), 3) for _ in range(ROWS_PER_DAY)]
+        else: # Status, Konfiguration
+            values = [float(index)] * ROWS_PER_DAY
+        columns[f"K{index:03d}"] = values
+    return columns
+
+
+@pytest.fixture(scope="module")
+def month(tmp_path_factory) -> tuple[str, int, int, float]:
+    """Write DAYS daily files and return the directory, archive size, float64 size and write time."""
+    directory = str(tmp_path_factory.mktemp("archive"))
+    rng = random.Random(1)
+    day_columns = _day_columns(rng)
+    as_float = 0
+    encoding = 0.0
+    for day in range(DAYS):
+        midnight_ms = int((START + timedelta(days=day)).timestamp() * 1000)
+        for first in range(0, ROWS_PER_DAY, ARCHIVE_BLOCK_ROWS):
+            rows = range(first, first + ARCHIVE_BLOCK_ROWS)
+            timestamps = array("q", (midnight_ms + row * 10_000 for row in rows))
+            columns = {key: array("d", values[rows.start:rows.stop]) for key, values in day_columns.items()}
+            started = time.perf_counter()
+            blob = encode_block(timestamps, columns)
+            encoding += time.perf_counter() - started
+            # Zum Vergleich: alle Spalten als float64 (Format vor der Delta-Kodierung)
+            deltas = array("q", [timestamps[0]] + [10_000] * (len(timestamps) - 1))
+            as_float += _BLOCK_HEADER.size + 4 + len(zlib.compress(_shuffle(deltas.tobytes()))) + sum(
+                2 + len(key) + 4 + len(zlib.compress(_shuffle(values.tobytes()))) for key, values in columns.items()
+            )
+            _append(directory, (START + timedelta(days=day)).date(), blob)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return directory, size, as_float, encoding
+
+
+def _timed(function) -> tuple[float, object]:
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+@pytest.mark.benchmark
+def test_month_read(month: tuple[str, int, int, float], tmp_path) -> None:
+    directory, size, as_float, encoding = month
+    end = START + timedelta(days=DAYS) - timedelta(seconds=1)
+    keys = sorted(f"K{index:03d}" for index in range(COLUMNS))
+    rows_total = DAYS * ROWS_PER_DAY
+
+    def read_columns(selected):
+        count = 0
+        for timestamps, _columns in iter_columns(directory, START, end, selected):
+            count += len(timestamps)
+        return count
+
+    def read_rows(selected):
+        return sum(1 for _row in iter_rows(directory, START, end, selected))
+
+    results = []
+    for label, selected in (("1 column", keys[:1]), ("5 columns", keys[:5]), (f"{COLUMNS} columns", None)):
+        duration, count = _timed(lambda: read_columns(selected))
+        assert count == rows_total
+        results.append((f"iter_columns, {label}", duration))
+    duration, count = _timed(lambda: read_rows(keys[:1]))
+    assert count == rows_total
+    results.append(("iter_rows, 1 column", duration))
+    for selected in (keys[:2], keys[:10]):
+        target = str(tmp_path / "export.csv")
+        duration, count = _timed(lambda: export_csv(directory, target, START, end, selected))
+        assert count == rows_total
+        results.append((f"export_csv, {len(selected)} columns", duration))
+
+    raw = rows_total * (COLUMNS + 1) * 8
+    print(f"\n{DAYS} days x {ROWS_PER_DAY} rows x {COLUMNS} columns")
+    print(f"uncompressed       {raw / 1e6:>8.1f} MB")
+    print(f"float64 + zlib     {as_float / 1e6:>8.1f} MB ({raw / as_float:.1f}x)")
+    print(f"archive            {size / 1e6:>8.1f} MB ({raw / size:.1f}x), "
+          f"{size / DAYS * ARCHIVE_RETENTION_DAYS / 1e9:.2f} GB for {ARCHIVE_RETENTION_DAYS} days")
+    print(f"encoding           {encoding:>8.2f} s")
+    for label, duration in results:
+        print(f"{label:<26} {duration:>6.2f} s")
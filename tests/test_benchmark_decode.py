@@ -0,0 +1,107 @@
+"""Benchmark: event-loop lag with JSON decoding on the loop vs. in the executor.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_decode.py
+"""
+import asyncio
+import statistics
+import threading
+import time
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+
+from custom_components.fronius_smartmeter_ip.const import CONF_OFFLOAD_DECODE, DOMAIN
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+FLEET_SIZES = (1, 10, 50)
+ROUNDS = 20
+TICK = 0.001 # Periode des Messtakts in Sekunden
+
+
+@pytest.fixture
+async def threaded_meter(socket_enabled: None) -> AsyncGenerator[FakeMeter]:
+    """Run the fake meter on its own event loop, so that serving requests does not add to the lag."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    meter = FakeMeter()
+    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(meter.start(), loop))
+    yield meter
+    await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(meter.stop(), loop))
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+async def _ticker(lags: list[float], stop: asyncio.Event) -> None:
+    """Measure how late a short sleep wakes up, i.e. how long the loop was blocked."""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _measure(hass: HomeAssistant, coordinators: list) -> tuple[list[float], list[float], float]:
+    """Poll all meters ROUNDS times at once.
+
+    Returns the loop lag samples, the duration of each round and the mean time from the
+    response to the decoded data per poll (including the hand-off to the executor).
+    """
+    lags: list[float] = []
+    rounds: list[float] = []
+    decode = 0.0
+    stop = asyncio.Event()
+    ticker = hass.async_create_task(_ticker(lags, stop))
+    for _ in range(ROUNDS):
+        for coordinator in coordinators:
+            coordinator._last_fetch = None # Nicht aus dem Cache der Einzelabfrage antworten
+        started = time.perf_counter()
+        await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+        rounds.append(time.perf_counter() - started)
+        decode += sum(coordinator.last_decode_duration for coordinator in coordinators)
+    stop.set()
+    await ticker
+    return lags, rounds, decode / (ROUNDS * len(coordinators))
+
+
+@pytest.mark.benchmark
+async def test_decode_loop_lag(
+    hass: HomeAssistant, threaded_meter: FakeMeter, all_entities_enabled: None, production_loop: None
+) -> None:
+    print(f"\n{ROUNDS} simultaneous polls of every meter, loop lag sampled every {TICK * 1000:.0f} ms")
+    print(
+        f"{'meters':>6} {'decoding':>9} {'decoded ms':>10} {'round ms':>9}"
+        f" {'lag p50 ms':>11} {'lag p99 ms':>11} {'lag max ms':>11}"
+    )
+    results = {}
+    for meters in FLEET_SIZES:
+        for offload in (False, True):
+            entries = [
+                create_entry(hass, f"{threaded_meter.url}/{meters}/{offload}/meter{index}", {CONF_OFFLOAD_DECODE: offload})
+                for index in range(meters)
+            ]
+            for entry in entries:
+                if entry.state is not ConfigEntryState.LOADED: # Erstes Setup lädt alle Einträge
+                    assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+            coordinators = [hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"] for entry in entries]
+
+            await _measure(hass, coordinators) # Aufwärmen
+            lags, rounds, decode = await _measure(hass, coordinators)
+            quantiles = statistics.quantiles(lags, n=100, method="inclusive")
+            results[meters, offload] = max(lags)
+            print(
+                f"{meters:>6} {'executor' if offload else 'loop':>9} {decode * 1000:>10.3f}"
+                f" {statistics.mean(rounds) * 1000:>9.1f} {quantiles[49] * 1000:>11.2f}"
+                f" {quantiles[98] * 1000:>11.2f} {max(lags) * 1000:>11.2f}"
+            )
+
+            for entry in entries:
+                assert await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+    assert all(lag > 0 for lag in results.values())
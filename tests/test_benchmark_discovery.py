@@ -0,0 +1,65 @@
+"""Benchmark: duration of a /24 subnet scan against fake meters on loopback addresses.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_discovery.py
+"""
+import time
+from collections.abc import AsyncGenerator
+
+import pytest
+import pytest_socket
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.fronius_smartmeter_ip import discovery
+from custom_components.fronius_smartmeter_ip.discovery import async_scan_subnet
+
+from .fake_meter import FakeMeter
+
+SUBNET = "127.0.0.0/24"
+METER_HOSTS = ("127.0.0.10", "127.0.0.77", "127.0.0.200")
+SILENT_HOSTS = tuple(f"127.0.0.{index}" for index in range(100, 116)) # Antworten nicht rechtzeitig
+TIMEOUT = 1.5
+
+
+@pytest.fixture
+async def servers(socket_enabled: None) -> AsyncGenerator[int]:
+    """Run meters and slow servers on one port; all other hosts refuse the connection."""
+    pytest_socket.socket_allow_hosts([f"127.0.0.{index}" for index in range(256)])
+    discovery._DISCOVERY_CACHE.clear()
+    running = [FakeMeter(METER_HOSTS[0])]
+    await running[0].start()
+    port = running[0].port
+    for host in METER_HOSTS[1:]:
+        running.append(FakeMeter(host, port))
+    for host in SILENT_HOSTS:
+        running.append(FakeMeter(host, port, delay=TIMEOUT + 1))
+    for server in running[1:]:
+        await server.start()
+    yield port
+    for server in running:
+        await server.stop()
+    discovery._DISCOVERY_CACHE.clear()
+    pytest_socket.socket_allow_hosts(["127.0.0.1"])
+
+
+@pytest.mark.benchmark
+async def test_scan_subnet(hass: HomeAssistant, servers: int) -> None:
+    expected = [f"http://{host}:{servers}" for host in METER_HOSTS]
+    rows = []
+    for concurrency in (16, 64, 254):
+        started = time.perf_counter()
+        found = await async_scan_subnet(
+            hass, SUBNET, port=servers, concurrency=concurrency, timeout=TIMEOUT, use_cache=False
+        )
+        rows.append((concurrency, time.perf_counter() - started))
+        assert found == expected
+
+    started = time.perf_counter()
+    assert await async_scan_subnet(hass, SUBNET, port=servers, timeout=TIMEOUT) == expected
+    cached = time.perf_counter() - started
+
+    print(f"\n/24 scan, {len(METER_HOSTS)} meters, {len(SILENT_HOSTS)} hosts without answer, timeout {TIMEOUT} s")
+    print(f"{'concurrency':>12} {'duration':>10}")
+    for concurrency, duration in rows:
+        print(f"{concurrency:>12} {duration:>9.2f}s")
+    print(f"{'cached':>12} {cached * 1000:>8.2f}ms")
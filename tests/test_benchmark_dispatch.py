@@ -0,0 +1,150 @@
+"""Benchmark: per-entity listener updates vs. the coalesced single-pass dispatch.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_dispatch.py
+"""
+import json
+import random
+import statistics
+import time
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.setup import async_setup_component
+
+from custom_components.fronius_smartmeter_ip.const import CONF_PHASE_DEVICES, DOMAIN, PHASE_KEYS, PHASE_L3
+from custom_components.fronius_smartmeter_ip.sensor import decode_payload
+
+from .conftest import create_entry
+from .fake_meter import API_KEYS, FakeMeter
+
+METERS = 50
+POLLS = 20
+
+
+def _changed_payload(base: dict, fraction: float, rng: random.Random) -> dict:
+    """Return a copy of base where the given fraction of the API values changed."""
+    data = dict(base)
+    for key in rng.sample(API_KEYS, round(len(API_KEYS) * fraction)):
+        if isinstance(data[key], float):
+            data[key] = round(data[key] * rng.uniform(0.98, 1.02), 3)
+    return data
+
+
+async def _measure(
+    hass: HomeAssistant, coordinators: list, payloads: list[dict], fraction: float, stock: bool
+) -> tuple[list[float], float]:
+    """Simulate POLLS polls on every meter.
+
+    Returns the loop-blocking time of each dispatch and the mean number of woken entities.
+    """
+    rng = random.Random(1)
+    blocking: list[float] = []
+    woken = 0
+    for _ in range(POLLS):
+        for index, coordinator in enumerate(coordinators):
+            payloads[index] = _changed_payload(payloads[index], fraction, rng)
+            raw = json.dumps(payloads[index]).encode()
+            coordinator.data = decode_payload(raw, True, coordinator.excluded_keys, "benchmark")
+            started = time.perf_counter()
+            if stock:
+                # Verhalten ohne Koaleszierung: jeder Listener wird bei jedem Update geweckt
+                DataUpdateCoordinator.async_update_listeners(coordinator)
+            else:
+                coordinator.async_update_listeners()
+            blocking.append(time.perf_counter() - started)
+            woken += len(coordinator._listeners) if stock else coordinator.last_dispatch_callbacks
+        await hass.async_block_till_done()
+    return blocking, woken / len(blocking)
+
+
+@pytest.mark.benchmark
+async def test_dispatch_loop_blocking(
+    hass: HomeAssistant, fake_meter: FakeMeter, all_entities_enabled: None
+) -> None:
+    entries = [create_entry(hass, f"{fake_meter.url}/meter{index}") for index in range(METERS)]
+    assert await async_setup_component(hass, DOMAIN, {}) # Richtet alle Einträge ein
+    await hass.async_block_till_done()
+    coordinators = [hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"] for entry in entries]
+    for coordinator in coordinators:
+        await coordinator.async_shutdown() # Kein Polling während der Messung
+    payloads = [fake_meter.measurements() for _ in coordinators]
+    listeners = statistics.mean(len(coordinator._listeners) for coordinator in coordinators)
+
+    print(f"\n{METERS} meters, {listeners:.0f} entities each, {POLLS} polls per meter")
+    print(f"{'changed values':>15} {'dispatch':>11} {'woken':>6} {'mean ms':>8} {'p95 ms':>7} {'max ms':>7}")
+    await _measure(hass, coordinators, payloads, 1.0, True) # Aufwärmen
+    results = {}
+    for fraction in (1.0, 0.3, 0.05):
+        for stock in (True, False):
+            blocking, woken = await _measure(hass, coordinators, payloads, fraction, stock)
+            results[fraction, stock] = statistics.mean(blocking)
+            print(
+                f"{fraction:>14.0%} {'per-entity' if stock else 'coalesced':>11} {woken:>6.0f}"
+                f" {statistics.mean(blocking) * 1000:>8.2f}"
+                f" {statistics.quantiles(blocking, n=20)[-1] * 1000:>7.2f}"
+                f" {max(blocking) * 1000:>7.2f}"
+            )
+    # Mit wenigen geänderten Werten muss der koaleszierte Dispatch deutlich weniger blockieren
+    assert results[0.05, False] < results[0.05, True]
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+@pytest.mark.benchmark
+async def test_dispatch_single_phase_change(
+    hass: HomeAssistant, fake_meter: FakeMeter, all_entities_enabled: None
+) -> None:
+    """Only the values of phase C change, e.g. a load switching on L3."""
+    entries = [
+        create_entry(hass, f"{fake_meter.url}/meter{index}", {CONF_PHASE_DEVICES: True}) for index in range(METERS)
+    ]
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    coordinators = [hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"] for entry in entries]
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
+    phase_c = [key for key in PHASE_KEYS[PHASE_L3] if key in API_KEYS]
+    payloads = [fake_meter.measurements() for _ in coordinators]
+    for coordinator, payload in zip(coordinators, payloads):
+        coordinator.data = decode_payload(json.dumps(payload).encode(), True, coordinator.excluded_keys, "benchmark")
+
+    rng = random.Random(1)
+    results = {}
+    for stock in (True, False, True, False): # Erster Durchlauf jeder Variante zum Aufwärmen
+        blocking: list[float] = []
+        woken = 0
+        for _ in range(POLLS):
+            for index, coordinator in enumerate(coordinators):
+                for key in phase_c:
+                    payloads[index][key] = round(payloads[index][key] * rng.uniform(0.98, 1.02) + 0.001, 3)
+                raw = json.dumps(payloads[index]).encode()
+                coordinator.data = decode_payload(raw, True, coordinator.excluded_keys, "benchmark")
+                started = time.perf_counter()
+                if stock:
+                    DataUpdateCoordinator.async_update_listeners(coordinator)
+                else:
+                    coordinator.async_update_listeners()
+                blocking.append(time.perf_counter() - started)
+                woken += len(coordinator._listeners) if stock else coordinator.last_dispatch_callbacks
+            await hass.async_block_till_done()
+        results[stock] = (woken / len(blocking), blocking)
+
+    listeners = statistics.mean(len(coordinator._listeners) for coordinator in coordinators)
+    print(f"\n{METERS} meters with phase devices, {listeners:.0f} entities each, only {len(phase_c)} phase C values change")
+    print(f"{'dispatch':>11} {'woken':>6} {'mean ms':>8} {'p95 ms':>7} {'max ms':>7}")
+    for stock, (woken, blocking) in results.items():
+        print(
+            f"{'per-entity' if stock else 'coalesced':>11} {woken:>6.0f} {statistics.mean(blocking) * 1000:>8.2f}"
+            f" {statistics.quantiles(blocking, n=20)[-1] * 1000:>7.2f} {max(blocking) * 1000:>7.2f}"
+        )
+    # Geweckt werden nur die Entitäten von Phase C und die daraus berechneten Werte
+    assert results[False][0] < listeners / 3
+    assert statistics.mean(results[False][1]) < statistics.mean(results[True][1])
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,78 @@
+"""Benchmark: encoding, decoding and flushing the measurements snapshot.
+
+Run with: pytest -m benchmark -s tests/test_benchmark_snapshot.py
+"""
+import asyncio
+import json
+import statistics
+import time
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.fronius_smartmeter_ip.snapshot import SnapshotStore, decode_snapshot, encode_snapshot
+from custom_components.fronius_smartmeter_ip.sensor import decode_payload
+
+from .fake_meter import FakeMeter
+
+ROUNDS = 2000
+STORE_COUNTS = (1, 10, 50, 200)
+FLUSHES = 5
+
+
+def _payload() -> dict:
+    """A decoded measurements payload including the calculated values, as the coordinator keeps it."""
+    raw = json.dumps(FakeMeter().measurements()).encode()
+    return decode_payload(raw, True, frozenset(), "benchmark")
+
+
+def _per_call(function, rounds: int = ROUNDS) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - started) / rounds
+
+
+@pytest.mark.benchmark
+def test_encode_decode() -> None:
+    data = _payload()
+    blob = encode_snapshot(data, time.time())
+    text = json.dumps({"saved_at": time.time(), "data": data})
+    assert decode_snapshot(blob)[1].items() <= data.items()
+
+    print(f"\nSnapshot of {len(data)} values")
+    print(f"{'format':>8} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    encode = min(_per_call(lambda: encode_snapshot(data, 0.0)) for _ in range(3))
+    decode = min(_per_call(lambda: decode_snapshot(blob)) for _ in range(3))
+    print(f"{'binary':>8} {len(blob):>7} {encode * 1e6:>10.1f} {decode * 1e6:>10.1f}")
+    # Zum Vergleich: JSON, wie es der Store von Home Assistant schreiben würde
+    encode = min(_per_call(lambda: json.dumps({"saved_at": 0.0, "data": data})) for _ in range(3))
+    decode = min(_per_call(lambda: json.loads(text)) for _ in range(3))
+    print(f"{'json':>8} {len(text):>7} {encode * 1e6:>10.1f} {decode * 1e6:>10.1f}")
+
+
+@pytest.mark.benchmark
+async def test_flush_many_stores(hass: HomeAssistant, production_loop: None) -> None:
+    data = _payload()
+    print(f"\nFlush of N snapshot stores at once (e.g. on shutdown), {FLUSHES} runs")
+    print(f"{'stores':>6} {'total ms':>9} {'per store ms':>13} {'loop ms':>8}")
+    for count in STORE_COUNTS:
+        stores = [SnapshotStore(hass, f"benchmark{index}") for index in range(count)]
+        totals: list[float] = []
+        blocking: list[float] = []
+        for _ in range(FLUSHES):
+            for store in stores:
+                store.async_schedule_save(dict(data))
+            started = time.perf_counter()
+            flushes = [hass.async_create_task(store.async_flush()) for store in stores]
+            # Zeit auf dem Event-Loop: das Kodieren bis zur Übergabe an den Executor
+            await asyncio.sleep(0)
+            blocking.append(time.perf_counter() - started)
+            await asyncio.gather(*flushes)
+            totals.append(time.perf_counter() - started)
+        for store in stores:
+            assert (await store.async_load())[1].items() <= data.items()
+            await store.async_remove()
+        total = statistics.median(totals)
+        print(f"{count:>6} {total * 1000:>9.2f} {total / count * 1000:>13.3f} {statistics.median(blocking) * 1000:>8.2f}")
@@ -0,0 +1,116 @@
+"""Churn test: add, set up, unload and remove meters many times and look for leaks.
+
+The number of cycles can be raised for a load test, e.g.
+FRONIUS_CHURN_CYCLES=500 pytest -s tests/test_churn.py
+"""
+import asyncio
+import os
+import statistics
+import time
+from collections.abc import Generator
+
+import httpx
+import pytest
+
+from homeassistant import config_entries
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers.httpx_client import HassHttpXAsyncClient
+
+from custom_components.fronius_smartmeter_ip.const import DOMAIN
+
+from .fake_meter import FakeMeter
+
+CYCLES = int(os.environ.get("FRONIUS_CHURN_CYCLES", "20"))
+
+
+@pytest.fixture
+def httpx_clients() -> Generator[list[httpx.AsyncClient]]:
+    """Record every httpx.AsyncClient created during the test."""
+    clients: list[httpx.AsyncClient] = []
+    original_init = httpx.AsyncClient.__init__
+
+    def recording_init(self: httpx.AsyncClient, *args, **kwargs) -> None:
+        original_init(self, *args, **kwargs)
+        clients.append(self)
+
+    httpx.AsyncClient.__init__ = recording_init
+    yield clients
+    httpx.AsyncClient.__init__ = original_init
+
+
+def _open_fds() -> int | None:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None # Nicht unter Linux
+
+
+def _report(name: str, durations: list[float]) -> str:
+    quantiles = statistics.quantiles(durations, n=100, method="inclusive")
+    return (
+        f"{name:>8} {statistics.mean(durations) * 1000:>8.2f} {quantiles[49] * 1000:>8.2f}"
+        f" {quantiles[94] * 1000:>8.2f} {max(durations) * 1000:>8.2f}"
+    )
+
+
+async def _cycle(hass: HomeAssistant, url: str, timings: dict[str, list[float]]) -> None:
+    """Add a meter through the config flow, reload it once and remove it again."""
+    started = time.perf_counter()
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {"next_step_id": "manual"})
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_URL: url, CONF_USERNAME: "", CONF_PASSWORD: ""}
+    )
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+    timings["flow"].append(time.perf_counter() - started) # Validierung und erstes Setup
+    entry = result["result"]
+    assert entry.state is ConfigEntryState.LOADED
+
+    started = time.perf_counter()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    timings["unload"].append(time.perf_counter() - started)
+
+    # Zweites Setup startet aus dem beim Entladen geschriebenen Snapshot
+    started = time.perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    timings["setup"].append(time.perf_counter() - started)
+    await hass.async_block_till_done()
+
+    started = time.perf_counter()
+    await hass.config_entries.async_remove(entry.entry_id)
+    timings["remove"].append(time.perf_counter() - started)
+    await hass.async_block_till_done()
+
+
+async def test_churn_leaves_nothing_behind(
+    hass: HomeAssistant, fake_meter: FakeMeter, httpx_clients: list[httpx.AsyncClient]
+) -> None:
+    timings: dict[str, list[float]] = {"flow": [], "setup": [], "unload": [], "remove": []}
+    await _cycle(hass, f"{fake_meter.url}/warmup", timings) # Lädt die Integration und den gemeinsamen Client
+    tasks = len(asyncio.all_tasks())
+    listeners = hass.bus.async_listeners()
+    fds = _open_fds()
+    created = len(httpx_clients)
+
+    for index in range(CYCLES):
+        await _cycle(hass, f"{fake_meter.url}/meter{index}", timings)
+
+    assert fake_meter.requests > CYCLES
+    assert not hass.config_entries.async_entries(DOMAIN)
+    assert DOMAIN not in hass.data or not hass.data[DOMAIN]
+    # Jedes Setup erstellt zwei Clients (Messwerte, Konfiguration); alle sind wieder geschlossen
+    assert len(httpx_clients) - created == 4 * CYCLES
+    assert [client for client in httpx_clients if not client.is_closed and not isinstance(client, HassHttpXAsyncClient)] == []
+    assert len(asyncio.all_tasks()) == tasks
+    assert hass.bus.async_listeners() == listeners
+    if fds is not None:
+        assert _open_fds() <= fds + 2 # Spielraum für Sockets, die der Fake-Server gerade schließt
+
+    print(f"\n{CYCLES} cycles, durations in ms")
+    print(f"{'':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    for name, durations in timings.items():
+        print(_report(name, durations[1:])) # Ohne den Aufwärmzyklus
@@ -0,0 +1,80 @@
+"""Concurrency tests for the single-flight fetch of the coordinator."""
+import asyncio
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.fronius_smartmeter_ip.const import API_PATH_MEASUREMENTS, API_QUERY_PARAMS
+from custom_components.fronius_smartmeter_ip.sensor import FroniusSmartmeterDataCoordinator
+
+from .fake_meter import FakeMeter
+
+CALLERS = 50
+
+
+def _coordinator(hass: HomeAssistant, meter: FakeMeter) -> FroniusSmartmeterDataCoordinator:
+    return FroniusSmartmeterDataCoordinator(
+        hass, "Test Measurements", f"{meter.url}{API_PATH_MEASUREMENTS}", None, API_QUERY_PARAMS, 10,
+        is_measurements=True,
+    )
+
+
+async def test_concurrent_refreshes_share_one_request(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    fake_meter.delay = 0.2
+    coordinator = _coordinator(hass, fake_meter)
+    await asyncio.gather(*(coordinator.async_refresh() for _ in range(CALLERS)))
+    assert fake_meter.requests == 1
+    assert coordinator.coalesced_requests == CALLERS - 1
+    assert coordinator.last_update_success
+    assert coordinator.data["PT"] is not None
+
+    # Direkt danach wird aus dem Cache geantwortet, ohne das Gerät zu belasten
+    await asyncio.gather(*(coordinator.async_refresh() for _ in range(CALLERS)))
+    assert fake_meter.requests == 1
+    assert coordinator.cached_responses == CALLERS
+    await coordinator.async_shutdown()
+
+
+async def test_mixed_refresh_requests(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    fake_meter.delay = 0.2
+    coordinator = _coordinator(hass, fake_meter)
+    await asyncio.gather(
+        *(coordinator.async_request_refresh() for _ in range(CALLERS)),
+        *(coordinator.async_refresh() for _ in range(CALLERS)),
+    )
+    await hass.async_block_till_done()
+    assert fake_meter.requests == 1
+    # Der Debouncer lässt nur die erste Anforderung durch: 51 Aufrufe, eine Abfrage, 50 angeschlossen
+    assert coordinator.coalesced_requests == CALLERS
+    await coordinator.async_shutdown()
+
+
+async def test_failed_fetch_is_shared(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    fake_meter.delay = 0.1
+    fake_meter.status = 500
+    coordinator = _coordinator(hass, fake_meter)
+    await asyncio.gather(*(coordinator.async_refresh() for _ in range(CALLERS)))
+    assert fake_meter.requests == 1
+    assert not coordinator.last_update_success
+    # Fehler werden nicht zwischengespeichert: die nächste Abfrage geht wieder ans Gerät
+    fake_meter.status = 200
+    await coordinator.async_refresh()
+    assert fake_meter.requests == 2
+    assert coordinator.last_update_success
+    await coordinator.async_shutdown()
+
+
+async def test_shutdown_cancels_fetch_in_flight(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    fake_meter.delay = 1.0
+    coordinator = _coordinator(hass, fake_meter)
+    refreshes = [hass.async_create_task(coordinator.async_refresh()) for _ in range(CALLERS)]
+    while fake_meter.requests == 0:
+        await asyncio.sleep(0.01)
+    inflight = coordinator._inflight
+    assert inflight is not None and not inflight.done()
+
+    await coordinator.async_shutdown()
+    await asyncio.gather(*refreshes, return_exceptions=True)
+    assert inflight.cancelled()
+    assert coordinator._inflight is None
+    assert coordinator._client.is_closed
+    assert fake_meter.requests == 1
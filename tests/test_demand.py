@@ -0,0 +1,143 @@
+"""Tests for the demand integration, checked against a brute-force reference."""
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+from itertools import pairwise
+
+import pytest
+
+from custom_components.fronius_smartmeter_ip.const import (
+    DEMAND_CHANNELS,
+    DEMAND_INTERVAL_SECONDS,
+    DEMAND_MAX_GAP_SECONDS,
+    KEY_ACTIVE_POWER_TOTAL,
+    KEY_DEMAND_LAST_INTERVAL,
+    KEY_DEMAND_MONTHLY_PEAK,
+)
+from custom_components.fronius_smartmeter_ip.demand import DemandIntegrator, DemandTracker
+from custom_components.fronius_smartmeter_ip.snapshot import decode_snapshot, encode_snapshot
+
+INTERVAL = DEMAND_INTERVAL_SECONDS
+STEP = 0.25 # Auflösung der Referenz; Zeitstempel liegen auf diesem Raster
+START = 1_700_000_000.0 - 1_700_000_000.0 % INTERVAL
+SUFFIX = DEMAND_CHANNELS[KEY_ACTIVE_POWER_TOTAL]
+
+
+def _reference(samples: list[tuple[float, float]]) -> dict[float, float]:
+    """Average power of every interval, integrated step by step with the midpoint rule."""
+    energy: dict[float, float] = defaultdict(float)
+    covered: dict[float, float] = defaultdict(float)
+    for (t0, p0), (t1, p1) in pairwise(samples):
+        if t1 - t0 > DEMAND_MAX_GAP_SECONDS:
+            continue
+        for step in range(round((t1 - t0) / STEP)):
+            t = t0 + (step + 0.5) * STEP
+            start = t - t % INTERVAL
+            energy[start] += (p0 + (p1 - p0) * (t - t0) / (t1 - t0)) * STEP
+            covered[start] += STEP
+    return {start: energy[start] / covered[start] for start in covered}
+
+
+def _samples(rng: random.Random, count: int, gap_every: int = 0) -> list[tuple[float, float]]:
+    samples = []
+    timestamp = START + rng.randint(0, 60)
+    for index in range(count):
+        samples.append((timestamp, rng.uniform(-3000, 8000)))
+        if gap_every and index % gap_every == gap_every - 1:
+            timestamp += rng.choice((DEMAND_MAX_GAP_SECONDS + 1, 2 * INTERVAL, 3 * INTERVAL + 17))
+        else:
+            timestamp += rng.randint(1, 40) + rng.choice((0, 0.25, 0.5))
+    return samples
+
+
+def _check(integrator: DemandIntegrator, samples: list[tuple[float, float]], month_of) -> None:
+    """Feed samples and compare last interval average and monthly peak after every sample."""
+    reference = _reference(samples)
+    for timestamp, power in samples:
+        integrator.add_sample(timestamp, power)
+        previous = integrator.interval_start - INTERVAL
+        expected = reference.get(previous)
+        assert integrator.last_interval_average == (pytest.approx(expected) if expected is not None else None)
+        completed = [
+            average for start, average in reference.items()
+            if start < integrator.interval_start and month_of(start) == month_of(timestamp)
+        ]
+        peak = integrator.monthly_peak(timestamp)
+        assert peak == (pytest.approx(max(completed)) if completed else None)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_irregular_intervals(seed: int) -> None:
+    month_of = lambda timestamp: int(timestamp // (4 * INTERVAL)) # Kurzer "Monat" aus vier Intervallen
+    _check(DemandIntegrator(month_of=month_of), _samples(random.Random(seed), 600), month_of)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_gaps(seed: int) -> None:
+    month_of = lambda timestamp: int(timestamp // (4 * INTERVAL))
+    _check(DemandIntegrator(month_of=month_of), _samples(random.Random(seed), 600, gap_every=37), month_of)
+
+
+def test_gap_over_whole_intervals_clears_last_average() -> None:
+    integrator = DemandIntegrator()
+    for second in range(0, 601, 10):
+        integrator.add_sample(START + second, 1000.0)
+    # Lücke bis ins übernächste Intervall: das Intervall davor hat keine Messwerte
+    integrator.add_sample(START + 2 * INTERVAL + 50, 500.0)
+    assert integrator.last_interval_average is None
+    assert integrator.monthly_peak(START + 2 * INTERVAL + 50) == pytest.approx(1000.0)
+
+
+def test_gap_into_next_interval_keeps_last_average() -> None:
+    integrator = DemandIntegrator()
+    for second in range(0, 601, 10):
+        integrator.add_sample(START + second, 1000.0)
+    integrator.add_sample(START + INTERVAL + 100, 500.0)
+    # Gemittelt nur über die abgedeckten 600 s
+    assert integrator.last_interval_average == pytest.approx(1000.0)
+
+
+def test_boundary_split() -> None:
+    integrator = DemandIntegrator()
+    for second in range(0, 891, 10):
+        integrator.add_sample(START + second, 0.0)
+    # Rampe 0 -> 2000 W über die Intervallgrenze: 1000 W genau an der Grenze
+    integrator.add_sample(START + 910, 2000.0)
+    assert integrator.last_interval_average == pytest.approx(1000 / 2 * 10 / INTERVAL)
+    assert integrator.energy == pytest.approx((1000 + 2000) / 2 * 10)
+    assert integrator.covered == pytest.approx(10)
+    assert integrator.forecast == pytest.approx((15000 + 2000 * 890) / INTERVAL)
+
+
+def test_calendar_month_rollover() -> None:
+    end_of_january = datetime(2024, 1, 31, 23, 30, tzinfo=timezone.utc).timestamp()
+    integrator = DemandIntegrator()
+    for second in range(0, 3601, 10):
+        # Januar: 5 kW, Februar: 1 kW
+        power = 5000.0 if second < 1800 else 1000.0
+        integrator.add_sample(end_of_january + second, power)
+    february = end_of_january + 3600
+    assert integrator.monthly_peak(february) == pytest.approx(1000.0)
+    assert integrator.monthly_peak(end_of_january) is None # Spitzenwert gilt nur für den aktuellen Monat
+
+
+def test_state_round_trip() -> None:
+    samples = _samples(random.Random(7), 400, gap_every=50)
+    tracker = DemandTracker()
+    for timestamp, power in samples[:200]:
+        tracker.add_samples(timestamp, {KEY_ACTIVE_POWER_TOTAL: power})
+
+    # Wie beim Neustart: Zustand über den Snapshot speichern und in einen neuen Tracker laden
+    _saved_at, state = decode_snapshot(encode_snapshot(tracker.as_state(), samples[199][0]))
+    restored = DemandTracker()
+    restored.restore_state(state)
+    assert restored.as_state() == tracker.as_state()
+
+    for timestamp, power in samples[200:]:
+        expected = {KEY_ACTIVE_POWER_TOTAL: power}
+        actual = {KEY_ACTIVE_POWER_TOTAL: power}
+        tracker.add_samples(timestamp, expected)
+        restored.add_samples(timestamp, actual)
+        assert actual == expected
+    assert expected[KEY_DEMAND_LAST_INTERVAL.format(SUFFIX)] is not None
+    assert expected[KEY_DEMAND_MONTHLY_PEAK.format(SUFFIX)] is not None
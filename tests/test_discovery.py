@@ -0,0 +1,116 @@
+"""Tests for the subnet scan and the config flow that uses it."""
+from collections.abc import AsyncGenerator, Generator
+from unittest.mock import patch
+
+import pytest
+import pytest_socket
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_PASSWORD, CONF_URL, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.fronius_smartmeter_ip import discovery
+from custom_components.fronius_smartmeter_ip.const import CONF_SUBNET, DOMAIN
+from custom_components.fronius_smartmeter_ip.discovery import async_scan_subnet, url_key
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+SUBNET = "127.0.0.0/29"
+
+
+@pytest.fixture
+def loopback_subnet(socket_enabled: None) -> Generator[None]:
+    """Allow connections to every host of SUBNET, not only 127.0.0.1."""
+    pytest_socket.socket_allow_hosts([f"127.0.0.{index}" for index in range(8)])
+    discovery._DISCOVERY_CACHE.clear()
+    yield
+    discovery._DISCOVERY_CACHE.clear()
+    pytest_socket.socket_allow_hosts(["127.0.0.1"])
+
+
+@pytest.fixture
+async def meters(loopback_subnet: None) -> AsyncGenerator[dict[str, FakeMeter]]:
+    """Run two meters and one other HTTP server on the same port of different loopback addresses."""
+    servers = {"127.0.0.2": FakeMeter("127.0.0.2")}
+    await servers["127.0.0.2"].start()
+    port = servers["127.0.0.2"].port
+    for host in ("127.0.0.3", "127.0.0.5"):
+        servers[host] = FakeMeter(host, port)
+        await servers[host].start()
+    servers["127.0.0.3"].status = 404 # Antwortet, ist aber kein Zähler
+    yield servers
+    for server in servers.values():
+        await server.stop()
+
+
+async def test_scan_finds_meters(hass: HomeAssistant, meters: dict[str, FakeMeter]) -> None:
+    port = meters["127.0.0.2"].port
+    found = await async_scan_subnet(hass, SUBNET, port=port, timeout=2)
+    assert found == [f"http://127.0.0.2:{port}", f"http://127.0.0.5:{port}"]
+    assert meters["127.0.0.3"].requests == 1
+
+    # Zweiter Scan kommt aus dem Cache, ohne erneute Anfragen
+    assert await async_scan_subnet(hass, SUBNET, port=port, timeout=2) == found
+    assert meters["127.0.0.2"].requests == 1
+    assert await async_scan_subnet(hass, SUBNET, port=port, timeout=2, use_cache=False) == found
+    assert meters["127.0.0.2"].requests == 2
+
+
+async def test_empty_scan_is_not_cached(hass: HomeAssistant, meters: dict[str, FakeMeter]) -> None:
+    port = meters["127.0.0.2"].port
+    for host in ("127.0.0.2", "127.0.0.5"):
+        meters[host].status = 503 # Noch nicht betriebsbereit
+    assert await async_scan_subnet(hass, SUBNET, port=port, timeout=2) == []
+
+    # Das Gerät ist inzwischen erreichbar: der nächste Scan fragt erneut ab
+    meters["127.0.0.2"].status = 200
+    assert await async_scan_subnet(hass, SUBNET, port=port, timeout=2) == [f"http://127.0.0.2:{port}"]
+    assert meters["127.0.0.2"].requests == 2
+
+
+async def test_scan_invalid_subnet(hass: HomeAssistant) -> None:
+    with pytest.raises(ValueError, match="invalid_subnet"):
+        await async_scan_subnet(hass, "not a subnet")
+    with pytest.raises(ValueError, match="subnet_too_large"):
+        await async_scan_subnet(hass, "10.0.0.0/8")
+
+
+def test_url_key() -> None:
+    assert url_key("http://192.168.1.5") == ("http", "192.168.1.5", 80)
+    assert url_key("HTTP://192.168.1.5:80/") == ("http", "192.168.1.5", 80)
+    assert url_key("192.168.1.5") == ("http", "192.168.1.5", 80)
+    assert url_key("https://Meter.local") == ("https", "meter.local", 443)
+    assert url_key("http://192.168.1.5:8080") != url_key("http://192.168.1.5")
+
+
+async def test_scan_flow_hides_configured_meters(
+    hass: HomeAssistant, meters: dict[str, FakeMeter]
+) -> None:
+    port = meters["127.0.0.2"].port
+    # Eingerichtet per Hostname mit Schrägstrich bzw. mit explizitem Standardport
+    create_entry(hass, f"http://localhost:{port}/")
+    create_entry(hass, "HTTP://127.0.0.3:80")
+    found = [f"http://127.0.0.1:{port}", f"http://127.0.0.2:{port}", "http://127.0.0.3"]
+
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    assert result["type"] is FlowResultType.MENU
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {"next_step_id": "scan"})
+    with patch(
+        "custom_components.fronius_smartmeter_ip.config_flow.async_scan_subnet", return_value=found
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_SUBNET: SUBNET, CONF_USERNAME: "", CONF_PASSWORD: ""}
+        )
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "select"
+    assert result["data_schema"].schema[CONF_URL].container == [f"http://127.0.0.2:{port}"]
+
+    with patch("custom_components.fronius_smartmeter_ip.async_setup_entry", return_value=True):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_URL: f"http://127.0.0.2:{port}"}
+        )
+        await hass.async_block_till_done()
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_URL] == f"http://127.0.0.2:{port}"
@@ -0,0 +1,267 @@
+"""Tests for the health scoring and the health entities."""
+from datetime import timedelta
+
+import pytest
+from freezegun.api import FrozenDateTimeFactory
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.fronius_smartmeter_ip.const import (
+    CONF_UNAVAILABLE_WHEN_STALE,
+    DEFAULT_MEASUREMENTS_INTERVAL_SECONDS,
+    DOMAIN,
+    HEALTH_REBOOT_PENALTY_SECONDS,
+    HEALTH_STALE_MIN_SECONDS,
+    KEY_CLOCK_SKEW,
+    KEY_DATA_STALE,
+    KEY_HEALTH_SCORE,
+    KEY_METER_REBOOTS,
+    KEY_POLL_ROUND_TRIP_JITTER,
+    KEY_SAMPLE_RATE,
+    KEY_VOLTAGE_A,
+)
+from custom_components.fronius_smartmeter_ip.health import MeterHealth
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+
+INTERVAL = DEFAULT_MEASUREMENTS_INTERVAL_SECONDS
+STALE_AFTER = 30.0
+START = 1_700_000_000.0
+
+
+def _steady(health: MeterHealth, polls: int, start: float = START, rate: float = 50, clock: float = 1.0) -> float:
+    """Feed polls every INTERVAL seconds with counters advancing at the given rates; return the last time."""
+    samples = health.last_samples or 1000
+    time_ms = health.last_time_ms or 3_600_000
+    timestamp = start
+    for index in range(polls):
+        timestamp = start + index * INTERVAL
+        if index or health.last_poll is not None:
+            samples += round(rate * INTERVAL)
+            time_ms += round(clock * INTERVAL * 1000)
+        health.add_poll(timestamp, 0.05, samples, time_ms)
+    return timestamp
+
+
+def test_healthy_meter() -> None:
+    health = MeterHealth()
+    assert health.score(START, STALE_AFTER) is None # Noch keine Abfrage
+    now = _steady(health, 20)
+    assert health.score(now, STALE_AFTER) == 100
+    assert health.sample_rate == pytest.approx(50)
+    assert health.clock_skew == pytest.approx(0)
+    assert not health.is_stale(now + STALE_AFTER, STALE_AFTER)
+    assert health.as_dict(now, STALE_AFTER)[KEY_POLL_ROUND_TRIP_JITTER] == 0
+
+
+def test_frozen_counters() -> None:
+    health = MeterHealth()
+    now = _steady(health, 5)
+    # Das Gerät antwortet, aber SAMPLES und TIME stehen
+    for step in range(1, 4):
+        health.add_poll(now + step * INTERVAL, 0.05, health.last_samples, health.last_time_ms)
+    assert health.frozen_polls == 3
+    # Abzug für stehende Zähler und, da die Abtastrate scheinbar auf 0 fällt, für deren Einbruch
+    assert health.score(now + 3 * INTERVAL, STALE_AFTER) == 100 - 20 - 15
+    assert health.is_stale(now + 3 * INTERVAL + 1, STALE_AFTER)
+    assert health.score(now + 3 * INTERVAL + 1, STALE_AFTER) == 0
+    # Sobald die Zähler weiterlaufen, ist der Zustand wieder gut
+    health.add_poll(now + 4 * INTERVAL, 0.05, health.last_samples + 50, health.last_time_ms + 1000)
+    assert health.frozen_polls == 0
+    assert not health.is_stale(now + 4 * INTERVAL, STALE_AFTER)
+
+
+def test_reboot() -> None:
+    health = MeterHealth()
+    now = _steady(health, 5) + INTERVAL
+    health.add_poll(now, 0.05, 10, 500) # Zähler zurückgelaufen
+    assert health.reboots == 1
+    assert health.last_reboot == now
+    assert health.score(now, STALE_AFTER) == 90
+    assert not health.is_stale(now, STALE_AFTER)
+    # Nach dem Neustart wird normal weitergezählt; die Strafe läuft ab
+    health.add_poll(now + INTERVAL, 0.05, 510, 10_500)
+    assert health.reboots == 1
+    health.add_poll(now + HEALTH_REBOOT_PENALTY_SECONDS, 0.05, 510 + 50 * 3590, 10_500 + 3_590_000)
+    assert health.score(now + HEALTH_REBOOT_PENALTY_SECONDS, STALE_AFTER) == 100
+
+
+@pytest.mark.parametrize(("clock", "skew", "score"), [(1.005, 0.5, 100), (1.05, 5.0, 80), (0.9, -10.0, 80)])
+def test_clock_skew(clock: float, skew: float, score: int) -> None:
+    health = MeterHealth()
+    now = _steady(health, 10, clock=clock)
+    assert health.clock_skew == pytest.approx(skew)
+    assert health.score(now, STALE_AFTER) == score
+
+
+def test_sample_rate_drop() -> None:
+    health = MeterHealth()
+    now = _steady(health, 30)
+    assert health.score(now, STALE_AFTER) == 100
+    now = _steady(health, 3, start=now + INTERVAL, rate=10)
+    assert health.sample_rate < 25
+    assert health.score(now, STALE_AFTER) == 85
+    # Auf Dauer wird die niedrigere Rate zur neuen Normalität
+    now = _steady(health, 300, start=now + INTERVAL, rate=10)
+    assert health.score(now, STALE_AFTER) == 100
+
+
+def test_failures_and_jitter() -> None:
+    health = MeterHealth()
+    now = _steady(health, 5)
+    for _ in range(5):
+        health.add_failure()
+    assert health.score(now, STALE_AFTER) == round(100 - 50 * (1 - 0.9**5))
+    for index in range(20):
+        health.add_poll(now + (index + 1) * INTERVAL, 0.05 if index % 2 else 0.15, None, None)
+    assert health.as_dict(now, STALE_AFTER)[KEY_POLL_ROUND_TRIP_JITTER] > 50 # ms
+    assert health.score(now + 20 * INTERVAL, STALE_AFTER) < 100
+
+
+def test_without_counters() -> None:
+    # Ohne SAMPLES/TIME (z.B. andere Firmware) zählt nur der Erfolg der Abfrage
+    health = MeterHealth()
+    health.add_poll(START, 0.05, True, "1000")
+    assert health.last_samples is None
+    assert not health.is_stale(START + STALE_AFTER, STALE_AFTER)
+    assert health.is_stale(START + STALE_AFTER + 1, STALE_AFTER)
+
+
+async def _tick(hass: HomeAssistant, freezer: FrozenDateTimeFactory, seconds: float) -> None:
+    freezer.tick(timedelta(seconds=seconds))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+async def test_health_entities_follow_an_outage(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory
+) -> None:
+    entry = create_entry(hass, fake_meter.url)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    registry = er.async_get(hass)
+    score_id = registry.async_get_entity_id("sensor", DOMAIN, f"{DOMAIN}_{entry.entry_id}_{KEY_HEALTH_SCORE}")
+    stale_id = registry.async_get_entity_id("binary_sensor", DOMAIN, f"{DOMAIN}_{entry.entry_id}_{KEY_DATA_STALE}")
+    await _tick(hass, freezer, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS)
+    assert int(hass.states.get(score_id).state) > 50
+    assert hass.states.get(stale_id).state == STATE_OFF
+
+    # Ausfall: nur die erste fehlgeschlagene Abfrage weckt die Listener des Koordinators
+    fake_meter.status = 500
+    await _tick(hass, freezer, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS)
+    assert hass.states.get(stale_id).state == STATE_OFF
+    await _tick(hass, freezer, HEALTH_STALE_MIN_SECONDS)
+    assert hass.states.get(stale_id).state == STATE_ON
+    assert hass.states.get(score_id).state == "0"
+
+    # Nach dem Ausfall laufen die Zähler wieder weiter
+    fake_meter.status = 200
+    await _tick(hass, freezer, DEFAULT_MEASUREMENTS_INTERVAL_SECONDS)
+    assert hass.states.get(stale_id).state == STATE_OFF
+    assert int(hass.states.get(score_id).state) > 0
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def _setup(hass: HomeAssistant, meter: FakeMeter, options: dict | None = None) -> ConfigEntry:
+    entry = create_entry(hass, meter.url, options)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+def _state(hass: HomeAssistant, entry: ConfigEntry, key: str, platform: str = "sensor") -> str:
+    entity_id = er.async_get(hass).async_get_entity_id(platform, DOMAIN, f"{DOMAIN}_{entry.entry_id}_{key.lower()}")
+    return hass.states.get(entity_id).state
+
+
+async def test_frozen_meter_with_http_200(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory
+) -> None:
+    entry = await _setup(hass, fake_meter)
+    await _tick(hass, freezer, INTERVAL)
+    fake_meter.frozen = True
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "80" # Eine Abfrage ohne Fortschritt
+    for _ in range(3):
+        await _tick(hass, freezer, INTERVAL)
+    # Jede Abfrage ist erfolgreich, trotzdem gelten die Daten als veraltet
+    assert hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"].last_update_success
+    assert _state(hass, entry, KEY_DATA_STALE, "binary_sensor") == STATE_ON
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "0"
+
+    fake_meter.frozen = False
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_DATA_STALE, "binary_sensor") == STATE_OFF
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_meter_reboot(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory, all_entities_enabled: None
+) -> None:
+    entry = await _setup(hass, fake_meter)
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_METER_REBOOTS) == "0"
+    fake_meter.samples, fake_meter.time_ms = 0, 0 # Neustart: Zähler beginnen von vorn
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_METER_REBOOTS) == "1"
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "90"
+    assert _state(hass, entry, KEY_DATA_STALE, "binary_sensor") == STATE_OFF
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_clock_skew_and_sample_rate_drop(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory, all_entities_enabled: None
+) -> None:
+    fake_meter.clock_rate = 1.05 # Betriebszeit läuft 5 % zu schnell
+    entry = await _setup(hass, fake_meter)
+    for _ in range(10):
+        await _tick(hass, freezer, INTERVAL)
+    assert float(_state(hass, entry, KEY_CLOCK_SKEW)) == pytest.approx(5.0)
+    assert float(_state(hass, entry, KEY_SAMPLE_RATE)) == pytest.approx(50.0)
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "80"
+
+    fake_meter.sample_rate = 10
+    for _ in range(3):
+        await _tick(hass, freezer, INTERVAL)
+    assert float(_state(hass, entry, KEY_SAMPLE_RATE)) < 25
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "65"
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_unavailable_when_stale(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory
+) -> None:
+    entry = await _setup(hass, fake_meter, {CONF_UNAVAILABLE_WHEN_STALE: True})
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_VOLTAGE_A) == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+
+    fake_meter.frozen = True
+    for _ in range(4):
+        await _tick(hass, freezer, INTERVAL)
+    # Messwerte werden nicht verfügbar, die Zustandsentitäten bleiben es
+    assert _state(hass, entry, KEY_VOLTAGE_A) == STATE_UNAVAILABLE
+    assert _state(hass, entry, KEY_DATA_STALE, "binary_sensor") == STATE_ON
+    assert _state(hass, entry, KEY_HEALTH_SCORE) == "0"
+
+    fake_meter.frozen = False
+    await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_VOLTAGE_A) == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_stale_values_stay_available_by_default(
+    hass: HomeAssistant, fake_meter: FakeMeter, freezer: FrozenDateTimeFactory
+) -> None:
+    entry = await _setup(hass, fake_meter)
+    fake_meter.frozen = True
+    for _ in range(5):
+        await _tick(hass, freezer, INTERVAL)
+    assert _state(hass, entry, KEY_DATA_STALE, "binary_sensor") == STATE_ON
+    assert _state(hass, entry, KEY_VOLTAGE_A) == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+    assert await hass.config_entries.async_unload(entry.entry_id)
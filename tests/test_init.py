@@ -0,0 +1,26 @@
+"""Tests for setting up and unloading a config entry."""
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.fronius_smartmeter_ip.const import DOMAIN, KEY_VOLTAGE_A
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+
+async def test_setup_and_unload(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    entry = create_entry(hass, fake_meter.url)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.LOADED
+    entity_id = er.async_get(hass).async_get_entity_id(
+        "sensor", DOMAIN, f"{DOMAIN}_{entry.entry_id}_{KEY_VOLTAGE_A.lower()}"
+    )
+    assert entity_id is not None
+    assert float(hass.states.get(entity_id).state) == fake_meter.last_measurements[KEY_VOLTAGE_A]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert entry.state is ConfigEntryState.NOT_LOADED
+    assert entry.entry_id not in hass.data[DOMAIN]
@@ -0,0 +1,160 @@
+"""Tests for applying changed options to a running meter without a reload."""
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import EVENT_STATE_CHANGED, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.fronius_smartmeter_ip.const import (
+    CONF_CONFIG_INTERVAL,
+    CONF_CONNECT_TIMEOUT,
+    CONF_DEADBAND_PERCENT,
+    CONF_KEY_GROUPS,
+    CONF_MAX_CONNECTIONS,
+    CONF_MEASUREMENTS_INTERVAL,
+    CONF_READ_TIMEOUT,
+    DEADBAND_EXEMPT_KEYS,
+    DEFAULT_KEY_GROUPS,
+    DOMAIN,
+    KEY_ENERGY_IMPORT_ACTIVE_TOTAL,
+    KEY_GROUP_VOLTAGE,
+    KEY_GROUPS,
+    KEY_VOLTAGE_A,
+    KEY_VOLTAGE_SEQUENCE_POSITIVE,
+)
+from custom_components.fronius_smartmeter_ip.sensor import FroniusSmartmeterDataCoordinator
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+
+async def _setup(hass: HomeAssistant, meter: FakeMeter, options: dict | None = None):
+    entry = create_entry(hass, meter.url, options)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"]
+
+
+async def _configure(hass: HomeAssistant, entry, **changes) -> None:
+    """Change options through the options flow, as from the UI."""
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] is FlowResultType.FORM
+    result = await hass.config_entries.options.async_configure(result["flow_id"], changes)
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+
+def _entity_id(hass: HomeAssistant, entry, key: str) -> str:
+    entity_id = er.async_get(hass).async_get_entity_id("sensor", DOMAIN, f"{DOMAIN}_{entry.entry_id}_{key.lower()}")
+    assert entity_id is not None
+    return entity_id
+
+
+async def _poll(coordinator: FroniusSmartmeterDataCoordinator) -> None:
+    coordinator._last_fetch = None # Nicht aus dem Cache der Einzelabfrage antworten
+    await coordinator.async_refresh()
+
+
+async def test_intervals_and_timeouts_apply_live(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    entry, coordinator = await _setup(hass, fake_meter)
+    config_coordinator = hass.data[DOMAIN][entry.entry_id]["config_coordinator"]
+    client = coordinator._client
+    voltage_id = _entity_id(hass, entry, KEY_VOLTAGE_A)
+    events: list[Event] = []
+    hass.bus.async_listen(EVENT_STATE_CHANGED, events.append)
+    requests = fake_meter.requests
+
+    await _configure(
+        hass, entry, **{
+            CONF_MEASUREMENTS_INTERVAL: 3, CONF_CONFIG_INTERVAL: 600, CONF_CONNECT_TIMEOUT: 2.5, CONF_READ_TIMEOUT: 4,
+        }
+    )
+    assert entry.state is ConfigEntryState.LOADED
+    # Kein Neuladen: gleicher Koordinator, die Entitäten bleiben durchgehend verfügbar
+    assert hass.data[DOMAIN][entry.entry_id]["measurements_coordinator"] is coordinator
+    assert not [
+        event for event in events
+        if event.data["new_state"] is None or event.data["new_state"].state == STATE_UNAVAILABLE
+    ]
+    assert coordinator.update_interval == timedelta(seconds=3)
+    assert config_coordinator.update_interval == timedelta(seconds=600)
+    # Neuer Client mit den neuen Timeouts, der alte ist geschlossen
+    assert coordinator._client is not client
+    assert client.is_closed
+    assert (coordinator._client.timeout.connect, coordinator._client.timeout.read) == (2.5, 4.0)
+    # Sofortige Abfrage mit den neuen Einstellungen
+    assert fake_meter.requests > requests
+    assert hass.states.get(voltage_id).state == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_client_is_rebuilt_only_for_client_settings(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    entry, coordinator = await _setup(hass, fake_meter)
+    client = coordinator._client
+    await _configure(hass, entry, **{CONF_MEASUREMENTS_INTERVAL: 20, CONF_DEADBAND_PERCENT: 1})
+    assert coordinator._client is client
+    assert not client.is_closed
+    assert coordinator.deadband_percent == 1.0
+
+    await _configure(hass, entry, **{CONF_MEASUREMENTS_INTERVAL: 20, CONF_MAX_CONNECTIONS: 5})
+    assert coordinator._client is not client
+    assert client.is_closed
+    assert coordinator.max_connections == 5
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_deselected_key_groups_drop_out(
+    hass: HomeAssistant, fake_meter: FakeMeter, all_entities_enabled: None
+) -> None:
+    entry, coordinator = await _setup(hass, fake_meter)
+    voltage_id = _entity_id(hass, entry, KEY_VOLTAGE_A)
+    sequence_id = _entity_id(hass, entry, KEY_VOLTAGE_SEQUENCE_POSITIVE)
+    assert hass.states.get(sequence_id).state not in (STATE_UNKNOWN, STATE_UNAVAILABLE)
+
+    groups = [group for group in DEFAULT_KEY_GROUPS if group != KEY_GROUP_VOLTAGE]
+    await _configure(hass, entry, **{CONF_KEY_GROUPS: groups})
+    assert not set(KEY_GROUPS[KEY_GROUP_VOLTAGE]) & set(coordinator.data)
+    # Aus den Spannungen berechnete Werte fehlen ebenfalls
+    assert KEY_VOLTAGE_SEQUENCE_POSITIVE not in coordinator.data
+    assert hass.states.get(voltage_id).state == STATE_UNKNOWN
+    assert hass.states.get(sequence_id).state == STATE_UNKNOWN
+
+    # Wieder auswählen: die nächste Abfrage liefert die Werte wieder
+    await _configure(hass, entry, **{CONF_KEY_GROUPS: DEFAULT_KEY_GROUPS})
+    await _poll(coordinator)
+    assert hass.states.get(voltage_id).state == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_deadband_suppresses_small_changes(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    entry, coordinator = await _setup(hass, fake_meter)
+    assert KEY_ENERGY_IMPORT_ACTIVE_TOTAL in DEADBAND_EXEMPT_KEYS
+    voltage_id = _entity_id(hass, entry, KEY_VOLTAGE_A)
+    energy_id = _entity_id(hass, entry, KEY_ENERGY_IMPORT_ACTIVE_TOTAL)
+    await _configure(hass, entry, **{CONF_DEADBAND_PERCENT: 1})
+    reference = float(hass.states.get(voltage_id).state)
+    suppressed = passed = 0
+
+    # Der Fake-Smart-Meter ändert die Werte pro Abfrage um 0,5: unter 1 % bleibt der alte Zustand stehen,
+    # bis sich die Änderungen über die Totzone aufsummiert haben
+    for _ in range(7):
+        await _poll(coordinator)
+        value = fake_meter.last_measurements[KEY_VOLTAGE_A]
+        # Energiezähler sind ausgenommen und folgen jeder Änderung
+        assert hass.states.get(energy_id).state == str(fake_meter.last_measurements[KEY_ENERGY_IMPORT_ACTIVE_TOTAL])
+        if abs(value - reference) > reference / 100:
+            assert hass.states.get(voltage_id).state == str(value)
+            reference = value
+            passed += 1
+        else:
+            assert float(hass.states.get(voltage_id).state) == reference
+            suppressed += 1
+    assert suppressed and passed
+
+    # Ohne Totzone folgt auch die Spannung jeder Änderung
+    await _configure(hass, entry, **{CONF_DEADBAND_PERCENT: 0})
+    await _poll(coordinator)
+    assert hass.states.get(voltage_id).state == str(fake_meter.last_measurements[KEY_VOLTAGE_A])
+    assert await hass.config_entries.async_unload(entry.entry_id)
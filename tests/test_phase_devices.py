@@ -0,0 +1,103 @@
+"""Tests for splitting a meter into one device per phase."""
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.fronius_smartmeter_ip.const import (
+    CONF_PHASE_DEVICES,
+    DOMAIN,
+    KEY_ACTIVE_POWER_TOTAL,
+    KEY_CURRENT_N,
+    KEY_DATA_STALE,
+    KEY_PHASES,
+    KEY_VOLTAGE_A,
+    KEY_VOLTAGE_C,
+    PHASE_NAMES,
+    STATUS_BIT_PHASES,
+)
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+
+def _phase_of(entry_id: str, unique_id: str) -> str | None:
+    """Return the phase an entity belongs to, from the key in its unique ID."""
+    key = unique_id.removeprefix(f"{DOMAIN}_{entry_id}_")
+    if key.startswith("status_bit_"):
+        return STATUS_BIT_PHASES.get(int(key.rsplit("_", 1)[-1]))
+    return {phase_key.lower(): phase for phase_key, phase in KEY_PHASES.items()}.get(key)
+
+
+def _entity_devices(hass: HomeAssistant, entry_id: str) -> dict[str, tuple[str, str]]:
+    """Return unique ID -> (entity ID, device identifier) of all entities of an entry."""
+    devices = dr.async_get(hass)
+    result = {}
+    for entity in er.async_entries_for_config_entry(er.async_get(hass), entry_id):
+        device = devices.async_get(entity.device_id)
+        [(_domain, identifier)] = device.identifiers
+        result[entity.unique_id] = (entity.entity_id, identifier)
+    return result
+
+
+def _phase_devices(hass: HomeAssistant, entry_id: str) -> dict[str, dr.DeviceEntry]:
+    devices = dr.async_get(hass)
+    return {
+        phase: device for phase in PHASE_NAMES
+        if (device := devices.async_get_device(identifiers={(DOMAIN, f"{entry_id}_{phase}")})) is not None
+    }
+
+
+async def _set_phase_devices(hass: HomeAssistant, entry, enabled: bool) -> None:
+    # Die Änderung lädt den Eintrag neu
+    hass.config_entries.async_update_entry(entry, options={**entry.options, CONF_PHASE_DEVICES: enabled})
+    await hass.async_block_till_done()
+
+
+async def test_toggle_phase_devices(
+    hass: HomeAssistant, fake_meter: FakeMeter, all_entities_enabled: None
+) -> None:
+    entry = create_entry(hass, fake_meter.url)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    single = _entity_devices(hass, entry.entry_id)
+    assert {identifier for _entity_id, identifier in single.values()} == {entry.entry_id}
+    assert not _phase_devices(hass, entry.entry_id)
+
+    await _set_phase_devices(hass, entry, True)
+    split = _entity_devices(hass, entry.entry_id)
+    # Gleiche Entitäten mit gleichen IDs, nur an anderen Geräten
+    assert {uid: entity_id for uid, (entity_id, _device) in split.items()} == {
+        uid: entity_id for uid, (entity_id, _device) in single.items()
+    }
+    for uid, (_entity_id, identifier) in split.items():
+        phase = _phase_of(entry.entry_id, uid)
+        assert identifier == (entry.entry_id if phase is None else f"{entry.entry_id}_{phase}"), uid
+    moved = {_phase_of(entry.entry_id, uid) for uid in split} - {None}
+    assert moved == set(PHASE_NAMES)
+    main = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, entry.entry_id)})
+    assert {device.via_device_id for device in _phase_devices(hass, entry.entry_id).values()} == {main.id}
+
+    # Stichproben: Phasenwerte an ihren Geräten, Gesamtwerte und Zustand am Hauptgerät
+    uid = lambda key: f"{DOMAIN}_{entry.entry_id}_{key.lower()}"
+    assert split[uid(KEY_VOLTAGE_A)][1] == f"{entry.entry_id}_l1"
+    assert split[uid(KEY_VOLTAGE_C)][1] == f"{entry.entry_id}_l3"
+    assert split[uid(KEY_CURRENT_N)][1] == f"{entry.entry_id}_n"
+    assert split[uid("status_bit_5")][1] == f"{entry.entry_id}_l2"
+    assert split[uid(KEY_ACTIVE_POWER_TOTAL)][1] == entry.entry_id
+    assert split[uid(KEY_DATA_STALE)][1] == entry.entry_id
+    assert hass.states.get(split[uid(KEY_VOLTAGE_C)][0]).state == str(fake_meter.last_measurements[KEY_VOLTAGE_C])
+
+    # Zurück zu einem Gerät: die leeren Phasen-Geräte werden entfernt
+    await _set_phase_devices(hass, entry, False)
+    assert _entity_devices(hass, entry.entry_id) == single
+    assert not _phase_devices(hass, entry.entry_id)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_phase_devices_from_the_start(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    entry = create_entry(hass, fake_meter.url, {CONF_PHASE_DEVICES: True})
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert set(_phase_devices(hass, entry.entry_id)) == set(PHASE_NAMES)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    # Entladen allein entfernt keine Geräte
+    assert set(_phase_devices(hass, entry.entry_id)) == set(PHASE_NAMES)
@@ -0,0 +1,99 @@
+"""Tests for the persisted measurements snapshot."""
+import struct
+import time
+
+import pytest
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import STORAGE_DIR
+
+from custom_components.fronius_smartmeter_ip.const import (
+    ATTR_RESTORED,
+    ATTR_RESTORED_AT,
+    DOMAIN,
+    KEY_ACTIVE_POWER_TOTAL,
+    KEY_PHASE_ROTATION,
+    KEY_SAMPLES,
+    PHASE_ROTATION_POSITIVE,
+    SNAPSHOT_MAX_AGE_SECONDS,
+)
+from custom_components.fronius_smartmeter_ip.snapshot import decode_snapshot, encode_snapshot
+
+from .conftest import create_entry
+from .fake_meter import FakeMeter
+
+DATA = {
+    KEY_ACTIVE_POWER_TOTAL: -1234.5,
+    KEY_SAMPLES: 2**40,
+    "VA": None,
+    KEY_PHASE_ROTATION: PHASE_ROTATION_POSITIVE,
+    "unit": "",
+    "label": PHASE_ROTATION_POSITIVE, # Gleiche Zeichenkette nur einmal in der Tabelle
+}
+
+
+def test_round_trip() -> None:
+    saved_at, data = decode_snapshot(encode_snapshot(DATA, 1700000000.5))
+    assert saved_at == 1700000000.5
+    assert data == DATA
+    assert isinstance(data[KEY_SAMPLES], int)
+
+
+def test_skips_unsupported_values() -> None:
+    _saved_at, data = decode_snapshot(encode_snapshot(
+        {**DATA, "list": [1, 2], "flag": True, "long": "x" * 100, "nul": "a\0b"}, 0.0
+    ))
+    assert data == DATA
+
+
+def test_reads_version_1() -> None:
+    blob = b"".join((
+        struct.pack("<4sBdHI", b"FSMS", 1, 12.0, 2, 5), b"PT\0VA", bytes((0, 2)), struct.pack("<2d", 1.5, 0.0)
+    ))
+    assert decode_snapshot(blob) == (12.0, {"PT": 1.5, "VA": None})
+
+
+@pytest.mark.parametrize("cut", [3, 20, -1])
+def test_truncated(cut: int) -> None:
+    with pytest.raises(ValueError):
+        decode_snapshot(encode_snapshot(DATA, 0.0)[:cut])
+
+
+async def _setup_with_snapshot(hass: HomeAssistant, meter: FakeMeter, saved_at: float):
+    entry = create_entry(hass, meter.url)
+    path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.snapshot")
+    with open(path, "wb") as file:
+        file.write(encode_snapshot({KEY_ACTIVE_POWER_TOTAL: 321.0, KEY_PHASE_ROTATION: "negative"}, saved_at))
+    await hass.config_entries.async_setup(entry.entry_id)
+    return entry
+
+
+async def test_restores_recent_snapshot(
+    hass: HomeAssistant, fake_meter: FakeMeter, all_entities_enabled: None
+) -> None:
+    fake_meter.delay = 0.3 # Die erste Abfrage läuft noch, während die Werte geprüft werden
+    saved_at = time.time() - 60
+    entry = await _setup_with_snapshot(hass, fake_meter, saved_at)
+    assert entry.state is ConfigEntryState.LOADED
+    rotation = next(
+        state for state in hass.states.async_all("sensor")
+        if state.attributes.get("friendly_name", "").endswith("Phase Rotation")
+    )
+    assert rotation.state == "negative"
+    assert rotation.attributes[ATTR_RESTORED] is True
+    assert rotation.attributes[ATTR_RESTORED_AT].startswith(time.strftime("%Y-%m-%d", time.gmtime(saved_at)))
+
+    await hass.async_block_till_done()
+    rotation = hass.states.get(rotation.entity_id)
+    assert rotation.state == PHASE_ROTATION_POSITIVE
+    assert ATTR_RESTORED not in rotation.attributes
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_ignores_old_snapshot(hass: HomeAssistant, fake_meter: FakeMeter) -> None:
+    fake_meter.status = 500
+    entry = await _setup_with_snapshot(hass, fake_meter, time.time() - 2 * SNAPSHOT_MAX_AGE_SECONDS)
+    # Ohne verwertbaren Snapshot wartet die Einrichtung auf das Gerät
+    assert entry.state is ConfigEntryState.SETUP_RETRY
+    await hass.config_entries.async_remove(entry.entry_id)